@@ -0,0 +1,3 @@
+"""Performance benchmarks for the quantum_viz package."""
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
@@ -0,0 +1,50 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the bulk parsing of flat circuits with parsing each instruction.
+
+Run with ``python -m benchmarks.bench_bulk`` from the quantum-viz directory.
+"""
+from functools import partial
+from typing import Any
+from typing import Dict
+from typing import List
+
+from benchmarks.circuits import layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+
+class _PerInstructionParser(QiskitCircuitParser):
+    """Parse flat circuits one instruction at a time, like deeper circuits."""
+
+    def _parse_flat_operations(self, data: Any) -> List[Dict]:
+        return [
+            self._parse_operation(instruction, qargs, cargs, depth=1)
+            for instruction, qargs, cargs in self._filter_circuit_data(data)
+        ]
+
+
+def main() -> None:
+    """Print the parse time of flat circuits of 100k gates and more."""
+    rows: List[List[Any]] = []
+    for num_layers in (500, 1000, 2000):
+        qc = layered_qc(100, num_layers)
+        per_instruction = measure(
+            partial(_PerInstructionParser, qc, max_recursion_depth=1)
+        )
+        bulk = measure(partial(QiskitCircuitParser, qc, max_recursion_depth=1))
+        rows.append(
+            [
+                qc.name,
+                f"{len(qc.data):,}",
+                f"{per_instruction:.3f}",
+                f"{bulk:.3f}",
+                f"{per_instruction / bulk:.1f}x",
+            ]
+        )
+    print_table(["circuit", "gates", "per-instruction", "bulk", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
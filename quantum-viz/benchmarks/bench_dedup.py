@@ -0,0 +1,62 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the size of plain and deduplicated payloads, and the time to dedupe them.
+
+Run with ``python -m benchmarks.bench_dedup`` from the quantum-viz directory.
+"""
+from functools import partial
+from typing import Any
+from typing import List
+
+from benchmarks.circuits import grover_qc
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.circuits import qft_qc
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.compress import compress_json
+from quantum_viz.dedup import dedupe_children
+from quantum_viz.qiskit_parser import qiskit2dict
+
+
+def main() -> None:
+    """Print the payload sizes, plain and compressed, and the time to dedupe."""
+    rows: List[List[Any]] = []
+    for qc in [
+        qft_qc(32),
+        grover_qc(8),
+        nested_qft_qc(10, 20),
+        random_layered_qc(20, 10_000),
+    ]:
+        qviz_dict = qiskit2dict(qc)
+        plain = circuit_to_json(qviz_dict)
+        deduped = circuit_to_json(dedupe_children(qviz_dict))
+        dedupe_time = measure(partial(dedupe_children, qviz_dict))
+        rows.append(
+            [
+                qc.name,
+                f"{len(plain):,}",
+                f"{len(deduped):,}",
+                f"{len(plain) / len(deduped):.0f}x",
+                f"{len(compress_json(plain)):,}",
+                f"{len(compress_json(deduped)):,}",
+                f"{dedupe_time * 1e3:.1f}",
+            ]
+        )
+    print_table(
+        [
+            "circuit",
+            "plain bytes",
+            "deduped bytes",
+            "ratio",
+            "plain gzip",
+            "deduped gzip",
+            "dedupe ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
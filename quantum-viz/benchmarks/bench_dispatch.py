@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Measure the per-gate cost of dispatching an instruction to its handler.
+
+Run with ``python -m benchmarks.bench_dispatch`` from the quantum-viz directory.
+"""
+from functools import partial
+from typing import Any
+from typing import List
+
+from qiskit import QuantumCircuit
+from qiskit.circuit import ControlledGate
+from qiskit.circuit import Instruction
+from qiskit.circuit import Measure
+from qiskit.circuit import Reset
+from qiskit.circuit.library import CXGate
+from qiskit.circuit.library import HGate
+from qiskit.circuit.library import MCXGate
+from qiskit.circuit.library import RZGate
+
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import _resolve_instruction_type
+from quantum_viz.qiskit_parser import INSTRUCTION_TYPE_TO_NAME
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+NUM_GATES = 100_000
+
+
+def _isinstance_chain(instructions: List[Instruction]) -> None:
+    """Dispatch with the isinstance checks and the name lookup of each gate."""
+    for instruction in instructions:
+        INSTRUCTION_TYPE_TO_NAME.get(type(instruction), instruction.name)
+        if isinstance(instruction, Reset):
+            pass
+        elif isinstance(instruction, Measure):
+            pass
+        elif isinstance(instruction, ControlledGate):
+            pass
+
+
+def _dispatch_table(instructions: List[Instruction]) -> None:
+    """Dispatch with the handler and the name resolved once per gate class."""
+    for instruction in instructions:
+        _, name = _resolve_instruction_type(type(instruction))
+        name or instruction.name
+
+
+def _create_op_dicts(parser: QiskitCircuitParser, qc: QuantumCircuit) -> None:
+    """Create the operation dictionaries of the gates, with their handlers."""
+    for item in qc.data:
+        parser._create_op_dict(item.operation, item.qubits, item.clbits, depth=1)
+
+
+def main() -> None:
+    """Print the dispatch cost per gate, in nanoseconds."""
+    gates = [HGate(), CXGate(), RZGate(0.5), MCXGate(3), Measure(), Reset()]
+    qc = QuantumCircuit(4, 1)
+    for i in range(NUM_GATES):
+        gate = gates[i % len(gates)]
+        qc.append(gate, range(gate.num_qubits), range(gate.num_clbits))
+    instructions = [item.operation for item in qc.data]
+    parser = QiskitCircuitParser(QuantumCircuit(4, 1), max_recursion_depth=1)
+    rows: List[List[Any]] = []
+    for name, func in [
+        ("isinstance chain", partial(_isinstance_chain, instructions)),
+        ("dispatch table", partial(_dispatch_table, instructions)),
+        ("create op dict", partial(_create_op_dicts, parser, qc)),
+    ]:
+        rows.append([name, f"{measure(func) / NUM_GATES * 1e9:.0f}"])
+    print_table(["dispatch", "ns/gate"], rows)
+
+
+if __name__ == "__main__":
+    main()
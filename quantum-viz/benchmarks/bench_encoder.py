@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the fragment encoder with `json` on circuits of a million operations.
+
+The operations of a parsed circuit, as dictionaries and as `Operation` records, are
+repeated up to a million operations, counting the children, and serialized by
+``json.dumps``, by a `FragmentEncoder` and by ``circuit_to_json``, which picks one
+of them by the type of the operations.
+
+Run with ``python -m benchmarks.bench_encoder`` from the quantum-viz directory.
+"""
+import json
+from functools import partial
+from itertools import cycle
+from itertools import islice
+from typing import Any
+from typing import Dict
+from typing import List
+
+from benchmarks.circuits import measure_reset_qc
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.compact import _to_json_value
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.compact import JSON_SEPARATORS
+from quantum_viz.encoder import FragmentEncoder
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+NUM_OPERATIONS = 1_000_000
+
+
+def _count(operations: List[Any]) -> int:
+    return sum(1 + _count(op.get("children", [])) for op in operations)
+
+
+def _tile(circuit: Dict[str, Any]) -> Dict[str, Any]:
+    """Repeat the top-level operations up to `NUM_OPERATIONS` operations."""
+    children = circuit["operations"][0]["children"]
+    repeat = -(-NUM_OPERATIONS * len(children) // _count(children))
+    return {
+        "qubits": circuit["qubits"],
+        "operations": list(islice(cycle(children), repeat)),
+    }
+
+
+def _json_dumps(circuit: Dict[str, Any]) -> str:
+    return json.dumps(circuit, separators=JSON_SEPARATORS, default=_to_json_value)
+
+
+def main() -> None:
+    """Print the serialization times of each encoder."""
+    rows: List[List[Any]] = []
+    encoder = FragmentEncoder()
+    cases = [
+        (random_layered_qc(20, 100_000), 1),
+        (random_layered_qc(20, 20_000), None),
+        (measure_reset_qc(20, 2_000), None),
+    ]
+    for qc, depth in cases:
+        for compact in (False, True):
+            parser = QiskitCircuitParser(qc, max_recursion_depth=depth, compact=compact)
+            circuit = _tile(parser.qviz_dict)
+            expected = _json_dumps(circuit)
+            assert encoder.encode(circuit) == circuit_to_json(circuit) == expected
+            json_time = measure(partial(_json_dumps, circuit))
+            fragment_time = measure(partial(encoder.encode, circuit))
+            rows.append(
+                [
+                    f"{qc.name}/depth={depth}",
+                    "records" if compact else "dicts",
+                    f"{_count(circuit['operations']):,}",
+                    f"{len(expected):,}",
+                    f"{json_time * 1e3:.0f}",
+                    f"{fragment_time * 1e3:.0f}",
+                    f"{measure(partial(circuit_to_json, circuit)) * 1e3:.0f}",
+                    f"{json_time / fragment_time:.2f}x",
+                ]
+            )
+    print_table(
+        [
+            "circuit",
+            "operations",
+            "count",
+            "bytes",
+            "json ms",
+            "fragments ms",
+            "circuit_to_json ms",
+            "speedup",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
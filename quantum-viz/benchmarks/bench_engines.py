@@ -0,0 +1,48 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the recursive and the iterative parse engines on nested circuits.
+
+Run with ``python -m benchmarks.bench_engines`` from the quantum-viz directory.
+"""
+from functools import partial
+from typing import Any
+from typing import List
+
+from benchmarks.circuits import mcx_qc
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+
+def _count_operations(operations: List[dict]) -> int:
+    count = 0
+    stack = [operations]
+    while stack:
+        for op in stack.pop():
+            count += 1
+            stack.append(op.get("children", []))
+    return count
+
+
+def main() -> None:
+    """Print the throughput of both engines, in parsed operations per second."""
+    circuits = [
+        mcx_qc(8),
+        mcx_qc(12),
+        nested_qft_qc(6, 4),
+        nested_qft_qc(8, 8),
+    ]
+    rows: List[List[Any]] = []
+    for qc in circuits:
+        num_ops = _count_operations(QiskitCircuitParser(qc).operations)
+        row: List[Any] = [qc.name, num_ops]
+        for iterative in (False, True):
+            seconds = measure(partial(QiskitCircuitParser, qc, iterative=iterative))
+            row.append(f"{num_ops / seconds:,.0f}")
+        rows.append(row)
+    print_table(["circuit", "operations", "recursive ops/s", "iterative ops/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
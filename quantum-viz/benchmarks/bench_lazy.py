@@ -0,0 +1,72 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the circuit drawn first by the Viewer, with and without lazy expansion.
+
+The browser parses and draws the first circuit before anything is shown, so its
+size stands for the time to first render; ``json.loads`` times its parsing. The
+Python side is timed from parsing the Qiskit circuit to the HTML of the widget,
+whose size is reported as well.
+
+Run with ``python -m benchmarks.bench_lazy`` from the quantum-viz directory.
+"""
+import json
+from functools import partial
+from typing import Any
+from typing import List
+from typing import Optional
+
+from benchmarks.circuits import hardware_efficient_qc
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.cache import json_cache
+from quantum_viz.widget import Viewer
+
+
+def _render(qc: Any, lazy_depth: Optional[int]) -> str:
+    """Get the HTML of a widget of the circuit, parsing it again."""
+    json_cache.clear()
+    return Viewer(qc, lazy_depth=lazy_depth, name="qc").html_str(uid="bench")
+
+
+def main() -> None:
+    """Print the size and parse time of the first drawn circuit, and of the HTML."""
+    rows: List[List[Any]] = []
+    for qc in [nested_qft_qc(10, 20), hardware_efficient_qc(20, 20)]:
+        eager = Viewer(qc, name="qc").value
+        lazy = Viewer(qc, lazy_depth=1, name="qc").value
+        eager_time = measure(partial(json.loads, eager))
+        lazy_time = measure(partial(json.loads, lazy))
+        eager_render_time = measure(partial(_render, qc, None))
+        lazy_render_time = measure(partial(_render, qc, 1))
+        rows.append(
+            [
+                qc.name,
+                f"{len(eager):,}",
+                f"{len(lazy):,}",
+                f"{eager_time * 1e3:.2f}",
+                f"{lazy_time * 1e3:.2f}",
+                f"{len(_render(qc, None)):,}",
+                f"{len(_render(qc, 1)):,}",
+                f"{eager_render_time * 1e3:.1f}",
+                f"{lazy_render_time * 1e3:.1f}",
+            ]
+        )
+    print_table(
+        [
+            "circuit",
+            "eager bytes",
+            "lazy bytes",
+            "eager ms",
+            "lazy ms",
+            "eager html bytes",
+            "lazy html bytes",
+            "eager python ms",
+            "lazy python ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the memory used by the dictionary and the compact parser outputs.
+
+Run with ``python -m benchmarks.bench_memory`` from the quantum-viz directory.
+"""
+import gc
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Tuple
+
+from benchmarks.circuits import layered_qc
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import qiskit2compact
+from quantum_viz.qiskit_parser import qiskit2dict
+
+
+def _traced_memory(func: Callable[[], Any]) -> Tuple[int, int]:
+    """Return the memory retained by the result of `func` and the peak memory."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained, peak
+
+
+def main() -> None:
+    """Print the retained and peak memory of both outputs, in MiB."""
+    rows: List[List[Any]] = []
+    for num_qubits, num_layers in [(10, 1_000), (100, 1_000), (1_000, 100)]:
+        qc = layered_qc(num_qubits, num_layers)
+        for name, convert in [("dict", qiskit2dict), ("compact", qiskit2compact)]:
+            retained, peak = _traced_memory(lambda: convert(qc))  # noqa: B023
+            rows.append(
+                [
+                    qc.name,
+                    name,
+                    f"{retained / 2**20:.1f}",
+                    f"{peak / 2**20:.1f}",
+                ]
+            )
+    print_table(["circuit", "output", "retained MiB", "peak MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
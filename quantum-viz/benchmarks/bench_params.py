@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare parsing with and without the cache of formatted gate parameters.
+
+Run with ``python -m benchmarks.bench_params`` from the quantum-viz directory.
+"""
+import random
+from functools import partial
+from typing import Any
+from typing import Dict
+from typing import List
+
+from qiskit import QuantumCircuit
+
+from benchmarks.circuits import hardware_efficient_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import _format_params
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+
+class _UncachedParamsParser(QiskitCircuitParser):
+    """Format the parameters of every gate."""
+
+    def _add_params(self, op_dict: Dict, instruction: Any) -> None:
+        op_dict["displayArgs"] = _format_params(instruction.params, self.precision)
+
+
+def main() -> None:
+    """Print the parse time of a 50-layer ansatz, unbound and bound."""
+    qc = hardware_efficient_qc(100, 50)
+    # The angles of a variational circuit repeat, e.g. its initial point
+    angles = [random.uniform(-3.14, 3.14) for _ in range(8)]
+    bound_qc: QuantumCircuit = qc.assign_parameters(
+        [random.choice(angles) for _ in range(qc.num_parameters)]
+    )
+    rows: List[List[Any]] = []
+    for circuit, parameters in [(qc, "unbound"), (bound_qc, "8 angles")]:
+        uncached = measure(
+            partial(_UncachedParamsParser, circuit, max_recursion_depth=1)
+        )
+        cached = measure(partial(QiskitCircuitParser, circuit, max_recursion_depth=1))
+        rows.append(
+            [
+                qc.name,
+                parameters,
+                f"{len(circuit.data):,}",
+                f"{uncached:.3f}",
+                f"{cached:.3f}",
+                f"{uncached / cached:.1f}x",
+            ]
+        )
+    print_table(
+        ["circuit", "parameters", "gates", "uncached", "cached", "speedup"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
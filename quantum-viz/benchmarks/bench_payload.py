@@ -0,0 +1,68 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the size and generation time of plain and compressed payloads.
+
+The payloads are embedded by ``Viewer.html_str`` in notebooks, and by
+``utils._create_file`` in pages. The JSON cache is cleared before each page is
+created, so that the circuit is serialized each time.
+
+Run with ``python -m benchmarks.bench_payload`` from the quantum-viz directory.
+"""
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any
+from typing import List
+
+from qiskit import QuantumCircuit
+
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.cache import json_cache
+from quantum_viz.utils import _create_file
+from quantum_viz.widget import Viewer
+
+
+def _create_file_uncached(circuit: QuantumCircuit, path: Path, compress: bool) -> None:
+    json_cache.clear()
+    _create_file(circuit, path, compress=compress)
+
+
+def main() -> None:
+    """Print the size and generation time of the payloads."""
+    rows: List[List[Any]] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir, "circuit.html")
+        for qc in [random_layered_qc(20, 10_000), nested_qft_qc(10, 20)]:
+            for compress in (False, True):
+                viewer = Viewer(qc, compress=compress)
+                html_str_bytes = len(viewer.html_str())
+                html_str_time = measure(viewer.html_str)
+                file_time = measure(partial(_create_file_uncached, qc, path, compress))
+                rows.append(
+                    [
+                        qc.name,
+                        "gzip" if compress else "plain",
+                        f"{html_str_bytes:,}",
+                        f"{html_str_time * 1e3:.1f}",
+                        f"{path.stat().st_size:,}",
+                        f"{file_time * 1e3:.1f}",
+                    ]
+                )
+    print_table(
+        [
+            "circuit",
+            "payload",
+            "html_str bytes",
+            "html_str ms",
+            "file bytes",
+            "create_file ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
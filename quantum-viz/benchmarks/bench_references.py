@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare parsing with shared and with per-operation register references.
+
+Run with ``python -m benchmarks.bench_references`` from the quantum-viz directory.
+"""
+import tracemalloc
+from functools import partial
+from typing import Any
+from typing import List
+
+from benchmarks.circuits import layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+
+def _allocated_blocks(parser: partial) -> int:
+    """Return the number of memory blocks retained by the parsed circuit."""
+    tracemalloc.start()
+    try:
+        result = parser()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    return sum(stat.count for stat in snapshot.statistics("filename"))
+
+
+def main() -> None:
+    """Print the parse time and the retained blocks with and without sharing."""
+    qc = layered_qc(1000, 20)
+    rows: List[List[Any]] = []
+    for max_recursion_depth in (1, None):
+        for share_references in (False, True):
+            parser = partial(
+                QiskitCircuitParser,
+                qc,
+                max_recursion_depth=max_recursion_depth,
+                share_references=share_references,
+            )
+            rows.append(
+                [
+                    qc.name,
+                    max_recursion_depth,
+                    share_references,
+                    f"{measure(parser):.3f}",
+                    f"{_allocated_blocks(parser):,}",
+                ]
+            )
+    print_table(["circuit", "depth", "shared", "seconds", "blocks"], rows)
+
+
+if __name__ == "__main__":
+    main()
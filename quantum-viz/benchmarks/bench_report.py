@@ -0,0 +1,63 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare a report of many circuits with a page per circuit.
+
+Run with ``python -m benchmarks.bench_report`` from the quantum-viz directory.
+"""
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any
+from typing import List
+
+from qiskit import QuantumCircuit
+
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.cache import json_cache
+from quantum_viz.utils import _create_file
+from quantum_viz.utils import _create_report_file
+
+
+def _create_pages(circuits: List[QuantumCircuit], pages: List[Path]) -> None:
+    json_cache.clear()
+    for circuit, page in zip(circuits, pages):
+        _create_file(circuit, page)
+
+
+def _create_report(circuits: List[QuantumCircuit], report: Path) -> None:
+    json_cache.clear()
+    _create_report_file(circuits, report)
+
+
+def main() -> None:
+    """Print the time to write the circuits, and the size of the written files."""
+    rows: List[List[Any]] = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_circuits in (50, 500):
+            circuits = [
+                random_layered_qc(5, 20, seed=seed) for seed in range(num_circuits)
+            ]
+            pages = [Path(tmp_dir, f"page_{i}.html") for i in range(num_circuits)]
+            report = Path(tmp_dir, "report.html")
+
+            pages_time = measure(partial(_create_pages, circuits, pages))
+            report_time = measure(partial(_create_report, circuits, report))
+            pages_size = sum(page.stat().st_size for page in pages)
+            rows.append(
+                [
+                    num_circuits,
+                    f"{pages_time * 1e3:.0f}",
+                    f"{report_time * 1e3:.0f}",
+                    f"{pages_size:,}",
+                    f"{report.stat().st_size:,}",
+                ]
+            )
+    print_table(
+        ["circuits", "pages ms", "report ms", "pages bytes", "report bytes"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Time creating many Viewers, of which only the first is displayed.
+
+The Viewers are created as in a loop over the passes of a transpiler, with and
+without their name, which is otherwise looked up in the source of the caller. The
+circuit is parsed and serialized by the first ``html_str`` only, which is timed
+separately, with the JSON cache cleared.
+
+Run with ``python -m benchmarks.bench_viewer`` from the quantum-viz directory.
+"""
+from functools import partial
+from typing import Any
+from typing import List
+
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.cache import json_cache
+from quantum_viz.widget import Viewer
+
+NUM_VIEWERS = 10_000
+
+
+def _create_viewers(circuit: Any, **kwargs: Any) -> List[Viewer]:
+    viewers = []
+    for _ in range(NUM_VIEWERS):
+        viewer = Viewer(circuit, **kwargs)
+        viewers.append(viewer)
+    return viewers
+
+
+def _display_first(circuit: Any) -> None:
+    json_cache.clear()
+    Viewer(circuit, name="first").html_str()
+
+
+def main() -> None:
+    """Print the time of creating the Viewers, and of displaying one of them."""
+    rows: List[List[Any]] = []
+    for qc in [random_layered_qc(20, 10_000), nested_qft_qc(10, 20)]:
+        # Timed first, before the parser of the circuit is kept by `qiskit2json`
+        display_seconds = measure(partial(_display_first, qc), repeat=1)
+        for kwargs in ({}, {"name": "viewer"}):
+            seconds = measure(partial(_create_viewers, qc, **kwargs), repeat=1)
+            rows.append(
+                [
+                    qc.name,
+                    "given" if kwargs else "looked up",
+                    f"{seconds:.3f}",
+                    f"{seconds / NUM_VIEWERS * 1e6:.1f}",
+                    f"{display_seconds * 1e3:.1f}",
+                ]
+            )
+    print_table(
+        [
+            "circuit",
+            "name",
+            f"{NUM_VIEWERS:,} Viewers s",
+            "per Viewer us",
+            "first html_str ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Compare the sequential parse with parsing in worker processes.
+
+Run with ``python -m benchmarks.bench_workers`` from the quantum-viz directory.
+"""
+import os
+from functools import partial
+from typing import Any
+from typing import List
+
+from qiskit import QuantumCircuit
+from qiskit.extensions import UnitaryGate
+from qiskit.quantum_info import random_unitary
+
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+
+
+def unitaries_qc(num_gates: int, num_qubits: int = 3) -> QuantumCircuit:
+    """Create a circuit of random unitary gates, whose definitions are costly."""
+    qc = QuantumCircuit(num_qubits, name=f"unitaries_{num_gates}")
+    for seed in range(num_gates):
+        qc.append(UnitaryGate(random_unitary(2**num_qubits, seed=seed)), qc.qubits)
+    return qc
+
+
+def _parse(num_gates: int, workers: int) -> None:
+    # The gates keep their definitions once built, so parse a new circuit
+    QiskitCircuitParser(unitaries_qc(num_gates), workers=workers)
+
+
+def main() -> None:
+    """Print the parse time of a circuit of costly gates, by number of workers."""
+    num_gates = 64
+    name = unitaries_qc(num_gates).name
+    rows: List[List[Any]] = []
+    sequential = measure(partial(_parse, num_gates, 1))
+    rows.append([name, 1, f"{sequential:.3f}", "1.0x"])
+    for workers in sorted({2, 4, os.cpu_count() or 1} - {1}):
+        parallel = measure(partial(_parse, num_gates, workers))
+        rows.append([name, workers, f"{parallel:.3f}", f"{sequential / parallel:.1f}x"])
+    print_table(["circuit", "workers", "seconds", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
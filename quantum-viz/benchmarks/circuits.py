@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Generators of the circuits used by the benchmarks."""
+from qiskit import QuantumCircuit
+from qiskit.circuit.library import GroverOperator
+from qiskit.circuit.library import MCXGate
+from qiskit.circuit.library import QFT
+from qiskit.circuit.library import TwoLocal
+from qiskit.circuit.random import random_circuit
+
+
+def mcx_qc(num_ctrl_qubits: int) -> QuantumCircuit:
+    """Create a circuit with a single multi-controlled X gate."""
+    qc = QuantumCircuit(num_ctrl_qubits + 1, name=f"mcx_{num_ctrl_qubits}")
+    qc.append(MCXGate(num_ctrl_qubits), qc.qubits)
+    return qc
+
+
+def nested_qft_qc(num_qubits: int, levels: int) -> QuantumCircuit:
+    """Create a circuit of QFT gates, each nested in the definition of the next."""
+    name = f"nested_qft_{num_qubits}x{levels}"
+    qc = QuantumCircuit(num_qubits, name=name)
+    qc.append(QFT(num_qubits).to_gate(), qc.qubits)
+    for _ in range(1, levels):
+        gate = qc.to_gate()
+        qc = QuantumCircuit(num_qubits, name=name)
+        qc.append(QFT(num_qubits).to_gate(), qc.qubits)
+        qc.append(gate, qc.qubits)
+    return qc
+
+
+def layered_qc(num_qubits: int, num_layers: int) -> QuantumCircuit:
+    """Create a circuit of layers of H gates followed by a ladder of CX gates."""
+    qc = QuantumCircuit(num_qubits, name=f"layered_{num_qubits}x{num_layers}")
+    for _ in range(num_layers):
+        qc.h(qc.qubits)
+        for i in range(num_qubits - 1):
+            qc.cx(i, i + 1)
+    return qc
+
+
+def hardware_efficient_qc(num_qubits: int, num_layers: int) -> QuantumCircuit:
+    """Create a hardware-efficient ansatz of RY and RZ layers and CX ladders.
+
+    The rotation angles are unbound parameters.
+    """
+    name = f"hea_{num_qubits}x{num_layers}"
+    ansatz = TwoLocal(num_qubits, ["ry", "rz"], "cx", "linear", reps=num_layers)
+    return ansatz.decompose().copy(name=name)
+
+
+def random_layered_qc(num_qubits: int, num_gates: int, seed: int = 0) -> QuantumCircuit:
+    """Create a circuit of layers of random one- and two-qubit standard gates."""
+    qc = random_circuit(
+        num_qubits, max(1, num_gates // num_qubits), max_operands=2, seed=seed
+    )
+    return qc.copy(name=f"random_{num_qubits}x{num_gates}")
+
+
+def qft_qc(num_qubits: int) -> QuantumCircuit:
+    """Create a circuit of a single QFT gate."""
+    qc = QuantumCircuit(num_qubits, name=f"qft_{num_qubits}")
+    qc.append(QFT(num_qubits).to_gate(), qc.qubits)
+    return qc
+
+
+def grover_qc(num_qubits: int, iterations: int = 2) -> QuantumCircuit:
+    """Create a Grover search for the all-ones state, of multi-controlled gates."""
+    oracle = QuantumCircuit(num_qubits, name="oracle")
+    oracle.h(num_qubits - 1)
+    oracle.mcx(list(range(num_qubits - 1)), num_qubits - 1)
+    oracle.h(num_qubits - 1)
+    grover = GroverOperator(oracle).to_gate()
+    qc = QuantumCircuit(num_qubits, name=f"grover_{num_qubits}x{iterations}")
+    qc.h(qc.qubits)
+    for _ in range(iterations):
+        qc.append(grover, qc.qubits)
+    qc.measure_all()
+    return qc
+
+
+def measure_reset_qc(num_qubits: int, num_layers: int) -> QuantumCircuit:
+    """Create layers of measurements, conditioned corrections and resets."""
+    qc = QuantumCircuit(num_qubits, num_qubits, name=f"mrc_{num_qubits}x{num_layers}")
+    for _ in range(num_layers):
+        qc.h(qc.qubits)
+        qc.measure(qc.qubits, qc.clbits)
+        for qubit, clbit in zip(qc.qubits, qc.clbits):
+            qc.x(qubit).c_if(clbit, 1)
+        qc.reset(qc.qubits)
+    return qc
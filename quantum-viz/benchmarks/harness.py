@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Helpers to time benchmarks and report their results."""
+import time
+from typing import Any
+from typing import Callable
+from typing import List
+from typing import Sequence
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> float:
+    """Return the best wall time of `repeat` calls of `func`, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def print_table(headers: Sequence[str], rows: List[Sequence[Any]]) -> None:
+    """Print the rows as a left-aligned text table."""
+    cells = [[str(cell) for cell in row] for row in [headers, *rows]]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for row in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
@@ -0,0 +1,269 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""Benchmark the parser, the serializer and the HTML generation, against a baseline.
+
+Each generated circuit is parsed by ``qiskit2dict``, serialized by ``json.dumps``,
+rendered by ``Viewer.html_str`` and written by ``utils._create_file``, sweeping the
+number of qubits, the number of gates and the recursion depth. The results are
+written as JSON, and compared with a baseline: a benchmark slower than its
+baseline by more than the tolerance fails the run.
+
+The times are compared after dividing them by the time of a fixed calibration
+workload, so a baseline recorded on one machine applies to others. The relative
+costs still depend on the versions of Python and Qiskit, so the run fails if the
+baseline was recorded with other versions, or on another architecture, unless
+``--any-environment`` is passed to compare anyway.
+
+Run with ``nox -s benchmarks``, which installs the locked versions the baseline is
+recorded with, or with ``python -m benchmarks.suite`` from the quantum-viz
+directory. Record a new baseline with ``--update-baseline``.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from functools import partial
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import qiskit
+from qiskit import QuantumCircuit
+
+from benchmarks.circuits import grover_qc
+from benchmarks.circuits import measure_reset_qc
+from benchmarks.circuits import nested_qft_qc
+from benchmarks.circuits import qft_qc
+from benchmarks.circuits import random_layered_qc
+from benchmarks.harness import measure
+from benchmarks.harness import print_table
+from quantum_viz.cache import json_cache
+from quantum_viz.qiskit_parser import qiskit2dict
+from quantum_viz.utils import _create_file
+from quantum_viz.widget import Viewer
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# The keys of a report that describe the environment it was recorded in
+ENVIRONMENT_KEYS = ("python", "qiskit", "machine")
+DEFAULT_TOLERANCE = 0.3
+# Benchmarks faster than this are dominated by noise, and are not compared
+MIN_COMPARED_SECONDS = 0.002
+
+
+def _calibrate() -> float:
+    """Time a fixed workload of dict and string operations, in seconds."""
+
+    def workload() -> None:
+        ops = [
+            {"gate": f"G{i % 7}", "targets": [{"qId": i % 5}]} for i in range(10**5)
+        ]
+        json.dumps(ops)
+
+    return measure(workload, repeat=5)
+
+
+def _cases() -> Iterator[Tuple[QuantumCircuit, Dict[str, Any]]]:
+    """Generate the circuits of the sweep, with their parameters."""
+    for num_qubits in (5, 20):
+        for num_gates in (1_000, 10_000):
+            circuit = random_layered_qc(num_qubits, num_gates)
+            for depth in (1, None):
+                yield circuit, {"max_recursion_depth": depth}
+    for num_qubits in (8, 16):
+        for depth in (2, None):
+            yield qft_qc(num_qubits), {"max_recursion_depth": depth}
+    for num_qubits in (4, 6):
+        for depth in (2, None):
+            yield grover_qc(num_qubits), {"max_recursion_depth": depth}
+    for levels in (10, 40):
+        yield nested_qft_qc(6, levels), {"max_recursion_depth": None}
+    for num_qubits in (5, 20):
+        yield measure_reset_qc(num_qubits, 100), {"max_recursion_depth": None}
+
+
+def _create_file_uncached(circuit: QuantumCircuit, path: Path, **kwargs: Any) -> Path:
+    json_cache.clear()
+    return _create_file(circuit, path, **kwargs)
+
+
+def _html_str(circuit: QuantumCircuit) -> Callable[[], str]:
+    viewer = Viewer(circuit)
+    return viewer.html_str
+
+
+def run(repeat: int = 3) -> List[Dict[str, Any]]:
+    """Run the benchmarks.
+
+    :param repeat: the number of times to run each benchmark, the best is kept
+    :return: a record of each benchmark, with its time in seconds
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir, "circuit.html")
+        for circuit, kwargs in _cases():
+            qviz_dict = qiskit2dict(circuit, **kwargs)
+            benchmarks: Dict[str, Callable[[], Any]] = {
+                "qiskit2dict": partial(qiskit2dict, circuit, **kwargs),
+                "json.dumps": partial(json.dumps, qviz_dict),
+                "create_file": partial(_create_file_uncached, circuit, path, **kwargs),
+            }
+            if kwargs["max_recursion_depth"] is None:
+                # The Viewer parses to full depth
+                benchmarks["html_str"] = _html_str(circuit)
+            for operation, func in benchmarks.items():
+                results.append(
+                    {
+                        "name": f"{circuit.name}/depth={kwargs['max_recursion_depth']}"
+                        f"/{operation}",
+                        "circuit": circuit.name,
+                        "num_qubits": circuit.num_qubits,
+                        "num_gates": len(circuit.data),
+                        "max_recursion_depth": kwargs["max_recursion_depth"],
+                        "operation": operation,
+                        "seconds": measure(func, repeat),
+                    }
+                )
+    return results
+
+
+def _get_environment() -> Dict[str, str]:
+    """Get the environment of the run, as stored in its report.
+
+    Only the minor version of Python is kept, as patch releases do not change the
+    relative costs of the benchmarks.
+    """
+    return {
+        "python": ".".join(platform.python_version_tuple()[:2]),
+        "qiskit": qiskit.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def _get_environment_mismatches(baseline: Dict[str, Any]) -> List[str]:
+    """Describe how the environment of the baseline differs from that of the run."""
+    environment = _get_environment()
+    mismatches = []
+    for key in ENVIRONMENT_KEYS:
+        value = baseline.get(key)
+        if key == "python" and value is not None:
+            value = ".".join(value.split(".")[:2])
+        if value != environment[key]:
+            mismatches.append(f"{key} {value} (now {environment[key]})")
+    return mismatches
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[Tuple[str, float]]:
+    """Compare the normalized times of the results with those of the baseline.
+
+    :param results: the results of `run`, with their normalized times
+    :param baseline: the stored report of a previous run
+    :param tolerance: the relative slowdown above which a benchmark regressed
+    :return: the names and slowdown ratios of the regressed benchmarks
+    """
+    baseline_results = {
+        result["name"]: result
+        for result in baseline["results"]
+        if result["seconds"] >= MIN_COMPARED_SECONDS
+    }
+    regressions = []
+    for result in results:
+        baseline_result = baseline_results.get(result["name"])
+        if baseline_result is None:
+            continue
+        ratio = result["normalized"] / baseline_result["normalized"]
+        if ratio > 1 + tolerance:
+            regressions.append((result["name"], ratio))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite, write its report and compare it with the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output", type=Path, help="the path to write the JSON report to"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_PATH, help="the baseline report"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="the relative slowdown above which a benchmark fails",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the report to the baseline instead of comparing with it",
+    )
+    parser.add_argument(
+        "--any-environment",
+        action="store_true",
+        help="compare with a baseline recorded in another environment, rather than "
+        "failing",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    calibration = _calibrate()
+    results = run(args.repeat)
+    for result in results:
+        result["normalized"] = result["seconds"] / calibration
+    report = {
+        **_get_environment(),
+        "calibration_seconds": calibration,
+        "results": results,
+    }
+    print_table(
+        ["benchmark", "gates", "seconds"],
+        [
+            [result["name"], result["num_gates"], f"{result['seconds']:.4f}"]
+            for result in results
+        ],
+    )
+    report_json = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(report_json)
+    if args.update_baseline:
+        args.baseline.write_text(report_json)
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --update-baseline")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    mismatches = _get_environment_mismatches(baseline)
+    if mismatches:
+        message = (
+            f"the baseline was recorded with {', '.join(mismatches)}, so the "
+            "normalized times are not comparable. Record the baseline with "
+            "nox -s benchmarks -- --update-baseline"
+        )
+        if not args.any_environment:
+            print(f"\nError: {message}, or compare anyway with --any-environment")
+            return 2
+        print(f"\nWarning: {message}")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmarks regressed by more than {args.tolerance:.0%}:"
+        )
+        print_table(
+            ["benchmark", "slowdown"],
+            [[name, f"{ratio:.2f}x"] for name, ratio in regressions],
+        )
+        return 1
+    print(f"\nNo benchmark regressed by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -153,6 +153,14 @@ def tests(session: Session) -> None:
             session.notify("coverage", posargs=[])
 
 
+@session(python="3.9")
+def benchmarks(session: Session) -> None:
+    """Run the benchmark suite and compare it with the stored baseline."""
+    args = session.posargs or ["--output", "benchmark-results.json"]
+    session.install(".[qiskit]")
+    session.run("python", "-m", "benchmarks.suite", *args)
+
+
 @session
 def coverage(session: Session) -> None:
     """Produce the coverage report."""
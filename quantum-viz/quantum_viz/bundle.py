@@ -0,0 +1,55 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module provides the quantum-viz.js bundle, for pages displayed offline.
+
+The bundle is read from the ``QUANTUM_VIZ_BUNDLE`` environment variable if it is
+set, and otherwise from the ``dist`` directory of the quantum-viz.js repository,
+which is built by ``npm run build:prod``. It is read once per process, and reused by
+every page it is inlined in.
+"""
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+# The environment variable of the path to the bundle
+BUNDLE_ENV_VAR = "QUANTUM_VIZ_BUNDLE"
+# The bundle built in the quantum-viz.js repository
+DEFAULT_BUNDLE_PATH = Path(__file__).parents[2] / "dist" / "qviz.min.js"
+
+_SCRIPT_END_PATTERN = re.compile(r"</(script)", re.IGNORECASE)
+
+
+def get_bundle_path() -> Path:
+    """Get the path of the bundle, set by the environment or the default one."""
+    path = os.environ.get(BUNDLE_ENV_VAR)
+    return DEFAULT_BUNDLE_PATH if path is None else Path(path).expanduser()
+
+
+def get_bundle(path: Union[str, Path, None] = None) -> str:
+    """Get the quantum-viz.js bundle, to be inlined in a script element.
+
+    :param path: the path to the bundle, if None - the path of `get_bundle_path`
+    :return: the source of the bundle
+    """
+    path = get_bundle_path() if path is None else Path(path).expanduser()
+    return _read_bundle(str(path.resolve()))
+
+
+@lru_cache(maxsize=None)
+def _read_bundle(path: str) -> str:
+    try:
+        source = Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"The quantum-viz.js bundle was not found at {path}. Build it with "
+            f"'npm run build:prod', or set {BUNDLE_ENV_VAR} to its path"
+        ) from None
+    # The end tag of a script element would end the element the bundle is inlined in
+    return _SCRIPT_END_PATTERN.sub(r"<\\/\1", source)
+
+
+def clear_bundle_cache() -> None:
+    """Forget the bundles read so far, to read them again when rebuilt."""
+    _read_bundle.cache_clear()
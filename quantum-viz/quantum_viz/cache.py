@@ -0,0 +1,142 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module provides a process-wide cache of serialized qviz circuits.
+
+The circuits are cached by a key of their content (see
+`quantum_viz.qiskit_parser.qiskit_circuit_key`), so displaying an unchanged circuit
+again costs only the computation of its key.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+from typing import Optional
+from typing import Union
+
+# The default maximal size of the in-memory cache, in bytes
+DEFAULT_MAX_BYTES = 64 * 2**20
+# Bump when the qviz JSON of a circuit changes, to invalidate the on-disk caches. It
+# is defined here, rather than by the parser, so that checking whether the outputs
+# of the CLI are up to date does not import Qiskit
+_CIRCUIT_KEY_VERSION = 3
+
+
+class JsonCacheInfo(NamedTuple):
+    """Statistics of a `JsonCache`."""
+
+    hits: int
+    misses: int
+    max_bytes: int
+    currbytes: int
+
+
+class JsonCache:
+    """An LRU cache of serialized circuits, bounded by their total size.
+
+    Entries evicted from memory are still found in the on-disk tier, if a
+    directory is set. The files of the directory are not removed by the cache.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        directory: Union[str, Path, None] = None,
+    ) -> None:
+        """
+        Create a JsonCache object.
+
+        :param max_bytes: the maximal total size of the JSON kept in memory, in
+          bytes, if 0 - only the on-disk tier is used
+        :param directory: the directory of the on-disk tier, if None - the cache is
+          kept in memory only
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._currbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get the JSON cached under the key, or None if it is not cached."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Cache the JSON under the key, evicting the least recently used entries."""
+        with self._lock:
+            self._store(key, value)
+        self._write(key, value)
+
+    def clear(self) -> None:
+        """Remove all the entries kept in memory."""
+        with self._lock:
+            self._entries.clear()
+            self._currbytes = 0
+
+    def info(self) -> JsonCacheInfo:
+        """Get the statistics of the cache."""
+        return JsonCacheInfo(self._hits, self._misses, self.max_bytes, self._currbytes)
+
+    def _store(self, key: str, value: str) -> None:
+        # The JSON is ASCII, with non-ASCII characters escaped, so its length is its
+        # size in bytes
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._currbytes -= len(previous)
+        self._entries[key] = value
+        self._currbytes += size
+        while self._currbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._currbytes -= len(evicted)
+
+    def _get_path(self, key: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return Path(self.directory).expanduser() / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[str]:
+        path = self._get_path(key)
+        if path is None:
+            return None
+        try:
+            return path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, value: str) -> None:
+        path = self._get_path(key)
+        if path is None or path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so that readers never see partial files
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                fp.write(value)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.remove(tmp_name)
+            raise
+
+
+# The cache of the circuits displayed by this process
+json_cache = JsonCache()
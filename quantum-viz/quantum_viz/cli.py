@@ -0,0 +1,328 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module provides the `quantum-viz` command, converting circuit files in bulk.
+
+OpenQASM 2 (``.qasm``) and QPY (``.qpy``) files are converted to qviz JSON or to
+standalone HTML files, in a pool of processes. The outputs of an input file are
+skipped if they are up to date, i.e. if they were created from the same content of
+the input file with the same options, as recorded in a manifest in their
+directory.
+"""
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import as_completed
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import click
+
+from .cache import _CIRCUIT_KEY_VERSION
+from .widget import DEFAULT_STYLE
+from .widget import Style
+
+# The suffixes of the supported circuit files
+INPUT_SUFFIXES = (".qasm", ".qpy")
+# The name of the manifest of the converted files, in each output directory
+MANIFEST_NAME = ".quantum-viz-manifest.json"
+
+
+def _find_inputs(patterns: Tuple[str, ...]) -> List[Path]:
+    """Expand the glob patterns to the circuit files, in a stable order."""
+    paths: Dict[Path, None] = {}
+    for pattern in patterns:
+        for name in sorted(glob.glob(pattern, recursive=True)) or [pattern]:
+            path = Path(name)
+            if path.suffix.lower() in INPUT_SUFFIXES and path.is_file():
+                paths[path] = None
+    return list(paths)
+
+
+def _get_output_dir(input_path: Path, output_dir: Optional[Path]) -> Path:
+    return input_path.parent if output_dir is None else output_dir
+
+
+def _check_output_names(inputs: List[Path], output_dir: Optional[Path]) -> None:
+    """Check that no two inputs are converted to outputs of the same name.
+
+    The outputs are named after the stem of their input, so inputs of the same stem,
+    e.g. from different directories converted to a single output directory, would
+    overwrite each other's outputs.
+
+    :raises click.UsageError: if two inputs would be converted to the same outputs
+    """
+    sources: Dict[Tuple[Path, str], Path] = {}
+    for input_path in inputs:
+        input_output_dir = _get_output_dir(input_path, output_dir).resolve()
+        source = input_path.resolve()
+        other = sources.setdefault((input_output_dir, input_path.stem), source)
+        if other != source:
+            raise click.UsageError(
+                f"{other} and {source} would both be converted to "
+                f"{input_output_dir / input_path.stem}.*, rename one of them or "
+                "convert them to separate output directories"
+            )
+
+
+def _get_input_key(input_path: Path, options: Dict[str, Any]) -> str:
+    """Get a hash of the content of the input file and of the conversion options."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((_CIRCUIT_KEY_VERSION, sorted(options.items()))).encode())
+    digest.update(input_path.read_bytes())
+    return digest.hexdigest()
+
+
+def _load_circuits(input_path: Path) -> List[Any]:
+    from qiskit import QuantumCircuit
+    from qiskit import qpy
+
+    if input_path.suffix.lower() == ".qpy":
+        with input_path.open("rb") as fp:
+            return list(qpy.load(fp))
+    circuit = QuantumCircuit.from_qasm_file(str(input_path))
+    # The generated names differ between loads, so the outputs would too
+    circuit.name = input_path.stem
+    return [circuit]
+
+
+def convert_file(
+    input_path: Path,
+    output_dir: Path,
+    output_format: str = "html",
+    style: str = DEFAULT_STYLE.value,
+    js_version: Optional[str] = None,
+    offline: bool = False,
+    **kwargs: Any,
+) -> Tuple[List[str], float]:
+    """Convert the circuits of a file to qviz JSON or HTML files.
+
+    A file of a single circuit is converted to a file of the same name, and the
+    circuits of a QPY file of several circuits to files suffixed by their index.
+
+    :param input_path: the OpenQASM 2 or QPY file
+    :param output_dir: the directory to write the outputs to
+    :param output_format: "json" or "html"
+    :param style: the style of the HTML outputs
+    :param js_version: the quantum-viz.js version of the HTML outputs, if None - the
+      latest version
+    :param offline: whether to inline the local quantum-viz.js bundle in the HTML
+      outputs
+    :param kwargs: the options of `QiskitCircuitParser`
+    :return: the names of the outputs, and the conversion time in seconds
+    """
+    from .qiskit_parser import qiskit2json_stream
+    from .utils import _create_file
+
+    start = time.perf_counter()
+    circuits = _load_circuits(input_path)
+    outputs = []
+    for i, circuit in enumerate(circuits):
+        stem = input_path.stem if len(circuits) == 1 else f"{input_path.stem}_{i}"
+        output_path = output_dir / f"{stem}.{output_format}"
+        if output_format == "json":
+            with output_path.open("w") as fp:
+                qiskit2json_stream(circuit, fp, **kwargs)
+        else:
+            _create_file(
+                circuit, output_path, Style(style), js_version, offline, **kwargs
+            )
+        outputs.append(output_path.name)
+    return outputs, time.perf_counter() - start
+
+
+def _read_manifest(output_dir: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads((output_dir / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(output_dir: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+    (output_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1))
+
+
+def _is_up_to_date(entry: Optional[Dict[str, Any]], key: str, output_dir: Path) -> bool:
+    return (
+        entry is not None
+        and entry["key"] == key
+        and all((output_dir / output).exists() for output in entry["outputs"])
+    )
+
+
+def _get_pending(
+    inputs: List[Path],
+    output_dir: Optional[Path],
+    options: Dict[str, Any],
+    force: bool,
+) -> Tuple[Dict[Path, Dict[str, Dict[str, Any]]], List[Tuple[Path, Path, str]]]:
+    """Get the manifests of the output directories, and the inputs to convert."""
+    manifests: Dict[Path, Dict[str, Dict[str, Any]]] = {}
+    pending: List[Tuple[Path, Path, str]] = []
+    for input_path in inputs:
+        input_output_dir = _get_output_dir(input_path, output_dir)
+        if input_output_dir not in manifests:
+            manifests[input_output_dir] = _read_manifest(input_output_dir)
+        key = _get_input_key(input_path, options)
+        entry = manifests[input_output_dir].get(str(input_path.resolve()))
+        if force or not _is_up_to_date(entry, key, input_output_dir):
+            pending.append((input_path, input_output_dir, key))
+    return manifests, pending
+
+
+def _convert_all(
+    pending: List[Tuple[Path, Path, str]],
+    jobs: Optional[int],
+    options: Dict[str, Any],
+    manifests: Dict[Path, Dict[str, Dict[str, Any]]],
+) -> Tuple[List[Tuple[float, Path]], int]:
+    """Convert the inputs in a pool of processes, recording them in the manifests.
+
+    :return: the conversion times of the inputs, and the number of failures
+    """
+    timings: List[Tuple[float, Path]] = []
+    failures = 0
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(min(jobs, max(1, len(pending)))) as executor:
+        futures: Dict[Future, Tuple[Path, Path, str]] = {
+            executor.submit(convert_file, input_path, input_output_dir, **options): (
+                input_path,
+                input_output_dir,
+                key,
+            )
+            for input_path, input_output_dir, key in pending
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            input_path, input_output_dir, key = futures[future]
+            progress = f"[{done}/{len(pending)}] {input_path}"
+            try:
+                outputs, seconds = future.result()
+            except Exception as e:
+                failures += 1
+                click.echo(f"{progress}: failed: {e}", err=True)
+                continue
+            timings.append((seconds, input_path))
+            click.echo(f"{progress} -> {', '.join(outputs)} ({seconds:.3f}s)")
+            manifests[input_output_dir][str(input_path.resolve())] = {
+                "key": key,
+                "outputs": outputs,
+                "seconds": seconds,
+            }
+
+    return timings, failures
+
+
+def _echo_summary(
+    timings: List[Tuple[float, Path]], num_skipped: int, failures: int
+) -> None:
+    total = sum(seconds for seconds, _ in timings)
+    click.echo(
+        f"Converted {len(timings)} files in {total:.3f}s of conversion time, "
+        f"skipped {num_skipped}, failed {failures}"
+    )
+    if len(timings) > 1:
+        click.echo("Slowest files:")
+        for seconds, input_path in sorted(timings, reverse=True)[:5]:
+            click.echo(f"  {seconds:.3f}s {input_path}")
+
+
+@click.command()
+@click.argument("patterns", nargs=-1, required=True)
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    help="The directory of the outputs, defaults to the directory of each input.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "html"]),
+    default="html",
+    show_default=True,
+    help="Write qviz JSON or standalone HTML files.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    help="The number of processes, defaults to the number of CPUs.",
+)
+@click.option("--precision", type=int, default=2, show_default=True)
+@click.option(
+    "--max-recursion-depth",
+    type=click.IntRange(min=1),
+    help="The depth of gate definitions to expand, defaults to all of them.",
+)
+@click.option(
+    "--style",
+    type=click.Choice([style.value for style in Style]),
+    default=DEFAULT_STYLE.value,
+    show_default=True,
+)
+@click.option("--js-version", help="The quantum-viz.js version of the HTML outputs.")
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Inline the local quantum-viz.js bundle in the HTML outputs.",
+)
+@click.option("--force", is_flag=True, help="Convert the up-to-date inputs as well.")
+def main(
+    patterns: Tuple[str, ...],
+    output_dir: Optional[Path],
+    output_format: str,
+    jobs: Optional[int],
+    precision: int,
+    max_recursion_depth: Optional[int],
+    style: str,
+    js_version: Optional[str],
+    offline: bool,
+    force: bool,
+) -> None:
+    """Convert the OpenQASM 2 and QPY files matching PATTERNS to qviz JSON or HTML.
+
+    PATTERNS are glob patterns, e.g. 'circuits/**/*.qasm'.
+    """
+    try:
+        import qiskit  # noqa: F401
+    except ImportError:
+        raise click.ClickException(
+            "Converting circuit files requires the qiskit extra, install it with "
+            "pip install quantum-viz[qiskit]"
+        ) from None
+
+    inputs = _find_inputs(patterns)
+    if not inputs:
+        raise click.UsageError("No .qasm or .qpy files match the patterns")
+    _check_output_names(inputs, output_dir)
+    if output_dir is not None:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    options: Dict[str, Any] = {
+        "output_format": output_format,
+        "style": style,
+        "js_version": js_version,
+        "offline": offline,
+        "precision": precision,
+        "max_recursion_depth": max_recursion_depth,
+    }
+
+    manifests, pending = _get_pending(inputs, output_dir, options, force)
+    num_skipped = len(inputs) - len(pending)
+    if num_skipped:
+        click.echo(f"Skipping {num_skipped} up-to-date files")
+
+    timings, failures = _convert_all(pending, jobs, options, manifests)
+    for manifest_dir, manifest in manifests.items():
+        if manifest:
+            _write_manifest(manifest_dir, manifest)
+    _echo_summary(timings, num_skipped, failures)
+    if failures:
+        raise SystemExit(1)
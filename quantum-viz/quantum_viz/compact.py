@@ -0,0 +1,298 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module provides a compact in-memory representation of qviz circuits.
+
+The operations are stored as `__slots__` records instead of dictionaries, and the
+qubit and classical bit references are shared between all the operations that use
+them. The records are converted to the qviz schema only when serialized.
+"""
+import json
+from functools import lru_cache
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+# The qviz keys of an operation, in the order they are serialized
+_KEYS = (
+    "gate",
+    "displayArgs",
+    "isMeasurement",
+    "isConditional",
+    "isControlled",
+    "controls",
+    "targets",
+    "children",
+    "conditionalRender",
+)
+_SLOTS = (
+    "gate",
+    "display_args",
+    "is_measurement",
+    "is_conditional",
+    "is_controlled",
+    "controls",
+    "targets",
+    "children",
+    "conditional_render",
+)
+_KEY_TO_SLOT = dict(zip(_KEYS, _SLOTS))
+# The separators of the serialized JSON, without the spaces of the default ones
+JSON_SEPARATORS = (",", ":")
+# Register lists are stored as tuples, which are smaller than lists
+_TUPLE_SLOTS = {"controls", "targets"}
+
+
+class Operation:
+    """A qviz operation record.
+
+    It supports the subset of the dictionary interface used to build operations,
+    with the qviz keys (e.g. ``op["displayArgs"]``). Keys outside the qviz schema
+    are kept in a dictionary that is allocated only when needed.
+    """
+
+    __slots__ = _SLOTS + ("_extra",)
+    _extra: Dict[str, Any]
+
+    def __init__(self, **items: Any) -> None:
+        """
+        Create an Operation record.
+
+        :param items: the qviz keys and values of the operation
+        """
+        for key, value in items.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, op_dict: Dict[str, Any]) -> "Operation":
+        """Create an operation record, and records of its children, from a dict."""
+        op = cls(**op_dict)
+        children = op_dict.get("children")
+        if children is not None:
+            op["children"] = [
+                child if isinstance(child, Operation) else cls.from_dict(child)
+                for child in children
+            ]
+        return op
+
+    def __getitem__(self, key: str) -> Any:
+        """Get the value of a qviz key."""
+        slot = _KEY_TO_SLOT.get(key)
+        if slot is None:
+            return getattr(self, "_extra", {})[key]
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        """Set the value of a qviz key."""
+        slot = _KEY_TO_SLOT.get(key)
+        if slot is None:
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                self._extra = {key: value}
+        elif slot in _TUPLE_SLOTS:
+            setattr(self, slot, tuple(value))
+        else:
+            setattr(self, slot, value)
+
+    def __delitem__(self, key: str) -> None:
+        """Remove a qviz key."""
+        slot = _KEY_TO_SLOT.get(key)
+        if slot is None:
+            del getattr(self, "_extra", {})[key]
+            return
+        try:
+            delattr(self, slot)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: object) -> bool:
+        """Check whether a qviz key is set."""
+        try:
+            self[key]  # type: ignore[index]
+        except KeyError:
+            return False
+        return True
+
+    def __eq__(self, other: object) -> bool:
+        """Compare with another record or with a qviz operation dictionary."""
+        if isinstance(other, Operation):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        """Represent the record by its keys, without converting its children."""
+        return f"Operation({self.to_dict(recursive=False)!r})"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get the value of the key, or `default` if it is not set."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key: str, *default: Any) -> Any:
+        """Remove the key and return its value, or `default` if it is not set."""
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over the set keys and values, in the qviz serialization order."""
+        for key, slot in zip(_KEYS, _SLOTS):
+            try:
+                yield key, getattr(self, slot)
+            except AttributeError:
+                pass
+        yield from getattr(self, "_extra", {}).items()
+
+    def keys(self) -> Iterator[str]:
+        """Iterate over the set keys, in the qviz serialization order."""
+        return (key for key, _ in self.items())
+
+    def copy(self) -> "Operation":
+        """Create a shallow copy of the record."""
+        op = Operation.__new__(Operation)
+        for slot in self.__slots__:
+            try:
+                setattr(op, slot, getattr(self, slot))
+            except AttributeError:
+                pass
+        if hasattr(op, "_extra"):
+            op._extra = dict(op._extra)
+        return op
+
+    def to_dict(self, recursive: bool = True) -> Dict[str, Any]:
+        """Convert the record to a qviz operation dictionary.
+
+        :param recursive: whether to convert the children records as well
+        :return: the qviz operation dictionary
+        """
+        op_dict = {
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in self.items()
+        }
+        if recursive and "children" in op_dict:
+            op_dict["children"] = [child.to_dict() for child in op_dict["children"]]
+        return op_dict
+
+
+def _to_json_value(obj: Any) -> Any:
+    if isinstance(obj, Operation):
+        return obj.to_dict(recursive=False)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Reused by the serializations with the default options, as `json.dumps` creates an
+# encoder for each call with other options
+_ENCODER = json.JSONEncoder(separators=JSON_SEPARATORS, default=_to_json_value)
+
+
+@lru_cache(maxsize=None)
+def _get_fragment_encoder() -> Any:
+    """Get the encoder of records, whose fragments are shared by all the circuits."""
+    from .encoder import FragmentEncoder
+
+    return FragmentEncoder()
+
+
+def _has_records(circuit: Any) -> bool:
+    """Check whether the operations of a qviz dictionary, or a list, are records.
+
+    A dictionary without operations, e.g. a table of children lists (see
+    `quantum_viz.lazy`), is checked by its first value. The first operation is
+    checked only: records are serialized faster by the fragment encoder, and
+    dictionaries by the C encoder of `json`.
+    """
+    if type(circuit) is dict:
+        if "operations" in circuit:
+            circuit = circuit["operations"]
+        else:
+            circuit = next(iter(circuit.values()), None)
+    if type(circuit) is Operation:
+        return True
+    return (
+        (type(circuit) is list or type(circuit) is tuple)
+        and len(circuit) > 0
+        and type(circuit[0]) is Operation
+    )
+
+
+class CompactCircuit:
+    """A qviz circuit whose operations are `Operation` records."""
+
+    __slots__ = ("qubits", "operations")
+
+    def __init__(self, qubits: List[Dict[str, int]], operations: List[Operation]):
+        """
+        Create a CompactCircuit object.
+
+        :param qubits: the qviz qubits of the circuit
+        :param operations: the operation records of the circuit
+        """
+        self.qubits = qubits
+        self.operations = operations
+
+    def to_dict(self) -> Dict[str, List]:
+        """Convert the circuit to a qviz dictionary."""
+        return {
+            "qubits": self.qubits,
+            "operations": [op.to_dict() for op in self.operations],
+        }
+
+    def to_json(self, **kwargs: Any) -> str:
+        """Serialize the circuit to qviz JSON.
+
+        The records are serialized from their slots by a `FragmentEncoder`, so the
+        qviz dictionary of the whole circuit is never built.
+
+        :param kwargs: keyword arguments of `json.dumps`, the separators default to
+          `JSON_SEPARATORS`
+        :return: the qviz JSON, equal to ``json.dumps(self.to_dict(), **kwargs)`` with
+          the default separators
+        """
+        if not kwargs:
+            return _get_fragment_encoder().encode(self)
+        circuit = {"qubits": self.qubits, "operations": self.operations}
+        kwargs.setdefault("separators", JSON_SEPARATORS)
+        return json.dumps(
+            circuit,
+            default=_to_json_value,
+            **kwargs,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        """Compare with another compact circuit or with a qviz dictionary."""
+        if isinstance(other, CompactCircuit):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self) -> str:
+        """Represent the circuit by its qubits."""
+        return f"CompactCircuit(qubits={self.qubits!r}, operations=...)"
+
+
+def circuit_to_json(circuit: Any, **kwargs: Any) -> str:
+    """Serialize a qviz dictionary or a `CompactCircuit` to JSON.
+
+    Dictionaries and lists may contain `Operation` records as well, and are
+    serialized by a `FragmentEncoder` if their operations are records. The
+    separators default to `JSON_SEPARATORS`.
+    """
+    if isinstance(circuit, CompactCircuit):
+        return circuit.to_json(**kwargs)
+    if not kwargs:
+        if _has_records(circuit):
+            return _get_fragment_encoder().encode(circuit)
+        return _ENCODER.encode(circuit)
+    kwargs.setdefault("separators", JSON_SEPARATORS)
+    return json.dumps(circuit, default=_to_json_value, **kwargs)
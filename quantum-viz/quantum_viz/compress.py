@@ -0,0 +1,72 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module compresses qviz JSON for embedding it in pages and notebooks.
+
+The JSON is compressed by gzip and encoded in base64, and decompressed in the
+browser by ``DecompressionStream``, with the `INFLATE_JS` function.
+"""
+import base64
+import zlib
+from typing import IO
+
+# The zlib window bits of the gzip format
+_GZIP_WBITS = 31
+# The compression level, trading some of the size for speed
+COMPRESSION_LEVEL = 6
+
+# A JavaScript function of the base64 payload, returning a promise of the JSON text
+INFLATE_JS = """function(data) {
+    const bytes = Uint8Array.from(atob(data), (c) => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream();
+    return new Response(stream.pipeThrough(new DecompressionStream('gzip'))).text();
+}"""
+
+
+def compress_json(text: str) -> str:
+    """Compress JSON by gzip, encoded in base64.
+
+    :param text: the JSON, which is ASCII
+    :return: the base64 of the compressed JSON
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, _GZIP_WBITS)
+    data = compressor.compress(text.encode()) + compressor.flush()
+    return base64.b64encode(data).decode()
+
+
+class CompressingWriter:
+    """A writer that compresses the text written to it, as `compress_json` does.
+
+    The compressed text is written to the underlying file as it is produced, and
+    completed by `close`.
+    """
+
+    def __init__(self, fp: IO[str]) -> None:
+        """
+        Create a CompressingWriter object.
+
+        :param fp: a text file object to write the base64 to
+        """
+        self.fp = fp
+        self._compressor = zlib.compressobj(
+            COMPRESSION_LEVEL, zlib.DEFLATED, _GZIP_WBITS
+        )
+        # The compressed bytes not encoded yet, as base64 encodes groups of 3 bytes
+        self._pending = b""
+
+    def write(self, text: str) -> int:
+        """Compress the text, writing the base64 of the compressed bytes so far."""
+        self._encode(self._compressor.compress(text.encode()))
+        return len(text)
+
+    def close(self) -> None:
+        """Write the rest of the compressed text."""
+        self._encode(self._compressor.flush())
+        self.fp.write(base64.b64encode(self._pending).decode())
+        self._pending = b""
+
+    def _encode(self, data: bytes) -> None:
+        data = self._pending + data
+        size = len(data) - len(data) % 3
+        self._pending = data[size:]
+        if size:
+            self.fp.write(base64.b64encode(data[:size]).decode())
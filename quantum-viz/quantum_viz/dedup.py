@@ -0,0 +1,209 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module deduplicates the repeated children of the operations of qviz circuits.
+
+Composite gates expanded many times have the same children at every call site, up
+to the registers they act on. A deduplicated circuit keeps each distinct list of
+children once, in a table of definitions in which the registers are numbered in the
+order they are first used. The operations refer to their definition by its index,
+with the qubit and classical bit IDs of the registers of the definition::
+
+    {"gate": "QFT", "targets": [...], "definition": 0, "qIds": [2, 0, 1]}
+
+Definitions refer to other definitions in the same way, with the registers of the
+outer definition. `expand_children` restores the circuit, and `EXPAND_JS` does so
+in the browser.
+"""
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from .compact import circuit_to_json
+
+# The key of the table of definitions of a circuit
+DEFINITIONS_KEY = "definitions"
+# The keys of an operation referring to the definition of its children
+DEFINITION_KEY = "definition"
+QUBIT_IDS_KEY = "qIds"
+CLBIT_IDS_KEY = "cIds"
+
+# The keys of the registers of an operation
+_REGISTER_KEYS = ("controls", "targets")
+
+# A JavaScript function expanding the definitions of a deduplicated circuit
+EXPAND_JS = """function(circuit) {
+    const defs = circuit.definitions;
+    if (defs == null) return circuit;
+    const remap = (regs, qIds, cIds) => regs.map((reg) => {
+        const mapped = Object.assign({}, reg, {qId: qIds[reg.qId]});
+        if ('cId' in reg) mapped.cId = cIds[reg.cId];
+        return mapped;
+    });
+    const expand = (ops, qIds, cIds) => ops.map((op) => {
+        const expanded = Object.assign({}, op);
+        if (qIds != null) {
+            if (op.controls) expanded.controls = remap(op.controls, qIds, cIds);
+            if (op.targets) expanded.targets = remap(op.targets, qIds, cIds);
+        }
+        if (op.definition != null) {
+            let opQIds = op.qIds;
+            let opCIds = op.cIds || [];
+            if (qIds != null) {
+                opQIds = opQIds.map((id) => qIds[id]);
+                opCIds = opCIds.map((id) => cIds[id]);
+            }
+            expanded.children = expand(defs[op.definition], opQIds, opCIds);
+            delete expanded.definition;
+            delete expanded.qIds;
+            delete expanded.cIds;
+        } else if (op.children) {
+            expanded.children = expand(op.children, qIds, cIds);
+        }
+        return expanded;
+    });
+    return {qubits: circuit.qubits, operations: expand(circuit.operations)};
+}"""
+
+# The IDs of the registers, by the IDs they are mapped from
+_IdMap = Union[Dict[int, int], Sequence[int]]
+
+
+def dedupe_children(circuit: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep each distinct list of children of the operations once, in definitions.
+
+    :param circuit: the qviz dictionary
+    :return: the deduplicated qviz dictionary, whose operations refer to the
+      definitions of their children
+    """
+    definitions: List[List[Dict[str, Any]]] = []
+    indices: Dict[str, int] = {}
+    operations: List[Dict[str, Any]] = []
+    # The children are deduplicated before their parents, with an explicit stack
+    # rather than recursion, since definitions may be nested deeper than the
+    # recursion limit. Each frame holds the operations to deduplicate, their
+    # deduplicated copies, and the operation they are the children of.
+    stack: List[Tuple[Iterator, List, Optional[Tuple[Dict, List]]]] = [
+        (iter(circuit["operations"]), operations, None)
+    ]
+    while stack:
+        ops, deduped_ops, parent = stack[-1]
+        op = next(ops, None)
+        if op is None:
+            stack.pop()
+            if parent is not None:
+                parent_op, parent_deduped_ops = parent
+                index, qubit_ids, clbit_ids = _define(deduped_ops, definitions, indices)
+                ref = dict(parent_op)
+                del ref["children"]
+                ref[DEFINITION_KEY] = index
+                ref[QUBIT_IDS_KEY] = qubit_ids
+                if clbit_ids:
+                    ref[CLBIT_IDS_KEY] = clbit_ids
+                parent_deduped_ops.append(ref)
+            continue
+        children = op.get("children")
+        if children:
+            stack.append((iter(children), [], (op, deduped_ops)))
+        else:
+            deduped_ops.append(op)
+    return {
+        "qubits": circuit["qubits"],
+        "operations": operations,
+        DEFINITIONS_KEY: definitions,
+    }
+
+
+def _define(
+    ops: List[Dict[str, Any]],
+    definitions: List[List[Dict[str, Any]]],
+    indices: Dict[str, int],
+) -> Tuple[int, List[int], List[int]]:
+    """Find or add the definition of the operations.
+
+    :return: the index of the definition, and the IDs of its qubits and classical
+      bits
+    """
+    qubit_ids: Dict[int, int] = {}
+    clbit_ids: Dict[int, int] = {}
+    for op in ops:
+        for key in _REGISTER_KEYS:
+            for reg in op.get(key, ()):
+                qubit_ids.setdefault(reg["qId"], len(qubit_ids))
+                if "cId" in reg:
+                    clbit_ids.setdefault(reg["cId"], len(clbit_ids))
+        for qubit_id in op.get(QUBIT_IDS_KEY, ()):
+            qubit_ids.setdefault(qubit_id, len(qubit_ids))
+        for clbit_id in op.get(CLBIT_IDS_KEY, ()):
+            clbit_ids.setdefault(clbit_id, len(clbit_ids))
+    definition = [_remap(op, qubit_ids, clbit_ids) for op in ops]
+    key = circuit_to_json(definition)
+    index = indices.get(key)
+    if index is None:
+        index = indices[key] = len(definitions)
+        definitions.append(definition)
+    return index, list(qubit_ids), list(clbit_ids)
+
+
+def _remap(op: Dict[str, Any], qubit_ids: _IdMap, clbit_ids: _IdMap) -> Dict[str, Any]:
+    """Copy the operation, mapping the IDs of its registers."""
+    op = dict(op)
+    for key in _REGISTER_KEYS:
+        regs = op.get(key)
+        if regs is not None:
+            op[key] = [_remap_register(reg, qubit_ids, clbit_ids) for reg in regs]
+    if QUBIT_IDS_KEY in op:
+        op[QUBIT_IDS_KEY] = [qubit_ids[i] for i in op[QUBIT_IDS_KEY]]
+    if CLBIT_IDS_KEY in op:
+        op[CLBIT_IDS_KEY] = [clbit_ids[i] for i in op[CLBIT_IDS_KEY]]
+    return op
+
+
+def _remap_register(
+    reg: Dict[str, int], qubit_ids: _IdMap, clbit_ids: _IdMap
+) -> Dict[str, int]:
+    reg = dict(reg)
+    reg["qId"] = qubit_ids[reg["qId"]]
+    if "cId" in reg:
+        reg["cId"] = clbit_ids[reg["cId"]]
+    return reg
+
+
+def expand_children(circuit: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand the definitions of a deduplicated circuit, as `EXPAND_JS` does.
+
+    :param circuit: the deduplicated qviz dictionary
+    :return: the qviz dictionary whose operations have their children
+    """
+    definitions = circuit.get(DEFINITIONS_KEY, [])
+    operations: List[Dict[str, Any]] = []
+    # Each frame holds the operations to expand, the IDs of their registers if they
+    # are from a definition, and the list of their expanded copies
+    stack: List[Tuple[List, Optional[_IdMap], Optional[_IdMap], List]] = [
+        (circuit["operations"], None, None, operations)
+    ]
+    while stack:
+        ops, qubit_ids, clbit_ids, expanded_ops = stack.pop()
+        for op in ops:
+            if qubit_ids is None or clbit_ids is None:
+                op = dict(op)
+            else:
+                op = _remap(op, qubit_ids, clbit_ids)
+            index = op.pop(DEFINITION_KEY, None)
+            if index is not None:
+                op_qubit_ids = op.pop(QUBIT_IDS_KEY)
+                op_clbit_ids = op.pop(CLBIT_IDS_KEY, [])
+                op["children"] = []
+                stack.append(
+                    (definitions[index], op_qubit_ids, op_clbit_ids, op["children"])
+                )
+            elif op.get("children"):
+                children = op["children"]
+                op["children"] = []
+                stack.append((children, qubit_ids, clbit_ids, op["children"]))
+            expanded_ops.append(op)
+    return {"qubits": circuit["qubits"], "operations": operations}
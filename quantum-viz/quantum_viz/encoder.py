@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module serializes qviz circuits by concatenating pre-encoded JSON fragments.
+
+Most of the JSON of a circuit is made of a few fragments repeated many times: the
+keys, the gate names, the display arguments and the qubit and classical bit
+references. The encoder keeps the JSON of each of them, so an `Operation` record is
+serialized by concatenating the fragments of its slots, without converting it to a
+dictionary first as `json` does.
+
+The output is equal to ``json.dumps(circuit, separators=JSON_SEPARATORS)``. Values
+outside the qviz schema (e.g. numbers) are serialized by `json` itself. Circuits of
+dictionaries are serialized faster by the C encoder of `json`, which
+`circuit_to_json` uses for them.
+"""
+from json.encoder import encode_basestring_ascii  # type: ignore[attr-defined]
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+from .compact import _ENCODER
+from .compact import _KEYS
+from .compact import _SLOTS
+from .compact import CompactCircuit
+from .compact import Operation
+
+# The ignore on the import of `encode_basestring_ascii`, the C encoder of JSON
+# strings, is because the stubs of `json.encoder` do not declare it
+# The slots of the records, with the JSON of their keys
+_SLOT_KEYS = tuple(
+    (slot, f"{encode_basestring_ascii(key)}:") for key, slot in zip(_KEYS, _SLOTS)
+)
+# The keys, and slots, whose values are lists of register references
+_REGISTER_KEYS = frozenset(("controls", "targets"))
+_MISSING = object()
+
+
+class FragmentEncoder:
+    """A JSON encoder of qviz circuits, reusing the JSON of repeated values.
+
+    The fragments are kept across calls to `encode`, up to `max_fragments` of each
+    kind, after which they are dropped and encoded again as they are used.
+    """
+
+    def __init__(self, max_fragments: int = 1 << 16) -> None:
+        """
+        Create a FragmentEncoder object.
+
+        :param max_fragments: the maximal number of strings, and of register
+          references, to keep the JSON of
+        """
+        self.max_fragments = max_fragments
+        self._strings: Dict[str, str] = {}
+        self._registers: Dict[Tuple, str] = {}
+
+    def clear(self) -> None:
+        """Drop the kept fragments."""
+        self._strings.clear()
+        self._registers.clear()
+
+    def encode(self, obj: Any) -> str:
+        """Serialize a qviz circuit, or any part of it, to JSON.
+
+        :param obj: a `CompactCircuit`, a qviz dictionary or a list of operations,
+          which may contain `Operation` records, or any other JSON value
+        :return: the JSON, equal to that of `circuit_to_json`
+        """
+        obj_type = type(obj)
+        if obj_type is Operation:
+            return self._encode_operation(obj)
+        if obj_type is str:
+            return self._encode_string(obj)
+        if obj_type is list or obj_type is tuple:
+            return f"[{','.join(map(self.encode, obj))}]"
+        if obj_type is dict:
+            return self._encode_dict(obj)
+        if obj_type is CompactCircuit:
+            return self._encode_dict(
+                {"qubits": obj.qubits, "operations": obj.operations}
+            )
+        return _ENCODER.encode(obj)
+
+    def _encode_string(self, value: str) -> str:
+        strings = self._strings
+        fragment = strings.get(value)
+        if fragment is None:
+            if len(strings) >= self.max_fragments:
+                strings.clear()
+            fragment = strings[value] = encode_basestring_ascii(value)
+        return fragment
+
+    def _encode_registers(self, registers: Any) -> str:
+        if type(registers) is not tuple and type(registers) is not list:
+            return self.encode(registers)
+        cache = self._registers
+        fragments = []
+        for register in registers:
+            try:
+                # The types tell apart the values that are equal, e.g. 1 and True
+                key = (*register.items(), *map(type, register.values()))
+                fragment = cache.get(key)
+            except (AttributeError, TypeError):
+                # Not a dictionary, or one of unhashable values
+                fragments.append(self.encode(register))
+                continue
+            if fragment is None:
+                if len(cache) >= self.max_fragments:
+                    cache.clear()
+                fragment = cache[key] = self.encode(register)
+            fragments.append(fragment)
+        return f"[{','.join(fragments)}]"
+
+    def _encode_value(self, value: Any) -> str:
+        if type(value) is str:
+            return self._encode_string(value)
+        if value is True:
+            return "true"
+        return self.encode(value)
+
+    def _encode_operation(self, op: Operation) -> str:
+        strings = self._strings
+        parts: List[str] = []
+        for slot, key_json in _SLOT_KEYS:
+            value = getattr(op, slot, _MISSING)
+            if value is _MISSING:
+                continue
+            if value is True:
+                parts.append(key_json + "true")
+            elif type(value) is str:
+                fragment = strings.get(value)
+                if fragment is None:
+                    fragment = self._encode_string(value)
+                parts.append(key_json + fragment)
+            elif slot in _REGISTER_KEYS:
+                parts.append(key_json + self._encode_registers(value))
+            else:
+                parts.append(key_json + self.encode(value))
+        extra = getattr(op, "_extra", None)
+        if extra:
+            if any(type(key) is not str for key in extra):
+                return _ENCODER.encode(op)
+            for key, value in extra.items():
+                parts.append(f"{self._encode_string(key)}:{self.encode(value)}")
+        return f"{{{','.join(parts)}}}"
+
+    def _encode_dict(self, obj: Dict) -> str:
+        parts: List[str] = []
+        for key, value in obj.items():
+            if type(key) is not str:
+                # Other keys are converted to strings by `json`
+                return _ENCODER.encode(obj)
+            if key in _REGISTER_KEYS:
+                value_json = self._encode_registers(value)
+            else:
+                value_json = self._encode_value(value)
+            parts.append(f"{self._encode_string(key)}:{value_json}")
+        return f"{{{','.join(parts)}}}"
@@ -0,0 +1,65 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+"""This module splits qviz circuits for drawing the composite operations lazily.
+
+The operations down to a given depth are drawn first, and the children of the
+composite operations at that depth are kept in a side table, to be loaded only when
+the operations are expanded. The table is keyed by the path of the operations, which
+is the ID quantum-viz.js gives them: the index of the top-level operation followed by
+the indices of its descendants, e.g. ``"0-3-1"``. Each entry holds the whole subtree
+of the children, so the deeper operations are not split again.
+"""
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+
+def split_children(
+    circuit: Dict[str, Any], depth: int = 1
+) -> Tuple[Dict[str, Any], Dict[str, List]]:
+    """Split the children of the composite operations at `depth`.
+
+    The children of classically-controlled operations are drawn as part of them, so
+    they are never split. A single top-level operation is expanded when drawn, so its
+    children are not counted in the depth.
+
+    :param circuit: the qviz circuit, whose operations may be dicts or `Operation`
+      records
+    :param depth: the number of levels of operations drawn first
+    :return: the circuit whose composite operations at `depth` have empty children,
+      and their children, which are not copied, by the path of the operations
+    """
+    if depth < 1:
+        raise ValueError(f"The depth must be at least 1, but it is {depth}")
+    operations = circuit["operations"]
+    if len(operations) == 1:
+        depth += 1
+
+    children_by_path: Dict[str, List] = {}
+    split_operations: List = []
+    # Copy the operations that have children down to `depth`, with an explicit stack
+    # rather than recursion, since conditional operations may be nested deeper than
+    # the recursion limit
+    stack = [(operations, split_operations, "", depth)]
+    while stack:
+        ops, split_ops, prefix, ops_depth = stack.pop()
+        for i, op in enumerate(ops):
+            children = op.get("children")
+            if children is None:
+                split_ops.append(op)
+                continue
+            path = f"{prefix}{i}"
+            op = op.copy()
+            if op.get("isConditional") or ops_depth > 1:
+                split_children_ops: List = []
+                op["children"] = split_children_ops
+                children_depth = ops_depth if op.get("isConditional") else ops_depth - 1
+                stack.append((children, split_children_ops, f"{path}-", children_depth))
+            else:
+                # An empty list, rather than no children, keeps the expand button
+                op["children"] = []
+                children_by_path[path] = children
+            split_ops.append(op)
+    split_circuit = {"qubits": circuit["qubits"], "operations": split_operations}
+    return split_circuit, children_by_path
@@ -1,13 +1,39 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 """This module provides methods to serialize a Qiskit circuit into a qviz dictionary."""  # noqa: B950
+import gc
+import hashlib
+import inspect
+import json
+import sys
+import time
+from collections import Counter
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from enum import IntEnum
+from functools import lru_cache
+from functools import wraps
+from itertools import chain
+from operator import attrgetter
+from operator import is_
+from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Hashable
+from typing import IO
+from typing import Iterable
 from typing import Iterator
 from typing import List
+from typing import Literal
+from typing import Mapping
+from typing import NamedTuple
 from typing import Optional
+from typing import overload
+from typing import Set
 from typing import Tuple
 from typing import Type
+from typing import TYPE_CHECKING
 from typing import Union
 
 try:
@@ -24,6 +50,7 @@ from qiskit.circuit.measure import Measure
 from qiskit.circuit.barrier import Barrier
 from qiskit.circuit.reset import Reset
 from qiskit.circuit.parameter import Parameter
+from qiskit.circuit.parameterexpression import ParameterExpression
 from qiskit.circuit.library import (
     IGate,
     XGate,
@@ -55,6 +82,15 @@ from qiskit.circuit.library import (
 )
 from qiskit.circuit.quantumcircuitdata import QuantumCircuitData
 
+from .cache import _CIRCUIT_KEY_VERSION
+from .cache import json_cache
+from .compact import circuit_to_json
+from .compact import CompactCircuit
+from .compact import Operation
+
+if TYPE_CHECKING:
+    import numpy as np
+
 INSTRUCTION_TYPE_TO_NAME: Dict[Type[Instruction], str] = {
     IGate: "I",
     XGate: "X",
@@ -90,6 +126,96 @@ X_GATE_NAME = INSTRUCTION_TYPE_TO_NAME[XGate]
 MEASURE_NAME = INSTRUCTION_TYPE_TO_NAME[Measure]
 
 
+# A handler sets the keys of the operation dictionary of an instruction, other than
+# its name, parameters, children and condition. It is called with the parser, the
+# operation dictionary, the instruction, its qargs and cargs and its depth.
+InstructionHandler = Callable[
+    ["QiskitCircuitParser", Dict, Instruction, List[Qubit], List[Clbit], int], None
+]
+
+# The handlers of the instruction types, see `register_instruction_handler`
+_INSTRUCTION_HANDLERS: Dict[Type[Instruction], InstructionHandler] = {}
+# The handler and the name of each concrete instruction type parsed so far, the
+# name is None if it is the name of the instruction
+_dispatch_cache: Dict[Type[Instruction], Tuple[InstructionHandler, Optional[str]]] = {}
+
+
+def register_instruction_handler(
+    instruction_type: Type[Instruction], handler: Optional[InstructionHandler]
+) -> None:
+    """Register the handler of an instruction type and of its subclasses.
+
+    The handler of an instruction is that of the first type of its class MRO that
+    has a registered handler. For example, a handler of a vendor-specific gate
+    class, which sets the qubits it acts on as its targets::
+
+        def handle_pulse_gate(parser, op_dict, instruction, qargs, cargs, depth):
+            op_dict["targets"] = parser.get_qubit_refs(qargs)
+
+        register_instruction_handler(PulseGate, handle_pulse_gate)
+
+    :param instruction_type: the instruction class
+    :param handler: the handler, if None - the registered handler is removed
+    """
+    if handler is None:
+        _INSTRUCTION_HANDLERS.pop(instruction_type, None)
+    else:
+        _INSTRUCTION_HANDLERS[instruction_type] = handler
+    _dispatch_cache.clear()
+
+
+# The defining class of each instruction type looked up so far, see
+# `_get_defining_type`
+_defining_types: Dict[Type[Instruction], Type[Instruction]] = {}
+
+
+def _get_defining_type(instruction_type: Type[Instruction]) -> Type[Instruction]:
+    """Get the class that defines an instruction type, i.e. its name and definition.
+
+    The singleton classes of the standard gates, created by qiskit-terra 0.45 and
+    later, have no module, and are defined by the first class in their MRO that has
+    one.
+    """
+    try:
+        return _defining_types[instruction_type]
+    except KeyError:
+        pass
+    defining_type = next(
+        (cls for cls in instruction_type.__mro__ if getattr(cls, "__module__", None)),
+        instruction_type,
+    )
+    _defining_types[instruction_type] = defining_type
+    return defining_type
+
+
+def _resolve_instruction_type(
+    instruction_type: Type[Instruction],
+) -> Tuple[InstructionHandler, Optional[str]]:
+    """Resolve the handler and the name of a concrete instruction type, cached."""
+    try:
+        return _dispatch_cache[instruction_type]
+    except KeyError:
+        pass
+    handler = next(
+        _INSTRUCTION_HANDLERS[cls]
+        for cls in instruction_type.__mro__
+        if cls in _INSTRUCTION_HANDLERS
+    )
+    resolved = handler, INSTRUCTION_TYPE_TO_NAME.get(_get_defining_type(instruction_type))
+    _dispatch_cache[instruction_type] = resolved
+    return resolved
+
+
+# How an instruction is parsed by the bulk parser of flat circuits, as plain ints
+# which are compared faster than IntEnum members
+_FLAT_GATE = 0
+_FLAT_GATE_WITH_PARAMS = 1
+_FLAT_CONTROLLED_GATE = 2
+_FLAT_BARRIER = 3
+# Parsed by `QiskitCircuitParser._parse_operation`
+_FLAT_OTHER = 4
+
+
 class RegisterType(IntEnum):  # noqa: D101
     QUBIT = 0
     CLASSICAL = 1
@@ -102,11 +228,471 @@ class ConditionalRender(IntEnum):  # noqa: D101
     AS_GROUP = 3
 
 
-def qiskit2dict(circ: QuantumCircuit, **kwargs) -> Dict[str, List]:
-    """Convert a Qiskit circuit to a qviz dictionary."""
+class CacheInfo(NamedTuple):
+    """Statistics of the definitions cache of a `QiskitCircuitParser`."""
+
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class _LRUCache:
+    """A mapping bounded to `maxsize` entries, evicting the least recently used."""
+
+    def __init__(self, maxsize: Optional[int]) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+def _remap_operations(
+    operations: List[Dict],
+    qubit_ids: Mapping[int, int],
+    get_qubit_def: Callable[[int], Dict[str, int]],
+) -> List[Dict]:
+    """Copy the operations, replacing every qubit id `i` with `qubit_ids[i]`.
+
+    The qubit references of the copies are created with `get_qubit_def`.
+    """
+    remapped: List[Dict] = []
+    # Pairs of operation lists and the lists their copies are appended to
+    stack = [(operations, remapped)]
+    while stack:
+        source, target = stack.pop()
+        for op in source:
+            op = op.copy()
+            for key in ("controls", "targets"):
+                if key in op:
+                    op[key] = [get_qubit_def(qubit_ids[ref["qId"]]) for ref in op[key]]
+            if "children" in op:
+                children: List[Dict] = []
+                stack.append((op["children"], children))
+                op["children"] = children
+            target.append(op)
+    return remapped
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector.
+
+    Creating many operations triggers full collections, which traverse the whole
+    circuit being parsed as well. The operations do not form reference cycles.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+# The maximal number of formatted parameter lists to reuse across gates
+_PARAMS_CACHE_SIZE = 1024
+
+
+def _format_param(
+    param: Union[int, float, complex, ParameterExpression], precision: int
+) -> str:
+    if isinstance(param, ParameterExpression) and not param.parameters:
+        # a bound expression is displayed as its numeric value
+        value = complex(param)
+        param = value.real if value.imag == 0 else value
+    if isinstance(param, (float, complex)):
+        return f"{param:.{precision}f}"
+    return str(param)
+
+
+def _format_params(params: Iterable, precision: int) -> str:
+    return f"({', '.join(_format_param(param, precision) for param in params)})"
+
+
+@lru_cache(maxsize=_PARAMS_CACHE_SIZE, typed=True)
+def _format_params_cached(precision: int, *params: Any) -> str:
+    """Format parameters, memoized by their values, types and the precision."""
+    return _format_params(params, precision)
+
+
+# The parser of the top-level instructions in a worker process of a parallel parse
+_worker_parser: Optional["QiskitCircuitParser"] = None
+
+
+def _init_parse_worker(circuit: QuantumCircuit, options: Dict[str, Any]) -> None:
+    """Create the parser of a worker process, which parses nothing until asked."""
+    global _worker_parser
+    parser = _OperationsParser(circuit, **options)
+    parser._clbit_indices = {clbit: i for i, clbit in enumerate(circuit.clbits)}
+    _worker_parser = parser
+
+
+def _parse_in_worker(index: int) -> Tuple[Dict, List[Tuple[int, Optional[int], Dict]]]:
+    if _worker_parser is None:
+        raise RuntimeError("The parser of the worker process was not initialized")
+    return _worker_parser._parse_top_level_instruction(index)
+
+
+def _unpack_instruction(item: Any) -> Tuple[Instruction, List[Qubit], List[Clbit]]:
+    """Unpack an item of `QuantumCircuit.data` into its instruction and args."""
+    operation = getattr(item, "operation", None)
+    if operation is None:
+        return item
+    # Unpacking a `CircuitInstruction` as a tuple caches a copy of its args on it,
+    # so read its fields instead
+    return operation, item.qubits, item.clbits
+
+
+def _get_data_state(data: Iterable[Any]) -> List[Tuple]:
+    """Get the objects of each item of circuit data that its parse depends on.
+
+    They are the item, its instruction, the condition and the parameters of the
+    instruction, so comparing them by identity detects the instructions modified in
+    place (e.g. by `c_if` or `assign_parameters`) as well as the replaced ones.
+    """
+    state = []
+    for item in data:
+        instruction = _unpack_instruction(item)[0]
+        state.append((item, instruction, instruction.condition, *instruction.params))
+    return state
+
+
+def _is_same_state(state: List[Tuple], other: List[Tuple]) -> bool:
+    """Check whether two states of circuit data hold the same objects."""
+    return len(state) == len(other) and all(
+        len(item_state) == len(other_item_state)
+        and all(map(is_, item_state, other_item_state))
+        for item_state, other_item_state in zip(state, other)
+    )
+
+
+class _Frame(NamedTuple):
+    """An operation whose children are being parsed by the iterative engine."""
+
+    op_dict: Dict
+    instruction: Instruction
+    qargs: List[Qubit]
+    depth: int
+    key: Optional[Hashable]
+    num_clbit_defs: int
+    sub_operations: Iterator[Tuple[Instruction, List[Qubit], List[Clbit]]]
+    children: List[Dict]
+    siblings: List[Dict]
+
+
+@overload
+def qiskit2dict(
+    circ: QuantumCircuit, return_stats: Literal[False] = ..., **kwargs
+) -> Dict[str, List]:
+    ...
+
+
+@overload
+def qiskit2dict(
+    circ: QuantumCircuit, return_stats: Literal[True], **kwargs
+) -> Tuple[Dict[str, List], "ParserStats"]:
+    ...
+
+
+def qiskit2dict(
+    circ: QuantumCircuit, return_stats: bool = False, **kwargs
+) -> Union[Dict[str, List], Tuple[Dict[str, List], "ParserStats"]]:
+    """Convert a Qiskit circuit to a qviz dictionary.
+
+    :param circ: the circuit
+    :param return_stats: whether to profile the parse, see `ProfilingCircuitParser`
+    :param kwargs: the options of `QiskitCircuitParser`
+    :return: the qviz dictionary, and the stats of the parse if `return_stats`
+    """
+    if return_stats:
+        parser = ProfilingCircuitParser(circ, **kwargs)
+        return parser.qviz_dict, parser.stats
     return QiskitCircuitParser(circ, **kwargs).qviz_dict
 
 
+def qiskit2ops(
+    circ: QuantumCircuit, chunk_size: int = 256, **kwargs
+) -> Tuple[List[Dict[str, int]], Iterator[Dict]]:
+    """Convert a Qiskit circuit to qviz operations, parsed as they are iterated.
+
+    The operations are those of the instructions of the circuit, i.e. the children of
+    the operation of the circuit in the output of `qiskit2dict`, in program order.
+
+    :param circ: the circuit
+    :param chunk_size: the number of instructions parsed at once
+    :param kwargs: the options of `QiskitCircuitParser`
+    :return: the qviz qubits, which count the classical bits of the operations
+      yielded so far, and an iterator of the operations
+    """
+    parser = _OperationsParser(circ, **kwargs)
+    operations = parser.iter_operations(chunk_size)
+    return parser.qubits, operations
+
+
+def qiskit2compact(circ: QuantumCircuit, **kwargs) -> CompactCircuit:
+    """Convert a Qiskit circuit to a compact qviz circuit of operation records."""
+    return QiskitCircuitParser(circ, compact=True, **kwargs).compact_circuit
+
+
+def qiskit2json(circ: QuantumCircuit, **kwargs) -> str:
+    """Convert a Qiskit circuit to qviz JSON.
+
+    The JSON is looked up in the process-wide `json_cache` by the content of the
+    circuit first, so converting an unchanged circuit again does not parse it.
+    """
+    key = qiskit_circuit_key(circ, **kwargs)
+    qviz_json = json_cache.get(key)
+    if qviz_json is None:
+        qviz_json = QiskitCircuitParser(circ, **kwargs).to_json()
+        json_cache.put(key, qviz_json)
+    return qviz_json
+
+
+# The parser options that change the qviz JSON of a circuit
+_OUTPUT_OPTIONS = ("precision", "max_recursion_depth", "skip_barriers")
+# The parameter types which are hashed by their repr
+_PLAIN_PARAM_TYPES = {int, float, complex, str}
+# The package of the standard gates, whose definitions are determined by their
+# type, parameters and number of qubits
+_STANDARD_GATES_PACKAGE = "qiskit.circuit.library.standard_gates."
+
+
+def _is_standard_gate_type(instruction_type: Type[Instruction]) -> bool:
+    """Whether the instruction type is one of the standard gates."""
+    module = _get_defining_type(instruction_type).__module__
+    return module.startswith(_STANDARD_GATES_PACKAGE)
+
+
+def qiskit_circuit_key(circ: QuantumCircuit, **kwargs) -> str:
+    """Get a key of the qviz JSON of a Qiskit circuit, computed from its content.
+
+    Circuits with equal instructions, qubits and classical bits get equal keys,
+    as well as equal definitions of the instructions other than the standard
+    gates, up to the parsed depth. Computing the
+    key is cheaper than parsing the circuit.
+
+    :param circ: the circuit
+    :param kwargs: the options of `QiskitCircuitParser`, only those which change
+      the qviz JSON are part of the key
+    :return: the key, a hex digest
+    """
+    options = {
+        name: kwargs.get(name, _get_option_default(name)) for name in _OUTPUT_OPTIONS
+    }
+    handlers = sorted(
+        (_get_qualified_name(instruction_type), _get_qualified_name(handler))
+        for instruction_type, handler in _INSTRUCTION_HANDLERS.items()
+    )
+    digest = hashlib.blake2b(digest_size=20)
+    header = (
+        _CIRCUIT_KEY_VERSION,
+        qiskit.__version__,
+        sorted(options.items()),
+        handlers,
+    )
+    digest.update(repr(header).encode())
+    with _gc_paused():
+        digest.update(_hash_circuit(circ, options["max_recursion_depth"], {}))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _get_option_default(name: str) -> Any:
+    return inspect.signature(QiskitCircuitParser).parameters[name].default
+
+
+def _get_qualified_name(obj: Callable) -> str:
+    return f"{obj.__module__}.{obj.__qualname__}"
+
+
+def _hash_circuit(
+    circ: QuantumCircuit,
+    max_recursion_depth: Optional[int],
+    memo: Dict[int, Tuple[QuantumCircuit, bytes]],
+) -> bytes:
+    """Hash the content of a circuit that determines its qviz JSON.
+
+    The instructions are hashed by columns, e.g. the names of all the instructions
+    and then all their qubits, which is cheaper than hashing them one at a time.
+
+    :param circ: the circuit
+    :param max_recursion_depth: the remaining depth of the definitions to hash
+    :param memo: the definitions hashed so far and their digests, by their id
+    :return: the digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((circ.name, circ.num_qubits, circ.num_clbits)).encode())
+    data = circ.data[:]
+    if not data:
+        return digest.digest()
+    gates, qargs, cargs = zip(*map(_unpack_instruction, data))
+    gate_types = list(map(type, gates))
+    type_codes: Dict[Type[Instruction], int] = {
+        gate_type: code for code, gate_type in enumerate(dict.fromkeys(gate_types))
+    }
+    qubit_ids = {qubit: i for i, qubit in enumerate(circ.qubits)}
+    clbit_ids = {clbit: i for i, clbit in enumerate(circ.clbits)}
+
+    params = list(map(attrgetter("params"), gates))
+    if not _PLAIN_PARAM_TYPES.issuperset(map(type, chain.from_iterable(params))):
+        params = [list(map(_get_param_token, gate_params)) for gate_params in params]
+    columns = [
+        list(map(_get_qualified_name, type_codes)),
+        list(map(type_codes.__getitem__, gate_types)),
+        list(map(attrgetter("name"), gates)),
+        params,
+        list(map(len, qargs)),
+        list(map(qubit_ids.__getitem__, chain.from_iterable(qargs))),
+        list(map(len, cargs)),
+        list(map(clbit_ids.__getitem__, chain.from_iterable(cargs))),
+    ]
+    conditions = list(map(attrgetter("condition"), gates))
+    if any(conditions):
+        columns.append(
+            [
+                (i, _get_condition_token(condition, clbit_ids))
+                for i, condition in enumerate(conditions)
+                if condition
+            ]
+        )
+
+    # The definitions of the standard gates are determined by their type and
+    # parameters, those of the other types are hashed, as the parser caches them
+    # by the same rule (see `QiskitCircuitParser._get_definition_owner`)
+    defined_types = {
+        gate_type for gate_type in type_codes if not _is_standard_gate_type(gate_type)
+    }
+    columns.extend(_get_controlled_columns(gates, gate_types, defined_types))
+    if max_recursion_depth is None or max_recursion_depth > 1:
+        columns.append(
+            _hash_definitions(
+                gates, gate_types, defined_types, max_recursion_depth, memo
+            )
+        )
+
+    for column in columns:
+        digest.update(repr(column).encode())
+    return digest.digest()
+
+
+def _get_controlled_columns(
+    gates: Tuple[Instruction, ...],
+    gate_types: List[Type[Instruction]],
+    defined_types: Set[Type[Instruction]],
+) -> List[List[Any]]:
+    """Get the control states and base gates of the controlled instructions."""
+    controlled_types = {
+        gate_type
+        for gate_type in defined_types.union(gate_types)
+        if issubclass(gate_type, ControlledGate)
+    }
+    if not controlled_types:
+        return []
+    controlled = [
+        i for i, gate_type in enumerate(gate_types) if gate_type in controlled_types
+    ]
+    controlled_gates = list(map(gates.__getitem__, controlled))
+    ctrl_states = list(
+        map(attrgetter("num_ctrl_qubits", "ctrl_state"), controlled_gates)
+    )
+    base_gates = [
+        (i, _get_qualified_name(type(gates[i].base_gate)), gates[i].base_gate.name)
+        for i in controlled
+        if gate_types[i] in defined_types
+    ]
+    return [controlled, ctrl_states, base_gates]
+
+
+def _hash_definitions(
+    gates: Tuple[Instruction, ...],
+    gate_types: List[Type[Instruction]],
+    defined_types: Set[Type[Instruction]],
+    max_recursion_depth: Optional[int],
+    memo: Dict[int, Tuple[QuantumCircuit, bytes]],
+) -> List[Tuple[int, bytes]]:
+    """Hash the definitions of the instructions other than the standard gates."""
+    sub_depth = None if max_recursion_depth is None else max_recursion_depth - 1
+    indices = [
+        i for i, gate_type in enumerate(gate_types) if gate_type in defined_types
+    ]
+    # The definitions set already, e.g. by the user, are read without the overhead
+    # of the `definition` property
+    owners = map(attrgetter("_definition"), map(gates.__getitem__, indices))
+    definitions = []
+    for i, owner in zip(indices, owners):
+        if owner is None:
+            owner = QiskitCircuitParser._get_definition_owner(gates[i])
+        if owner is None:
+            base_gate = getattr(gates[i], "base_gate", None)
+            if base_gate is None:
+                continue
+            owner = QiskitCircuitParser._get_definition_owner(base_gate)
+            if owner is None:
+                continue
+        if id(owner) not in memo:
+            # The definition is kept alive by the memo, as a synthesized one may be
+            # a temporary object whose id would be reused
+            memo[id(owner)] = (owner, _hash_circuit(owner, sub_depth, memo))
+        definitions.append((i, memo[id(owner)][1]))
+    return definitions
+
+
+def _get_condition_token(
+    condition: Tuple[Union[ClassicalRegister, Clbit], int], clbit_ids: Dict[Clbit, int]
+) -> Tuple[Any, int]:
+    classical, value = condition
+    if isinstance(classical, ClassicalRegister):
+        return [clbit_ids[clbit] for clbit in classical], value
+    return clbit_ids[classical], value
+
+
+def _get_param_token(param: Any) -> Any:
+    """Get a hashable representation of a gate parameter, by its displayed value."""
+    if type(param) in _PLAIN_PARAM_TYPES:
+        return param
+    # An array parameter can only exist once NumPy is imported
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(param, numpy.ndarray):
+        data = numpy.ascontiguousarray(param).tobytes()
+        data_digest = hashlib.blake2b(data).hexdigest()
+        return ("ndarray", param.dtype.str, param.shape, data_digest)
+    if isinstance(param, ParameterExpression):
+        return ("ParameterExpression", _format_param(param, 17))
+    return repr(param)
+
+
+def qiskit2json_stream(circ: QuantumCircuit, fp: IO[str], **kwargs) -> None:
+    """Convert a Qiskit circuit to qviz JSON, written incrementally to `fp`.
+
+    The written JSON parses to the same dictionary as `qiskit2dict` returns.
+    Operations are written as they are parsed, so the memory used does not grow
+    with the number of operations in the circuit.
+    """
+    QiskitJsonStreamWriter(circ, fp, **kwargs)
+
+
 class QiskitCircuitParser:
     """This class parses a Qiskit circuit into a qviz dictionary."""
 
@@ -119,6 +705,11 @@ class QiskitCircuitParser:
         precision: int = 2,
         max_recursion_depth: Optional[int] = None,
         skip_barriers: bool = True,
+        definition_cache_size: Optional[int] = 128,
+        iterative: bool = False,
+        compact: bool = False,
+        share_references: bool = True,
+        workers: Optional[int] = None,
     ) -> None:
         """
         Create a QiskitCircuitParser object.
@@ -128,11 +719,44 @@ class QiskitCircuitParser:
         :param max_recursion_depth: the maximal recursion depth to parse, if None -
           parse until the basis gates are reached
         :param skip_barriers: whether to omit barriers in the output or not
+        :param definition_cache_size: the maximal number of parsed gate definitions
+          to reuse across occurrences of the same gate, if None - unbounded, if 0 -
+          the cache is disabled
+        :param iterative: whether to parse nested definitions with an explicit stack
+          instead of recursion, which is not limited by the Python recursion limit
+        :param compact: whether to create the operations as `Operation` records,
+          instead of dictionaries
+        :param share_references: whether all the operations should share a single
+          reference dictionary per qubit and per classical bit, set to False if the
+          output is mutated. Always True when `compact` is True
+        :param workers: the number of processes to parse the top-level instructions
+          in, if None or 1 - they are parsed in this process. Worth it for circuits
+          of costly composite gates, whose definitions take long to build. The
+          references are then shared within each top-level operation only
         """
         self.qc = circuit
         self.precision = precision
         self.max_recursion_depth = max_recursion_depth
         self.skip_barriers = skip_barriers
+        self.iterative = iterative
+        self.compact = compact
+        self.share_references = share_references or compact
+        self.workers = workers
+        self._definition_cache = _LRUCache(definition_cache_size)
+        # The worker processes of the parse in progress, see `_worker_pool`
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # The classical bit references to create in the parent process, in program
+        # order, when parsing in a worker process (see `_defer_clbit_def`)
+        self._clbit_log: Optional[List[Tuple[int, Optional[int], Dict]]] = None
+        self._clbit_indices: Dict[Clbit, int] = dict()
+        self._new_clbit_keys: Dict[Clbit, int] = dict()
+        self._init_state()
+        self._update_qviz_dict()
+
+    def _init_state(self) -> None:
+        # The number of classical bit references created so far. Subtrees that
+        # reference classical bits depend on the parser state and are not cached.
+        self._num_clbit_defs = 0
         self.qviz_dict: Dict[str, List] = {
             self.QUBITS_KEY: [],
             self.OPERATIONS_KEY: [],
@@ -140,12 +764,115 @@ class QiskitCircuitParser:
         self.qubit2id: Dict[Qubit, int] = dict()
         self._init_qubits()
         self._clbit2id: Dict[Clbit, Tuple[int, int]] = dict()
-        self._update_qviz_dict()
+        self._clbit_defs: Optional[Dict[Clbit, Dict[str, int]]] = (
+            dict() if self.share_references else None
+        )
+        # The state of the circuit data parsed so far, see `update`
+        self._parsed_state: List[Tuple] = []
+        # The JSON of the top-level operations serialized so far, see `to_json`
+        self._children_json: List[str] = []
+        self._num_serialized_children = 0
+
+    def update(self) -> Dict[str, List]:
+        """Parse the instructions appended to the circuit since it was last parsed.
+
+        The circuit is parsed again from scratch if it changed otherwise, i.e. if
+        instructions were removed, replaced or modified in place (their condition or
+        parameters), or qubits were added.
+
+        :return: the updated qviz dictionary
+        """
+        qc = self.qc
+        num_parsed = len(self._parsed_state)
+        if (
+            qc.num_qubits != len(self.qubit2id)
+            or len(qc.data) < num_parsed
+            or not _is_same_state(
+                _get_data_state(qc.data[:num_parsed]), self._parsed_state
+            )
+        ):
+            self._init_state()
+            self._update_qviz_dict()
+            return self.qviz_dict
+        new_data = qc.data[num_parsed:]
+        root = self.operations[0]
+        root["gate"] = qc.name
+        with self._worker_pool(len(new_data)):
+            children = self._parse_top_level_operations(new_data, start=num_parsed)
+        if children:
+            if "children" in root:
+                root["children"].extend(children)
+            else:
+                root["children"] = children
+        self._parsed_state += _get_data_state(new_data)
+        return self.qviz_dict
+
+    def to_json(self) -> str:
+        """Serialize the qviz dictionary to JSON.
+
+        The top-level operations are serialized once, and their JSON is reused by
+        the next calls, after `update` parsed more of them. The operations should
+        therefore not be modified after they are serialized.
+
+        :return: the qviz JSON, equal to ``circuit_to_json(self.qviz_dict)``
+        """
+        root = self.operations[0]
+        if "children" not in root:
+            return circuit_to_json(self.qviz_dict)
+        children = root["children"]
+        if len(children) < self._num_serialized_children:
+            self._children_json = []
+            self._num_serialized_children = 0
+        if len(children) > self._num_serialized_children:
+            new_children = children[self._num_serialized_children :]
+            self._children_json.append(circuit_to_json(new_children)[1:-1])
+            self._num_serialized_children = len(children)
+        root_json = circuit_to_json(
+            {key: value for key, value in root.items() if key != "children"}
+        )
+        children_json = ",".join(self._children_json)
+        return (
+            f"{{{json.dumps(self.QUBITS_KEY)}:{circuit_to_json(self.qubits)},"
+            f"{json.dumps(self.OPERATIONS_KEY)}:"
+            f'[{root_json[:-1]},"children":[{children_json}]}}]}}'
+        )
+
+    def iter_operations(self, chunk_size: int = 256) -> Iterator[Dict]:
+        """Parse the circuit again, yielding its operations as they are parsed.
+
+        The operations are those of the instructions of the circuit, i.e. the
+        children of the operation of the circuit in `qviz_dict`, in program order.
+        They are not kept by the parser, whose state is reset: `qviz_dict` holds no
+        operations, and its qubits count the classical bits of the operations
+        yielded so far, as `numChildren`.
+
+        :param chunk_size: the number of instructions parsed at once, e.g. in bulk
+          when `max_recursion_depth` is 1
+        :return: an iterator of the operations
+        """
+        if chunk_size < 1:
+            raise ValueError(
+                f"The chunk size must be at least 1, but it is {chunk_size}"
+            )
+        self._init_state()
+        return self._iter_operations(self.qc.data[:], chunk_size)
+
+    def _iter_operations(self, data: List, chunk_size: int) -> Iterator[Dict]:
+        with self._worker_pool(len(data)):
+            for start in range(0, len(data), chunk_size):
+                yield from self._parse_top_level_operations(
+                    data[start : start + chunk_size], start
+                )
 
     def _init_qubits(self) -> None:
         qubits_range = range(self.qc.num_qubits)
         self.qubit2id = dict(zip(self.qc.qubits, qubits_range))
         self.qubits = [{"id": i} for i in qubits_range]
+        self._qubit_defs: Optional[List[Dict[str, int]]] = None
+        self._qubit2def: Optional[Dict[Qubit, Dict[str, int]]] = None
+        if self.share_references:
+            self._qubit_defs = [{"qId": i} for i in qubits_range]
+            self._qubit2def = dict(zip(self.qc.qubits, self._qubit_defs))
 
     @property
     def qubits(self) -> List[Dict[str, int]]:
@@ -166,15 +893,49 @@ class QiskitCircuitParser:
     def operations(self, value: List[Dict]) -> None:
         self.qviz_dict[self.OPERATIONS_KEY] = value
 
+    @property
+    def definition_cache_info(self) -> CacheInfo:
+        """Get the hits, misses and size of the gate definitions cache."""
+        return self._definition_cache.info()
+
+    @property
+    def compact_circuit(self) -> CompactCircuit:
+        """Get the parsed circuit as a `CompactCircuit`."""
+        operations: List[Operation] = [
+            op if isinstance(op, Operation) else Operation.from_dict(op)
+            for op in self.operations
+        ]
+        return CompactCircuit(self.qubits, operations)
+
+    def _make_op(self, op_dict: Dict) -> Dict:
+        """Convert a new operation dictionary to a record in compact mode."""
+        if self.compact:
+            return Operation.from_dict(op_dict)  # type: ignore[return-value]
+        return op_dict
+
     def _get_qubit_def(self, qubit: Qubit) -> Dict[str, int]:
-        return {"qId": self.qubit2id[qubit]}
+        if self._qubit2def is None:
+            return {"qId": self.qubit2id[qubit]}
+        return self._qubit2def[qubit]
+
+    def _get_qubit_def_by_id(self, q_id: int) -> Dict[str, int]:
+        if self._qubit_defs is None:
+            return {"qId": q_id}
+        return self._qubit_defs[q_id]
 
     def _get_qubit_list_def(self, qubits: List[Qubit]) -> List[Dict[str, int]]:
-        return [self._get_qubit_def(qubit) for qubit in qubits]
+        if self._qubit2def is None:
+            return [{"qId": self.qubit2id[qubit]} for qubit in qubits]
+        return list(map(self._qubit2def.__getitem__, qubits))
 
     def _get_clbit_def(
         self, clbit: Clbit, qubit: Optional[Qubit] = None
     ) -> Dict[str, int]:
+        self._num_clbit_defs += 1
+        if self._clbit_defs is not None and clbit in self._clbit_defs:
+            return self._clbit_defs[clbit]
+        if self._clbit_log is not None:
+            return self._defer_clbit_def(clbit, qubit)
         if clbit in self._clbit2id:
             q_id, c_id = self._clbit2id[clbit]
         else:
@@ -187,26 +948,334 @@ class QiskitCircuitParser:
             c_id = self.qubits[q_id].get("numChildren", 0)
             self.qubits[q_id]["numChildren"] = c_id + 1
             self._clbit2id[clbit] = (q_id, c_id)
-        return {"type": RegisterType.CLASSICAL.value, "qId": q_id, "cId": c_id}
+        clbit_def = {"type": RegisterType.CLASSICAL.value, "qId": q_id, "cId": c_id}
+        if self._clbit_defs is not None:
+            self._clbit_defs[clbit] = clbit_def
+        return clbit_def
+
+    def _defer_clbit_def(
+        self, clbit: Clbit, qubit: Optional[Qubit] = None
+    ) -> Dict[str, int]:
+        """Get an empty classical bit reference, set later in the parent process.
+
+        The classical bit ids are assigned in the order the bits are referenced, so
+        the references are created by the parent process in program order.
+        """
+        # the index of the classical bit in the circuit, or a negative key of a
+        # classical bit created by the parser (i.e. by a reset)
+        key = self._clbit_indices.get(clbit)
+        if key is None:
+            key = self._new_clbit_keys.setdefault(clbit, -len(self._new_clbit_keys) - 1)
+        q_id = None if qubit is None else self.qubit2id[qubit]
+        clbit_def: Dict[str, int] = {}
+        self._clbit_log.append((key, q_id, clbit_def))  # type: ignore[union-attr]
+        if self._clbit_defs is not None:
+            self._clbit_defs[clbit] = clbit_def
+        return clbit_def
 
     def _update_qviz_dict(self) -> None:
         qc = self.qc
         self.operations += [
-            {
-                "gate": qc.name,
-                "targets": self._get_qubit_list_def(qc.qubits),
-            }
+            self._make_op(
+                {
+                    "gate": qc.name,
+                    "targets": self._get_qubit_list_def(qc.qubits),
+                }
+            )
         ]
-        for instruction, qargs, cargs in self._filter_circuit_data(qc.data):
-            self.operations[0]["children"] = self.operations[0].get("children", []) + [
+        data = qc.data[:]
+        with self._worker_pool(len(data)):
+            children = self._parse_top_level_operations(data)
+        if children:
+            self.operations[0]["children"] = children
+        self._parsed_state = _get_data_state(data)
+
+    @contextmanager
+    def _worker_pool(self, num_instructions: int) -> Iterator[None]:
+        """Start the worker processes of a parse, if any, shared by all its chunks.
+
+        The workers are sent the circuit and the parser options once, when they
+        start, and then only the indices of the instructions to parse.
+
+        :param num_instructions: the number of top-level instructions to parse
+        """
+        if (
+            self.workers is None
+            or self.workers <= 1
+            or self.max_recursion_depth == 1
+            or num_instructions == 0
+        ):
+            yield
+            return
+        executor = ProcessPoolExecutor(
+            min(self.workers, num_instructions),
+            initializer=_init_parse_worker,
+            initargs=(self.qc, self._get_worker_options()),
+        )
+        self._executor = executor
+        try:
+            yield
+        finally:
+            self._executor = None
+            executor.shutdown()
+
+    def _get_worker_options(self) -> Dict[str, Any]:
+        """Get the options of the parsers of the worker processes."""
+        return {
+            "precision": self.precision,
+            "max_recursion_depth": self.max_recursion_depth,
+            "skip_barriers": self.skip_barriers,
+            "definition_cache_size": self._definition_cache.maxsize,
+            "iterative": self.iterative,
+            "compact": self.compact,
+            "share_references": self.share_references,
+        }
+
+    def _parse_top_level_operations(self, data: List, start: int = 0) -> List[Dict]:
+        """Parse top-level instructions.
+
+        :param data: the items of the circuit data to parse
+        :param start: the index of the first item in the circuit data
+        :return: the operations
+        """
+        if self.max_recursion_depth == 1:
+            return self._parse_flat_operations(data)
+        if self._executor is not None:
+            return self._parse_operations_in_workers(self._executor, data, start)
+        if self.iterative:
+            parse_operation = self._parse_operation_iteratively
+        else:
+            parse_operation = self._parse_operation
+        return [
+            parse_operation(instruction, qargs, cargs, depth=1)
+            for instruction, qargs, cargs in self._filter_circuit_data(data)
+        ]
+
+    def _parse_operations_in_workers(
+        self, executor: ProcessPoolExecutor, data: List, start: int = 0
+    ) -> List[Dict]:
+        """Parse the top-level instructions in worker processes.
+
+        Each worker parses whole top-level instructions, and returns their
+        operations with empty classical bit references. The references are then
+        created here in program order, so the output is that of a sequential parse.
+
+        :param executor: the pool of the workers, see `_worker_pool`
+        :param data: the items of the circuit data to parse
+        :param start: the index of the first item in the circuit data
+        :return: the operations
+        """
+        indices = [
+            index
+            for index, (instruction, _, _) in enumerate(
+                map(_unpack_instruction, data), start
+            )
+            if not (self.skip_barriers and isinstance(instruction, Barrier))
+        ]
+        if not indices:
+            return []
+        workers = min(self.workers or 1, len(indices))
+        results = executor.map(
+            _parse_in_worker,
+            indices,
+            chunksize=max(1, len(indices) // (4 * workers)),
+        )
+        operations = []
+        clbits = self.qc.clbits
+        qubits = self.qc.qubits
+        for op_dict, clbit_log in results:
+            new_clbits: Dict[int, Clbit] = {}
+            for key, q_id, clbit_def in clbit_log:
+                if key < 0:
+                    clbit = new_clbits.setdefault(key, Clbit())
+                else:
+                    clbit = clbits[key]
+                qubit = None if q_id is None else qubits[q_id]
+                clbit_def.update(self._get_clbit_def(clbit, qubit))
+            operations.append(op_dict)
+        return operations
+
+    def _parse_top_level_instruction(
+        self, index: int
+    ) -> Tuple[Dict, List[Tuple[int, Optional[int], Dict]]]:
+        """Parse a top-level instruction in a worker process.
+
+        :param index: the index of the instruction in the circuit data
+        :return: the operation, and the log of its classical bit references
+        """
+        self._clbit_log = []
+        self._new_clbit_keys = {}
+        if self._clbit_defs is not None:
+            self._clbit_defs = {}
+        instruction, qargs, cargs = _unpack_instruction(self.qc.data[index])
+        if self.iterative:
+            parse_operation = self._parse_operation_iteratively
+        else:
+            parse_operation = self._parse_operation
+        op_dict = parse_operation(instruction, qargs, cargs, depth=1)
+        return op_dict, self._clbit_log
+
+    def _parse_flat_operations(self, data: List) -> List[Dict]:
+        """Parse top-level instructions, without their children, in bulk.
+
+        The instruction types are mapped to integer codes and the qubit operands to
+        an array of qubit ids, so that the gate names and the controls and targets
+        of all the instructions are computed at once. Only the operations
+        themselves are then created one by one. Instructions other than gates and
+        controlled gates, and conditioned ones, are parsed by `_parse_operation`, in
+        program order.
+
+        The bulk parse uses NumPy, which Qiskit depends on but quantum-viz does not,
+        and is imported when the first flat circuit is parsed. Without it, the
+        instructions are parsed one by one.
+        """
+        if not data:
+            return []
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            return [
                 self._parse_operation(instruction, qargs, cargs, depth=1)
+                for instruction, qargs, cargs in self._filter_circuit_data(data)
             ]
+        with _gc_paused():
+            return self._parse_flat_instructions(*zip(*map(_unpack_instruction, data)))
+
+    def _parse_flat_instructions(
+        self,
+        gates: Tuple[Instruction, ...],
+        qargs_list: Tuple[List[Qubit], ...],
+        cargs_list: Tuple[List[Clbit], ...],
+    ) -> List[Dict]:
+        import numpy as np
+
+        kinds = self._get_flat_kinds(gates)
+        controlled = np.flatnonzero(kinds == _FLAT_CONTROLLED_GATE).tolist()
+        names = self._get_flat_names(gates, controlled)
+
+        num_qargs = np.fromiter(map(len, qargs_list), dtype=np.intp, count=len(gates))
+        stops = np.cumsum(num_qargs)
+        starts = stops - num_qargs
+        # the controls of a controlled gate are its first qubits
+        splits = starts.copy()
+        splits[controlled] += np.fromiter(
+            (gates[i].num_ctrl_qubits for i in controlled),
+            dtype=np.intp,
+            count=len(controlled),
+        )
+        refs = self._get_flat_qubit_refs(qargs_list, num_refs=int(stops[-1]))
+
+        operations = []
+        for i, kind, name, start, split, stop in zip(
+            range(len(gates)),
+            kinds.tolist(),
+            names,
+            starts.tolist(),
+            splits.tolist(),
+            stops.tolist(),
+        ):
+            if kind == _FLAT_GATE:
+                op_dict = {"gate": name, "targets": refs[start:stop]}
+            elif kind == _FLAT_GATE_WITH_PARAMS:
+                op_dict = {"gate": name}
+                self._add_params(op_dict, gates[i])
+                op_dict["targets"] = refs[start:stop]
+            elif kind == _FLAT_CONTROLLED_GATE:
+                op_dict = {"gate": name}
+                if gates[i].params:
+                    self._add_params(op_dict, gates[i])
+                op_dict["isControlled"] = True
+                op_dict["controls"] = refs[start:split]
+                op_dict["targets"] = refs[split:stop]
+            elif kind == _FLAT_OTHER:
+                operations.append(
+                    self._parse_operation(
+                        gates[i], qargs_list[i], cargs_list[i], depth=1
+                    )
+                )
+                continue
+            else:  # a skipped barrier
+                continue
+            operations.append(self._make_op(op_dict))
+        return operations
+
+    def _get_flat_kinds(self, gates: Tuple[Instruction, ...]) -> "np.ndarray":
+        """Get how each instruction is parsed, from an integer code of its type."""
+        import numpy as np
+
+        gate_types = list(map(type, gates))
+        type_codes = {
+            gate_type: code for code, gate_type in enumerate(dict.fromkeys(gate_types))
+        }
+        codes = np.fromiter(
+            map(type_codes.__getitem__, gate_types), dtype=np.intp, count=len(gates)
+        )
+        kinds = np.array(list(map(self._get_flat_kind, type_codes)), dtype=np.intp)
+        kinds = kinds[codes]
+
+        has_params = np.fromiter(
+            map(bool, map(attrgetter("params"), gates)), dtype=bool, count=len(gates)
+        )
+        is_conditioned = np.fromiter(
+            map(bool, map(attrgetter("condition"), gates)), dtype=bool, count=len(gates)
+        )
+        kinds[(kinds == _FLAT_GATE) & has_params] = _FLAT_GATE_WITH_PARAMS
+        kinds[is_conditioned & (kinds != _FLAT_BARRIER)] = _FLAT_OTHER
+        if not self.skip_barriers:
+            kinds[kinds == _FLAT_BARRIER] = _FLAT_GATE
+        return kinds
+
+    @staticmethod
+    def _get_flat_kind(instruction_type: Type[Instruction]) -> int:
+        if issubclass(instruction_type, Barrier):
+            return _FLAT_BARRIER
+        handler, _ = _resolve_instruction_type(instruction_type)
+        if handler is QiskitCircuitParser._handle_gate:
+            return _FLAT_GATE
+        if handler is QiskitCircuitParser._handle_controlled_gate:
+            return _FLAT_CONTROLLED_GATE
+        return _FLAT_OTHER
+
+    def _get_flat_names(
+        self, gates: Tuple[Instruction, ...], controlled: List[int]
+    ) -> List[str]:
+        """Get the gate names of the instructions."""
+        gate_types = list(map(type, gates))
+        type_names = {
+            gate_type: INSTRUCTION_TYPE_TO_NAME.get(_get_defining_type(gate_type))
+            for gate_type in set(gate_types)
+        }
+        names = list(map(type_names.__getitem__, gate_types))
+        for i in controlled:
+            self._check_ctrl_state(gates[i])
+            names[i] = self._get_instruction_name(gates[i].base_gate)
+        # the names of the types that are not in the table of instruction names are those
+        # of the instructions
+        return [name or gate.name for name, gate in zip(names, gates)]
+
+    def _get_flat_qubit_refs(
+        self, qargs_list: Tuple[List[Qubit], ...], num_refs: int
+    ) -> List[Dict[str, int]]:
+        """Get the qubit references of all the qargs, concatenated."""
+        import numpy as np
+
+        qubit_ids = np.fromiter(
+            map(self.qubit2id.__getitem__, chain.from_iterable(qargs_list)),
+            dtype=np.intp,
+            count=num_refs,
+        )
+        if self._qubit_defs is None:
+            return [{"qId": q_id} for q_id in qubit_ids.tolist()]
+        qubit_defs = np.empty(len(self._qubit_defs), dtype=object)
+        qubit_defs[:] = self._qubit_defs
+        return qubit_defs[qubit_ids].tolist()
 
     def _filter_circuit_data(self, data: QuantumCircuitData) -> Iterator:
+        instructions = map(_unpack_instruction, data)
         if self.skip_barriers:
             # check whether the instruction is not a barrier
-            return filter(lambda elem: not isinstance(elem[0], Barrier), data)
-        return data
+            return filter(lambda elem: not isinstance(elem[0], Barrier), instructions)
+        return instructions
 
     def _is_recursion_depth_exceeded(self, depth: int) -> bool:
         return self.max_recursion_depth is not None and depth > self.max_recursion_depth
@@ -218,28 +1287,157 @@ class QiskitCircuitParser:
         cargs: List[Clbit],
         depth: int,
     ) -> Dict:
+        op_dict = self._create_op_dict(instruction, qargs, cargs, depth)
+        self._add_children(op_dict, instruction, qargs, cargs, depth)
+        return self._finalize_op_dict(op_dict, instruction)
+
+    def _parse_operation_iteratively(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> Dict:
+        """Parse an operation like `_parse_operation`, but without recursion.
 
-        op_dict: Dict = {"gate": self._get_instruction_name(instruction)}
+        The operations whose children are being parsed are kept on an explicit
+        stack, so the nesting depth is not limited by the Python recursion limit.
+        """
+        parsed: List[Dict] = []
+        stack: List[_Frame] = []
+        self._enter_operation(instruction, qargs, cargs, depth, parsed, stack)
+        while stack:
+            frame = stack[-1]
+            sub_operation = next(frame.sub_operations, None)
+            if sub_operation is not None:
+                self._enter_operation(
+                    *sub_operation, frame.depth + 1, frame.children, stack
+                )
+                continue
+            stack.pop()
+            self._cache_children(
+                frame.key,
+                frame.instruction,
+                frame.qargs,
+                frame.children,
+                frame.num_clbit_defs,
+            )
+            self._set_children(frame.op_dict, frame.children)
+            frame.siblings.append(
+                self._finalize_op_dict(frame.op_dict, frame.instruction)
+            )
+        return parsed[0]
+
+    def _enter_operation(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+        siblings: List[Dict],
+        stack: List["_Frame"],
+    ) -> None:
+        """Create the operation and push it to the stack if its children are needed."""
+        op_dict = self._create_op_dict(instruction, qargs, cargs, depth)
+        if not self._is_recursion_depth_exceeded(depth + 1):
+            key, children = self._get_cached_children(instruction, qargs, depth)
+            if children is None:
+                sub_operations = self._iter_sub_operations(instruction, qargs, cargs)
+                stack.append(
+                    _Frame(
+                        op_dict,
+                        instruction,
+                        qargs,
+                        depth,
+                        key,
+                        self._num_clbit_defs,
+                        sub_operations,
+                        [],
+                        siblings,
+                    )
+                )
+                return
+            self._set_children(op_dict, children)
+        siblings.append(self._finalize_op_dict(op_dict, instruction))
+
+    def _create_op_dict(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> Dict:
+        """Create the operation dictionary, without its children and condition."""
+        handler, name = _resolve_instruction_type(type(instruction))
+        op_dict = self._make_op({"gate": name or instruction.name})
 
         if instruction.params:
             self._add_params(op_dict, instruction)
 
-        if isinstance(instruction, Reset):
-            self._add_reset(op_dict, qubit=qargs[0], depth=depth)
-        elif isinstance(instruction, Measure):
-            self._add_measure(op_dict, qargs, cargs)
-        elif isinstance(instruction, ControlledGate):
-            # a controlled gate may change the gate name (i.e. CX -> X)
-            self._add_controlled_gate(op_dict, instruction, qargs)
-        else:
-            op_dict["targets"] = self._get_qubit_list_def(qargs)
+        handler(self, op_dict, instruction, qargs, cargs, depth)
+        return op_dict
 
-        self._add_children(op_dict, instruction, qargs, cargs, depth)
+    def get_qubit_refs(self, qubits: List[Qubit]) -> List[Dict[str, int]]:
+        """Get the qviz references of qubits, for the instruction handlers."""
+        return self._get_qubit_list_def(qubits)
+
+    def get_clbit_ref(
+        self, clbit: Clbit, qubit: Optional[Qubit] = None
+    ) -> Dict[str, int]:
+        """Get the qviz reference of a classical bit, for the instruction handlers.
+
+        :param clbit: the classical bit
+        :param qubit: the measured qubit, if the classical bit is referenced for the
+          first time
+        :return: the classical bit reference
+        """
+        return self._get_clbit_def(clbit, qubit)
+
+    def _handle_gate(
+        self,
+        op_dict: Dict,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> None:
+        op_dict["targets"] = self._get_qubit_list_def(qargs)
+
+    def _handle_controlled_gate(
+        self,
+        op_dict: Dict,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> None:
+        # a controlled gate may change the gate name (i.e. CX -> X)
+        self._add_controlled_gate(op_dict, instruction, qargs)
 
+    def _handle_measure(
+        self,
+        op_dict: Dict,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> None:
+        self._add_measure(op_dict, qargs, cargs)
+
+    def _handle_reset(
+        self,
+        op_dict: Dict,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> None:
+        self._add_reset(op_dict, qubit=qargs[0], depth=depth)
+
+    def _finalize_op_dict(self, op_dict: Dict, instruction: Instruction) -> Dict:
         if instruction.condition:
             # _update_condition must update op_dict last (after any other method)
             op_dict = self._update_condition(op_dict, instruction)
-
         return op_dict
 
     def _add_children(
@@ -250,36 +1448,156 @@ class QiskitCircuitParser:
         cargs: List[Clbit],
         depth: int,
     ) -> None:
-        if (instruction.definition is not None) and (
-            not self._is_recursion_depth_exceeded(depth + 1)
+        if self._is_recursion_depth_exceeded(depth + 1):
+            return
+        key, children = self._get_cached_children(instruction, qargs, depth)
+        if children is None:
+            num_clbit_defs = self._num_clbit_defs
+            children = [
+                self._parse_operation(*sub_operation, depth=depth + 1)
+                for sub_operation in self._iter_sub_operations(
+                    instruction, qargs, cargs
+                )
+            ]
+            self._cache_children(key, instruction, qargs, children, num_clbit_defs)
+        self._set_children(op_dict, children)
+
+    def _set_children(self, op_dict: Dict, children: List[Dict]) -> None:
+        if children:
+            op_dict["children"] = op_dict.get("children", []) + children
+
+    def _get_cached_children(
+        self, instruction: Instruction, qargs: List[Qubit], depth: int
+    ) -> Tuple[Optional[Hashable], Optional[List[Dict]]]:
+        """Look up the children of the instruction in the definitions cache.
+
+        :return: the cache key (None if the instruction cannot be cached) and the
+          children remapped onto `qargs` (None if they have to be parsed)
+        """
+        key = self._get_definition_key(instruction, depth)
+        if key is None:
+            return None, None
+        entry = self._definition_cache.get(key)
+        if entry is None:
+            return key, None
+        _, children, children_qubit_ids = entry
+        qubit_ids = map(self.qubit2id.__getitem__, qargs)
+        return key, _remap_operations(
+            children,
+            dict(zip(children_qubit_ids, qubit_ids)),
+            self._get_qubit_def_by_id,
+        )
+
+    def _cache_children(
+        self,
+        key: Optional[Hashable],
+        instruction: Instruction,
+        qargs: List[Qubit],
+        children: List[Dict],
+        num_clbit_defs: int,
+    ) -> None:
+        if key is None or num_clbit_defs != self._num_clbit_defs:
+            return
+        # A copy of the children is stored, since the parsed ones are part of the
+        # output, which the caller may mutate. It is stored with the qubit ids of the
+        # gate's qargs, to remap it onto other call sites
+        qubit_ids = [self.qubit2id[qubit] for qubit in qargs]
+        entry = (
+            self._get_definition_owner(instruction),
+            _remap_operations(
+                children, dict(zip(qubit_ids, qubit_ids)), self._get_qubit_def_by_id
+            ),
+            qubit_ids,
+        )
+        self._definition_cache.put(key, entry)
+
+    def _iter_sub_operations(
+        self, instruction: Instruction, qargs: List[Qubit], cargs: List[Clbit]
+    ) -> Iterator[Tuple[Instruction, List[Qubit], List[Clbit]]]:
+        """Iterate over the definition of the instruction, with the caller's args."""
+        sub_circuit = self._get_definition(instruction)
+        if sub_circuit is None:
+            return
+        # Since the `index` property of bits is deprecated - create mappers between
+        # the bits and their indices in the circuit.
+        # Use the builtin `QuantumCircuit.find_bit` method when it is released
+        qubits_mapper = dict(zip(sub_circuit.qubits, range(sub_circuit.num_qubits)))
+        clbits_mapper = dict(zip(sub_circuit.clbits, range(sub_circuit.num_clbits)))
+        for sub_instruction, sub_qargs, sub_cargs in self._filter_circuit_data(
+            sub_circuit.data
         ):
-            sub_circuit: QuantumCircuit = instruction.definition
-            # Since the `index` property of bits is deprecated - create mappers between
-            # the bits and their indices in the circuit.
-            # Use the builtin `QuantumCircuit.find_bit` method when it is released
-            qubits_mapper = dict(zip(sub_circuit.qubits, range(sub_circuit.num_qubits)))
-            clbits_mapper = dict(zip(sub_circuit.clbits, range(sub_circuit.num_clbits)))
-            for sub_instruction, sub_qargs, sub_cargs in self._filter_circuit_data(
-                sub_circuit.data
-            ):
-                # Update the args to those of the containing circuit
-                sub_qargs = [qargs[qubits_mapper[qubit]] for qubit in sub_qargs]
-                sub_cargs = [cargs[clbits_mapper[clbit]] for clbit in sub_cargs]
-                op_dict["children"] = op_dict.get("children", []) + [
-                    self._parse_operation(
-                        sub_instruction, sub_qargs, sub_cargs, depth=depth + 1
-                    )
-                ]
+            # Update the args to those of the containing circuit
+            sub_qargs = [qargs[qubits_mapper[qubit]] for qubit in sub_qargs]
+            sub_cargs = [cargs[clbits_mapper[clbit]] for clbit in sub_cargs]
+            yield sub_instruction, sub_qargs, sub_cargs
+
+    def _get_definition(self, instruction: Instruction) -> Optional[QuantumCircuit]:
+        """Get the definition of the instruction, synthesizing it if needed."""
+        return instruction.definition
+
+    @staticmethod
+    def _is_user_defined(instruction: Instruction) -> bool:
+        """Whether the definition is set by the user, rather than by the gate type."""
+        return type(instruction)._define is Instruction._define
+
+    @staticmethod
+    def _is_standard_gate(instruction: Instruction) -> bool:
+        """Whether the definition is determined by the definition key alone."""
+        return _is_standard_gate_type(type(instruction))
+
+    @classmethod
+    def _get_definition_owner(cls, instruction: Instruction) -> Any:
+        """Get the object whose identity takes part in the definition key.
+
+        It is kept alive by the cache entry, so that its `id` is not reused.
+        """
+        if cls._is_user_defined(instruction):
+            return instruction.definition
+        if not cls._is_standard_gate(instruction):
+            # The definitions of the other library gates may depend on more than
+            # their params, e.g. on the operator of a `PauliEvolutionGate`
+            return instruction.definition
+        # A definition set on a standard gate, by the user or by synthesizing it
+        # earlier, may differ from that of its type and params
+        definition = instruction._definition
+        if definition is not None:
+            return definition
+        if isinstance(instruction, ControlledGate):
+            return cls._get_definition_owner(instruction.base_gate)
+        return None
+
+    def _get_definition_key(
+        self, instruction: Instruction, depth: int
+    ) -> Optional[Hashable]:
+        """Get a key that identifies the parsed children of the instruction.
+
+        :return: the key, or None if the instruction cannot be cached
+        """
+        if self._definition_cache.maxsize == 0:
+            return None
+        owner = self._get_definition_owner(instruction)
+        key = (
+            type(instruction),
+            instruction.name,
+            # Distinguish equal params of different types, e.g. 1 and 1.0
+            tuple((type(param), param) for param in instruction.params),
+            instruction.num_qubits,
+            instruction.num_clbits,
+            getattr(instruction, "ctrl_state", None),
+            None if owner is None else id(owner),
+            # The remaining depth determines where the children are truncated
+            None if self.max_recursion_depth is None else depth,
+        )
+        try:
+            hash(key)
+        except TypeError:  # e.g. array params
+            return None
+        return key
 
     def _add_controlled_gate(
         self, op_dict: Dict, cgate: ControlledGate, qargs: List[Qubit]
     ) -> None:
-        ctrl_state = cgate.ctrl_state
-        if not all([int(c) for c in str(ctrl_state)]):
-            raise NotImplementedError(
-                f"The controlled gate {cgate} is controlled by a state that "
-                f"is not all 1's: {ctrl_state}"
-            )
+        self._check_ctrl_state(cgate)
         num_ctrl_qubits = cgate.num_ctrl_qubits
         ctrl_qubits = qargs[:num_ctrl_qubits]
         target_qubits = qargs[num_ctrl_qubits:]
@@ -288,6 +1606,15 @@ class QiskitCircuitParser:
         op_dict["controls"] = self._get_qubit_list_def(ctrl_qubits)
         op_dict["targets"] = self._get_qubit_list_def(target_qubits)
 
+    @staticmethod
+    def _check_ctrl_state(cgate: ControlledGate) -> None:
+        ctrl_state = cgate.ctrl_state
+        if ctrl_state != (1 << cgate.num_ctrl_qubits) - 1:
+            raise NotImplementedError(
+                f"The controlled gate {cgate} is controlled by a state that "
+                f"is not all 1's: {ctrl_state}"
+            )
+
     def _add_measure(
         self, op_dict: Dict, qargs: List[Qubit], cargs: List[Clbit]
     ) -> None:
@@ -300,17 +1627,24 @@ class QiskitCircuitParser:
         op_dict["targets"] = [self._get_clbit_def(clbit, qubit)]
 
     def _format_param(self, param: Union[int, float, complex, Parameter]) -> str:
-        if isinstance(param, (float, complex)):
-            return f"{param:.{self.precision}f}"
-        return str(param)
+        return _format_param(param, self.precision)
 
     def _add_params(self, op_dict: Dict, instruction: Instruction) -> None:
-        params_map = map(self._format_param, instruction.params)
-        op_dict["displayArgs"] = f"({', '.join(params_map)})"
+        params = instruction.params
+        try:
+            # 0.0 and -0.0 are equal keys of the cache, but are displayed differently
+            if 0 not in params:
+                op_dict["displayArgs"] = _format_params_cached(self.precision, *params)
+                return
+        except (TypeError, ValueError):
+            # unhashable parameters or parameters without a truth value, i.e. arrays
+            pass
+        op_dict["displayArgs"] = _format_params(params, self.precision)
 
     @staticmethod
     def _get_instruction_name(instruction: Instruction) -> str:
-        return INSTRUCTION_TYPE_TO_NAME.get(type(instruction), instruction.name)
+        name = INSTRUCTION_TYPE_TO_NAME.get(_get_defining_type(type(instruction)))
+        return name or instruction.name
 
     def _add_reset(self, op_dict: Dict, qubit: Qubit, depth: int) -> None:
         """Reset logic - measure and apply X gate if the measurement yields 1."""
@@ -320,7 +1654,7 @@ class QiskitCircuitParser:
 
         if not self._is_recursion_depth_exceeded(depth + 1):
             # Add a simple logic for the reset instruction
-            op_dict["children"] = [
+            children = [
                 {
                     "gate": MEASURE_NAME,
                     "isMeasurement": True,
@@ -341,6 +1675,7 @@ class QiskitCircuitParser:
                     ],
                 },
             ]
+            self._set_children(op_dict, [self._make_op(child) for child in children])
 
     def _update_condition(self, op_dict: Dict, instruction: Instruction) -> Dict:
         classical, val = instruction.condition
@@ -366,12 +1701,313 @@ class QiskitCircuitParser:
 
         op_dict["conditionalRender"] = render_condition
 
-        conditioned_op_dict = {
-            "gate": "Conditional",
-            "isConditional": True,
-            "controls": [self._get_clbit_def(clbit)],
-            "targets": [],
-            "children": [op_dict],
-        }
+        conditioned_op_dict = self._make_op(
+            {
+                "gate": "Conditional",
+                "isConditional": True,
+                "controls": [self._get_clbit_def(clbit)],
+                "targets": [],
+                "children": [op_dict],
+            }
+        )
 
         return conditioned_op_dict
+
+
+register_instruction_handler(Instruction, QiskitCircuitParser._handle_gate)
+register_instruction_handler(
+    ControlledGate, QiskitCircuitParser._handle_controlled_gate
+)
+register_instruction_handler(Measure, QiskitCircuitParser._handle_measure)
+register_instruction_handler(Reset, QiskitCircuitParser._handle_reset)
+
+
+class _OperationsParser(QiskitCircuitParser):
+    """A parser that parses the circuit only when its operations are iterated."""
+
+    def _update_qviz_dict(self) -> None:
+        pass
+
+
+class _StreamFrame:
+    """An operation whose children are being written by the stream writer."""
+
+    __slots__ = ("instruction", "sub_operations", "depth", "has_children")
+
+    def __init__(
+        self,
+        instruction: Optional[Instruction],
+        sub_operations: Iterator[Tuple[Instruction, List[Qubit], List[Clbit]]],
+        depth: int,
+    ) -> None:
+        self.instruction = instruction
+        self.sub_operations = sub_operations
+        self.depth = depth
+        self.has_children = False
+
+
+class QiskitJsonStreamWriter(QiskitCircuitParser):
+    """This class writes a Qiskit circuit as qviz JSON while parsing it.
+
+    The operations are not kept in `qviz_dict`, and the definitions cache is not
+    used, since caching parsed children would keep them in memory. The "qubits"
+    key is written after the "operations" key, once all the classical bits are
+    known.
+    """
+
+    def __init__(self, circuit: QuantumCircuit, fp: IO[str], **kwargs) -> None:
+        """
+        Create a QiskitJsonStreamWriter object and write the circuit.
+
+        :param circuit: qiskit quantum circuit to be written
+        :param fp: a text file object to write the JSON to
+        :param kwargs: the options of `QiskitCircuitParser`
+        """
+        self._fp = fp
+        super().__init__(circuit, **kwargs)
+
+    def _update_qviz_dict(self) -> None:
+        qc = self.qc
+        write = self._fp.write
+        write('{"operations":[')
+        self._write_op_start(
+            {"gate": qc.name, "targets": self._get_qubit_list_def(qc.qubits)}
+        )
+        stack = [_StreamFrame(None, iter(self._filter_circuit_data(qc.data)), 0)]
+        while stack:
+            frame = stack[-1]
+            sub_operation = next(frame.sub_operations, None)
+            if sub_operation is None:
+                stack.pop()
+                self._write_op_end(frame)
+                continue
+            write("," if frame.has_children else ',"children":[')
+            frame.has_children = True
+            stack.append(self._write_sub_operation(*sub_operation, frame.depth + 1))
+        write(f'],"qubits":{circuit_to_json(self.qubits)}}}')
+
+    def _write_sub_operation(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> _StreamFrame:
+        """Write the start of the operation and return its frame."""
+        if instruction.condition:
+            # The conditional wrapper is completed once the operation is written
+            self._fp.write('{"children":[')
+        op_dict = self._create_op_dict(instruction, qargs, cargs, depth)
+        children = op_dict.pop("children", None)
+        self._write_op_start(op_dict)
+        if self._is_recursion_depth_exceeded(depth + 1):
+            frame = _StreamFrame(instruction, iter(()), depth)
+        else:
+            sub_operations = self._iter_sub_operations(instruction, qargs, cargs)
+            frame = _StreamFrame(instruction, sub_operations, depth)
+        if children:
+            children_json = ",".join(map(circuit_to_json, children))
+            self._fp.write(f',"children":[{children_json}')
+            frame.has_children = True
+        return frame
+
+    def _write_op_start(self, op_dict: Dict) -> None:
+        self._fp.write(f"{{{self._dumps_items(op_dict)}")
+
+    def _write_op_end(self, frame: _StreamFrame) -> None:
+        write = self._fp.write
+        if frame.has_children:
+            write("]")
+        instruction = frame.instruction
+        if instruction is None or not instruction.condition:
+            write("}")
+            return
+        op_dict: Dict = {}
+        conditioned_op_dict = self._update_condition(op_dict, instruction)
+        del conditioned_op_dict["children"]
+        write(f",{self._dumps_items(op_dict)}}}")
+        write(f"],{self._dumps_items(conditioned_op_dict)}}}")
+
+    @staticmethod
+    def _dumps_items(op_dict: Dict) -> str:
+        """Serialize the items of the dictionary, without the enclosing braces."""
+        return ",".join(
+            f"{json.dumps(key)}:{circuit_to_json(value)}"
+            for key, value in op_dict.items()
+        )
+
+
+# The phases timed by `ProfilingCircuitParser`
+_PHASES = ("parse", "children", "definitions", "params", "conditions", "serialize")
+
+
+class ParserStats:
+    """Timers and counters of the parse of a `ProfilingCircuitParser`.
+
+    The time of a phase excludes the phases nested in it, e.g. the time of parsing
+    children excludes the synthesis of their definitions, so the times add up.
+
+    - parse: parsing the top-level operations
+    - children: parsing the operations of definitions
+    - definitions: synthesizing definitions, e.g. of library gates
+    - params: formatting gate parameters
+    - conditions: wrapping conditioned operations
+    - serialize: serializing to JSON, by `to_json`
+    """
+
+    def __init__(self) -> None:
+        """Create a ParserStats object, with zero timers and counters."""
+        self.times: Dict[str, float] = dict.fromkeys(_PHASES, 0.0)
+        # The number of operations parsed, by instruction type name. Children
+        # reused from the definitions cache are not parsed again.
+        self.gates: "Counter[str]" = Counter()
+        self.definitions_expanded = 0
+        self.max_depth = 0
+        self.children_emitted = 0
+        self.bytes_serialized = 0
+        self._phases: List[str] = []
+        self._phase_start = 0.0
+
+    @property
+    def total_time(self) -> float:
+        """Get the total time of all the phases, in seconds."""
+        return sum(self.times.values())
+
+    def enter(self, phase: str) -> None:
+        """Start timing a phase, pausing the phase it is nested in."""
+        now = time.perf_counter()
+        if self._phases:
+            self.times[self._phases[-1]] += now - self._phase_start
+        self._phases.append(phase)
+        self._phase_start = now
+
+    def exit(self) -> None:
+        """Stop timing the current phase, resuming the phase it is nested in."""
+        now = time.perf_counter()
+        self.times[self._phases.pop()] += now - self._phase_start
+        self._phase_start = now
+
+    def __repr__(self) -> str:
+        """Represent the stats by their timers and counters."""
+        times = ", ".join(f"{phase}={t:.3f}s" for phase, t in self.times.items())
+        return (
+            f"ParserStats({times}, gates={dict(self.gates)}, "
+            f"definitions_expanded={self.definitions_expanded}, "
+            f"max_depth={self.max_depth}, children_emitted={self.children_emitted}, "
+            f"bytes_serialized={self.bytes_serialized})"
+        )
+
+
+def _timed(phase: str, method: Callable) -> Callable:
+    """Time the calls of a parser method as a phase of its stats."""
+
+    @wraps(method)
+    def timed_method(self: "ProfilingCircuitParser", *args: Any, **kwargs: Any) -> Any:
+        self.stats.enter(phase)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.stats.exit()
+
+    return timed_method
+
+
+class ProfilingCircuitParser(QiskitCircuitParser):
+    """This class parses a Qiskit circuit like `QiskitCircuitParser`, profiling it.
+
+    The timers and counters are kept in `stats`. They are kept out of
+    `QiskitCircuitParser`, which has no instrumentation overhead. Instructions
+    parsed in worker processes (see the `workers` option) are not profiled.
+    """
+
+    def __init__(self, circuit: QuantumCircuit, **kwargs) -> None:
+        """
+        Create a ProfilingCircuitParser object and parse the circuit.
+
+        :param circuit: qiskit quantum circuit to be parsed
+        :param kwargs: the options of `QiskitCircuitParser`
+        """
+        self.stats = ParserStats()
+        super().__init__(circuit, **kwargs)
+
+    _update_qviz_dict = _timed("parse", QiskitCircuitParser._update_qviz_dict)
+    update = _timed("parse", QiskitCircuitParser.update)
+    _add_params = _timed("params", QiskitCircuitParser._add_params)
+    _update_condition = _timed("conditions", QiskitCircuitParser._update_condition)
+
+    def to_json(self) -> str:
+        """Serialize the qviz dictionary to JSON, see `QiskitCircuitParser.to_json`."""
+        self.stats.enter("serialize")
+        try:
+            qviz_json = super().to_json()
+        finally:
+            self.stats.exit()
+        self.stats.bytes_serialized += len(qviz_json)
+        return qviz_json
+
+    def _get_definition(self, instruction: Instruction) -> Optional[QuantumCircuit]:
+        self.stats.definitions_expanded += 1
+        self.stats.enter("definitions")
+        try:
+            return super()._get_definition(instruction)
+        finally:
+            self.stats.exit()
+
+    def _parse_operation(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> Dict:
+        if depth == 1:
+            return super()._parse_operation(instruction, qargs, cargs, depth)
+        self.stats.enter("children")
+        try:
+            return super()._parse_operation(instruction, qargs, cargs, depth)
+        finally:
+            self.stats.exit()
+
+    def _enter_operation(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+        siblings: List[Dict],
+        stack: List["_Frame"],
+    ) -> None:
+        self.stats.enter("parse" if depth == 1 else "children")
+        try:
+            super()._enter_operation(instruction, qargs, cargs, depth, siblings, stack)
+        finally:
+            self.stats.exit()
+
+    def _create_op_dict(
+        self,
+        instruction: Instruction,
+        qargs: List[Qubit],
+        cargs: List[Clbit],
+        depth: int,
+    ) -> Dict:
+        stats = self.stats
+        stats.gates[type(instruction).__name__] += 1
+        stats.max_depth = max(stats.max_depth, depth)
+        return super()._create_op_dict(instruction, qargs, cargs, depth)
+
+    def _set_children(self, op_dict: Dict, children: List[Dict]) -> None:
+        self.stats.children_emitted += len(children)
+        super()._set_children(op_dict, children)
+
+    def _get_flat_kinds(self, gates: Tuple[Instruction, ...]) -> "np.ndarray":
+        kinds = super()._get_flat_kinds(gates)
+        # The other instructions are counted by `_create_op_dict`
+        bulk_parsed = [
+            i
+            for i, kind in enumerate(kinds.tolist())
+            if kind != _FLAT_OTHER and kind != _FLAT_BARRIER
+        ]
+        if bulk_parsed:
+            self.stats.gates.update(type(gates[i]).__name__ for i in bulk_parsed)
+            self.stats.max_depth = max(self.stats.max_depth, 1)
+        return kinds
@@ -1,17 +1,30 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 """This module provides utilities to display quantum-viz from a Python script."""
-import json
+import html
 import tempfile
 import warnings
 import webbrowser
 from pathlib import Path
 from typing import Any
+from typing import cast
 from typing import Dict
+from typing import IO
+from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Protocol
 from typing import TYPE_CHECKING
 from typing import Union
 
+from .bundle import get_bundle
+from .cache import json_cache
+from .compact import circuit_to_json
+from .compact import CompactCircuit
+from .compress import CompressingWriter
+from .compress import INFLATE_JS
+from .dedup import dedupe_children
+from .dedup import EXPAND_JS
 from .widget import DEFAULT_STYLE
 from .widget import Style
 
@@ -45,8 +58,81 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>
 """
+# The template of pages displayed offline, with the quantum-viz.js bundle inlined
+SCRIPT_TEMPLATE = (
+    '<script src="https://unpkg.com/@microsoft/quantum-viz.js{0}"></script>'
+)
+OFFLINE_SCRIPT_TEMPLATE = '<script type="text/javascript">{0}</script>'
+OFFLINE_HTML_TEMPLATE = HTML_TEMPLATE.replace(SCRIPT_TEMPLATE, OFFLINE_SCRIPT_TEMPLATE)
+# The template of reports of many circuits, which share the quantum-viz.js bundle and
+# are drawn as they are scrolled into view
+REPORT_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>quantum-viz.js visualization</title>
+  <style>
+    .circuit:empty {{ min-height: 200px; }}
+  </style>
+</head>
+<body>
+{sections}
+  {script}
+  <script type="application/json" id="circuits">{circuits}</script>
+  <script type="text/javascript">
+    if (typeof qviz != 'undefined') {{
+      var circuits = JSON.parse(document.getElementById('circuits').textContent);
+      var draw = function(div) {{
+        qviz.draw(circuits[div.dataset.index], div, qviz.STYLES['{style}']);
+      }};
+      var divs = document.querySelectorAll('.circuit');
+      if ('IntersectionObserver' in window) {{
+        var observer = new IntersectionObserver(function(entries) {{
+          entries.forEach(function(entry) {{
+            if (entry.isIntersecting) {{
+              observer.unobserve(entry.target);
+              draw(entry.target);
+            }}
+          }});
+        }}, {{ rootMargin: '200px' }});
+        divs.forEach(function(div) {{ observer.observe(div); }});
+      }} else {{
+        divs.forEach(draw);
+      }}
+    }}
+  </script>
+</body>
+</html>
+"""
+REPORT_SECTION_TEMPLATE = """  <h2>{title}</h2>
+  <div class="circuit" data-index="{index}"></div>"""
 SUFFIX = "_qviz.html"
 
+# The function decompressing the payloads, escaped for the templates
+_INFLATE_JS = INFLATE_JS.replace("{", "{{").replace("}", "}}")
+
+
+def _compress_template(template: str) -> str:
+    """Derive a page template drawing the circuit once it is decompressed."""
+    return template.replace(
+        "    var circuit = {1};\n",
+        f"    ({_INFLATE_JS})('{{1}}').then(function(text) {{{{\n"
+        "    var circuit = {3}(JSON.parse(text));\n",
+    ).replace("  </script>\n\n</body>", "    }});\n  </script>\n\n</body>")
+
+
+# The templates of pages whose circuit is compressed
+COMPRESSED_HTML_TEMPLATE = _compress_template(HTML_TEMPLATE)
+OFFLINE_COMPRESSED_HTML_TEMPLATE = _compress_template(OFFLINE_HTML_TEMPLATE)
+# The template of reports whose circuits are compressed together
+COMPRESSED_REPORT_HTML_TEMPLATE = REPORT_HTML_TEMPLATE.replace(
+    "      var circuits = JSON.parse(document.getElementById('circuits').textContent);\n",
+    f"      ({_INFLATE_JS})(document.getElementById('circuits').textContent)"
+    ".then(function(text) {{\n"
+    "      var circuits = JSON.parse(text);\n",
+).replace("    }}\n  </script>\n</body>", "      }});\n    }}\n  </script>\n</body>")
+
 STYLES = list(Style)
 
 
@@ -55,19 +141,51 @@ class UnsupportedStyleWarning(UserWarning):
 
 
 def _create_file(
-    circuit: Union[Dict[str, Any], "QuantumCircuit"],
+    circuit: Union[Dict[str, Any], CompactCircuit, "QuantumCircuit"],
     filename: Union[str, Path, None] = None,
     style: Style = DEFAULT_STYLE,
     version: Optional[str] = None,
+    offline: bool = False,
+    compress: bool = False,
+    dedupe: bool = False,
     **kwargs,
 ) -> Path:
+    path = _get_path(filename)
+    _check_style(style)
+    if compress:
+        template = (
+            OFFLINE_COMPRESSED_HTML_TEMPLATE if offline else COMPRESSED_HTML_TEMPLATE
+        )
+    else:
+        template = OFFLINE_HTML_TEMPLATE if offline else HTML_TEMPLATE
+    version = _get_script_version(version, offline)
+    html_head, html_tail = template.split("{1}")
+    expand = f"({EXPAND_JS})" if dedupe else ""
+    with path.open("w") as fp:
+        fp.write(html_head.format(version))
+        if compress:
+            writer = CompressingWriter(fp)
+            _write_circuit_json(circuit, cast(IO[str], writer), dedupe, **kwargs)
+            writer.close()
+        elif dedupe:
+            fp.write(f"{expand}(")
+            _write_circuit_json(circuit, fp, dedupe, **kwargs)
+            fp.write(")")
+        else:
+            _write_circuit_json(circuit, fp, **kwargs)
+        fp.write(html_tail.format(version, None, style, expand))
+    return path
+
+
+def _get_path(filename: Union[str, Path, None]) -> Path:
     if filename is None:
         file = tempfile.NamedTemporaryFile(suffix=SUFFIX, delete=False)
         file.close()
-        path = Path(file.name)
-    else:
-        path = Path(filename)
+        return Path(file.name)
+    return Path(filename)
 
+
+def _check_style(style: Style) -> None:
     if style not in STYLES:
         warnings.warn(
             f"The selected style '{style}' is not supported and will be ignored.\n"
@@ -75,30 +193,199 @@ def _create_file(
             UnsupportedStyleWarning,
         )
 
-    if version is None:
-        version = ""  # Use the latest version
-    else:
-        version = "@" + version
 
-    if not isinstance(circuit, dict):
-        from .qiskit_parser import qiskit2dict
+def _get_script_version(version: Optional[str], offline: bool) -> str:
+    """Get the version suffix of the script URL, or the bundle if offline."""
+    if offline:
+        # The bundle takes the place of the version in the templates
+        return get_bundle()
+    if version is None:
+        return ""  # Use the latest version
+    return "@" + version
 
-        circuit = qiskit2dict(circuit, **kwargs)
 
-    qviz_json = json.dumps(circuit)
+def _create_report_file(
+    circuits: Iterable[Union[Dict[str, Any], CompactCircuit, "QuantumCircuit"]],
+    filename: Union[str, Path, None] = None,
+    style: Style = DEFAULT_STYLE,
+    version: Optional[str] = None,
+    offline: bool = False,
+    compress: bool = False,
+    **kwargs,
+) -> Path:
+    path = _get_path(filename)
+    _check_style(style)
+    script_template = OFFLINE_SCRIPT_TEMPLATE if offline else SCRIPT_TEMPLATE
+    script = script_template.format(_get_script_version(version, offline))
 
-    html = HTML_TEMPLATE.format(version, qviz_json, style)
-    path.write_text(html)
+    circuits = list(circuits)
+    sections = "\n".join(
+        REPORT_SECTION_TEMPLATE.format(
+            title=html.escape(getattr(circuit, "name", None) or f"Circuit {i}"),
+            index=i,
+        )
+        for i, circuit in enumerate(circuits)
+    )
+    template = COMPRESSED_REPORT_HTML_TEMPLATE if compress else REPORT_HTML_TEMPLATE
+    html_head, html_tail = template.split("{circuits}")
+    with path.open("w") as fp:
+        fp.write(html_head.format(sections=sections, script=script))
+        # The circuits are written as a single array, within a script element
+        writer: _TextWriter
+        if compress:
+            writer = CompressingWriter(fp)
+        else:
+            writer = _ScriptWriter(fp)
+        writer.write("[")
+        for i, circuit in enumerate(circuits):
+            if i > 0:
+                writer.write(",")
+            _write_circuit_json(circuit, cast(IO[str], writer), **kwargs)
+        writer.write("]")
+        writer.close()
+        fp.write(html_tail.format(style=style))
     return path
 
 
+def _write_circuit_json(
+    circuit: Union[Dict[str, Any], CompactCircuit, "QuantumCircuit"],
+    fp: IO[str],
+    dedupe: bool = False,
+    **kwargs,
+) -> None:
+    """Write the qviz JSON of a circuit, looking up Qiskit circuits in the cache.
+
+    Deduplicated circuits (see `quantum_viz.dedup`) are built in memory first.
+    """
+    if dedupe:
+        if isinstance(circuit, CompactCircuit):
+            qviz_dict = circuit.to_dict()
+        elif isinstance(circuit, dict):
+            qviz_dict = circuit
+        else:
+            from .qiskit_parser import qiskit2dict
+
+            qviz_dict = qiskit2dict(circuit, **kwargs)
+        fp.write(circuit_to_json(dedupe_children(qviz_dict)))
+        return
+    if isinstance(circuit, (dict, CompactCircuit)):
+        fp.write(circuit_to_json(circuit))
+        return
+
+    from .qiskit_parser import qiskit2json_stream
+    from .qiskit_parser import qiskit_circuit_key
+
+    key = qiskit_circuit_key(circuit, **kwargs)
+    cached_json = json_cache.get(key)
+    if cached_json is not None:
+        fp.write(cached_json)
+        return
+
+    # Write the circuit straight into the file, without building it in memory,
+    # keeping a copy for the cache only if it fits in it
+    writer = _CapturingWriter(fp, json_cache.max_bytes)
+    qiskit2json_stream(circuit, cast(IO[str], writer), **kwargs)
+    if writer.chunks is not None:
+        json_cache.put(key, "".join(writer.chunks))
+
+
+class _TextWriter(Protocol):
+    """A writer of text to a file, which completes its output when closed."""
+
+    def write(self, text: str) -> int:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class _ScriptWriter:
+    """A writer that escapes the end tags in the text written to a script element.
+
+    The escaped text is equivalent as JSON and as JavaScript.
+    """
+
+    def __init__(self, fp: IO[str]) -> None:
+        self.fp = fp
+        # Whether the last text written ended with "<"
+        self.pending_lt = False
+
+    def write(self, text: str) -> int:
+        if self.pending_lt and text.startswith("/"):
+            self.fp.write("\\")
+        self.pending_lt = text.endswith("<")
+        return self.fp.write(text.replace("</", "<\\/"))
+
+    def close(self) -> None:
+        # Nothing is buffered, and the file is closed by its owner
+        pass
+
+
+class _CapturingWriter:
+    """A writer that keeps a copy of the text written to a file, up to a size."""
+
+    def __init__(self, fp: IO[str], max_size: int) -> None:
+        self.fp = fp
+        self.max_size = max_size
+        self.size = 0
+        # None once the written text exceeds the maximal size
+        self.chunks: Optional[List[str]] = []
+
+    def write(self, text: str) -> int:
+        if self.chunks is not None:
+            self.size += len(text)
+            if self.size > self.max_size:
+                self.chunks = None
+            else:
+                self.chunks.append(text)
+        return self.fp.write(text)
+
+
 def display(
-    circuit: Union[Dict[str, Any], "QuantumCircuit"],
+    circuit: Union[Dict[str, Any], CompactCircuit, "QuantumCircuit"],
     filename: Union[str, Path, None] = None,
     style: Style = DEFAULT_STYLE,
     version: Optional[str] = None,
+    offline: bool = False,
+    compress: bool = False,
+    dedupe: bool = False,
     **kwargs,
 ) -> None:
-    """Render the given circuit using quantum-viz on a new browser window."""
-    path = _create_file(circuit, filename, style, version, **kwargs)
+    """Render the given circuit using quantum-viz on a new browser window.
+
+    :param offline: whether to inline the local quantum-viz.js bundle (see
+      `quantum_viz.bundle`) rather than loading it from unpkg
+    :param compress: whether to embed the circuit compressed by gzip, which the
+      browser decompresses with DecompressionStream
+    :param dedupe: whether to embed each distinct list of children of the operations
+      once (see `quantum_viz.dedup`), which the browser expands
+    """
+    path = _create_file(
+        circuit, filename, style, version, offline, compress, dedupe, **kwargs
+    )
+    webbrowser.open(f"file://{path.absolute()}")
+
+
+def display_many(
+    circuits: Iterable[Union[Dict[str, Any], CompactCircuit, "QuantumCircuit"]],
+    filename: Union[str, Path, None] = None,
+    style: Style = DEFAULT_STYLE,
+    version: Optional[str] = None,
+    offline: bool = False,
+    compress: bool = False,
+    **kwargs,
+) -> None:
+    """Render the given circuits in a single report on a new browser window.
+
+    The report loads quantum-viz.js once, and draws each circuit only when it is
+    scrolled into view.
+
+    :param offline: whether to inline the local quantum-viz.js bundle (see
+      `quantum_viz.bundle`) rather than loading it from unpkg
+    :param compress: whether to embed the circuits compressed by gzip, which the
+      browser decompresses with DecompressionStream
+    """
+    path = _create_report_file(
+        circuits, filename, style, version, offline, compress, **kwargs
+    )
     webbrowser.open(f"file://{path.absolute()}")
@@ -4,17 +4,30 @@
 visualizer.
 """  # noqa: D400, D205
 import json
+import sys
+import threading
 import uuid
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from html import escape
 from typing import Any
+from typing import cast
 from typing import Dict
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Tuple
 
-from IPython.display import display
-from IPython.display import HTML
-from varname import varname
-from varname.utils import ImproperUseError
+from .bundle import get_bundle
+from .cache import json_cache
+from .compact import circuit_to_json
+from .compress import compress_json
+from .compress import INFLATE_JS
+from .dedup import dedupe_children
+from .dedup import EXPAND_JS
+from .compact import CompactCircuit
+from .lazy import split_children
 
 # The default quantum-viz.js version to use.
 VERSION = "1.0.2"
@@ -52,6 +65,199 @@ require(['qviz'], function(qviz) {{
 <div id="msg"></div>
 """
 
+# Draws the circuit with the children of its composite operations kept in a side
+# table, which is parsed on the first expansion. Zooming is handled here, before the
+# handlers of quantum-viz.js, to load the children of the expanded operations.
+_LAZY_HTML_STR_FORMAT = """
+<script type="application/json" id="JSChildren_{uid}">{children}</script>
+<script type="text/javascript">
+require.config({{
+    paths: {{
+        qviz: '{base_url}/{js_source}'
+    }}
+}});
+require(['qviz'], function(qviz) {{
+    const circuit = {data};
+    const targetDiv = document.getElementById('JSApp_{uid}');
+    if (targetDiv != null) {{
+        let childrenByPath = null;
+        const renders = new Map();
+        const getOp = (id) => {{
+            const path = id.split('-').map(Number);
+            let op = circuit.operations[path[0]];
+            path.slice(1).forEach((i) => {{ op = op.children[i]; }});
+            return op;
+        }};
+        const collapse = (op) => {{
+            if (renders.has(op)) {{
+                op.conditionalRender = renders.get(op);
+                renders.delete(op);
+                delete op.dataAttributes.expanded;
+            }}
+            (op.children || []).forEach(collapse);
+        }};
+        const draw = () => qviz.draw(circuit, targetDiv, qviz.STYLES['{style}']);
+        targetDiv.addEventListener('click', (ev) => {{
+            const ctrl = ev.target.closest('.gate-control');
+            const id = ctrl && ctrl.parentElement.getAttribute('data-id');
+            if (id == null) return;
+            const op = getOp(id);
+            if (ctrl.classList.contains('gate-expand')) {{
+                if (childrenByPath == null) {{
+                    const table = document.getElementById('JSChildren_{uid}');
+                    childrenByPath = JSON.parse(table.textContent);
+                }}
+                if (id in childrenByPath) {{
+                    op.children = childrenByPath[id];
+                    delete childrenByPath[id];
+                }}
+                renders.set(op, op.conditionalRender);
+                op.conditionalRender = 3;  // ConditionalRender.AsGroup
+                op.dataAttributes = Object.assign(op.dataAttributes || {{}}, {{
+                    expanded: 'true'
+                }});
+            }} else if (ctrl.classList.contains('gate-collapse')) {{
+                collapse(op);
+            }} else {{
+                return;
+            }}
+            draw();
+            ev.stopPropagation();
+        }}, true);
+        draw();
+    }}
+}});
+</script>
+<div id="JSApp_{uid}"></div>
+<div id="msg"></div>
+"""
+
+
+def _get_compressed_format(html_format: str) -> str:
+    """Derive the format of a widget whose payloads are compressed.
+
+    The circuit, and the children table if any, are decompressed before the circuit
+    is drawn, but the table is still parsed only on the first expansion.
+    """
+    head, body = html_format.split("    const circuit = {data};\n")
+    body, tail = body.rsplit("}});\n</script>", 1)
+    payloads = "inflate('{data}')"
+    parse_table = (
+        "const table = document.getElementById('JSChildren_{uid}');\n"
+        "                    childrenByPath = JSON.parse(table.textContent);"
+    )
+    if parse_table in body:
+        body = body.replace(parse_table, "childrenByPath = JSON.parse(childrenText);")
+        payloads += ", inflate(document.getElementById('JSChildren_{uid}').textContent)"
+    return (
+        f"{head}    const inflate = {{inflate}};\n"
+        f"    Promise.all([{payloads}]).then(function([circuitText, childrenText]) {{{{\n"
+        "    const circuit = {expand}(JSON.parse(circuitText));\n"
+        f"{body}    }}}});\n}}}});\n</script>{tail}"
+    )
+
+
+_COMPRESSED_HTML_STR_FORMAT = _get_compressed_format(_HTML_STR_FORMAT)
+_COMPRESSED_LAZY_HTML_STR_FORMAT = _get_compressed_format(_LAZY_HTML_STR_FORMAT)
+
+# Defines the qviz module from the inlined bundle, rather than loading it from its
+# URL. The bundle is evaluated without the AMD loader, so that it sets the qviz
+# global, which is then defined as a named module.
+_OFFLINE_LOADER_FORMAT = """
+<script type="text/javascript">
+if (typeof window.qviz == 'undefined') {{
+    (function(define, module, exports) {{
+{bundle}
+    }})();
+}}
+if (!require.defined('qviz')) {{
+    define('qviz', [], function() {{ return window.qviz; }});
+}}
+</script>"""
+
+# Displayed until the circuit of a widget rendered in the background is ready
+_PLACEHOLDER_FORMAT = """
+<div id="JSApp_{uid}" style="width: {width}px; font-style: italic;">
+    Rendering the circuit...
+</div>
+"""
+_ERROR_FORMAT = """
+<div id="JSApp_{uid}" style="color: red;">
+    The circuit could not be rendered: {error}
+</div>
+"""
+
+
+class _BackgroundRender(NamedTuple):
+    """A render of a widget in the background, see `Viewer.display_in_background`."""
+
+    future: "Future[None]"
+    cancelled: threading.Event
+
+    def cancel(self) -> None:
+        # A render that has not started is dropped, and one that has is not shown
+        self.cancelled.set()
+        self.future.cancel()
+
+
+# The widgets are rendered one at a time, in the order they are displayed
+_render_executor: Optional[ThreadPoolExecutor] = None
+# The id of the last execution of each notebook cell, and the renders it started,
+# which are cancelled when the cell is run again
+_cell_renders: Dict[str, Tuple[Optional[str], List[_BackgroundRender]]] = {}
+_render_lock = threading.Lock()
+
+
+def _get_render_executor() -> ThreadPoolExecutor:
+    global _render_executor
+    with _render_lock:
+        if _render_executor is None:
+            _render_executor = ThreadPoolExecutor(1, thread_name_prefix="quantum-viz")
+        return _render_executor
+
+
+def _get_execution() -> Tuple[Optional[str], Optional[str]]:
+    """Get the ids of the notebook cell being run and of its execution, if known.
+
+    The cell id is sent by frontends such as JupyterLab and VS Code, in the
+    metadata of the execute request.
+    """
+    from IPython import get_ipython
+
+    parent = getattr(get_ipython(), "parent_header", None) or {}
+    cell_id = parent.get("metadata", {}).get("cellId")
+    return cell_id, parent.get("header", {}).get("msg_id")
+
+
+def _track_cell_render(render: _BackgroundRender) -> None:
+    """Cancel the renders of the previous execution of the cell, and track this one."""
+    cell_id, execution_id = _get_execution()
+    if cell_id is None:
+        return
+    with _render_lock:
+        last_execution_id, renders = _cell_renders.get(cell_id, (None, []))
+        if last_execution_id != execution_id:
+            for previous in renders:
+                previous.cancel()
+            renders = []
+        # The finished renders are not tracked anymore
+        renders = [previous for previous in renders if not previous.future.done()]
+        renders.append(render)
+        _cell_renders[cell_id] = (execution_id, renders)
+
+
+def _is_qiskit_circuit(circuit: Any) -> bool:
+    """Check whether the circuit is a Qiskit circuit, without importing the parser.
+
+    A Qiskit circuit exists only once Qiskit is imported, so it is not imported to
+    check the other objects either.
+    """
+    if "qiskit" not in sys.modules:
+        return False
+    from qiskit import QuantumCircuit
+
+    return isinstance(circuit, QuantumCircuit)
+
 
 class Viewer:
     """Jupyter widget for displaying Quantum-viz quantum circuit."""
@@ -65,37 +271,195 @@ class Viewer:
         style: Style = DEFAULT_STYLE,
         width: int = 400,
         height: int = 350,
+        lazy_depth: Optional[int] = None,
+        offline: bool = False,
+        compress: bool = False,
+        dedupe: bool = False,
+        name: Optional[str] = None,
+        background: bool = False,
     ):
         """
         Create Viewer instance.
 
+        The circuit is parsed and serialized when the widget is first displayed, so
+        creating a widget takes the same time for any circuit. Changes made to the
+        circuit until then are displayed. A Qiskit circuit is parsed again when the
+        widget is displayed again, incrementally if instructions were appended to it
+        only (see `QiskitCircuitParser.update`).
+
         :param circuit: Quantum circuit
-        :type circuit: dict
+        :type circuit: dict, CompactCircuit or qiskit.QuantumCircuit
         :param width: Widget width in pixels, defaults to 400
         :type width: int, optional
         :param height: Widget height in pixels, defaults to 350
         :type height: int, optional
+        :param lazy_depth: The depth of the operations drawn first, the children of
+            deeper operations are loaded only when expanded, if None - the whole
+            circuit is loaded at once
+        :type lazy_depth: int, optional
+        :param offline: Whether to inline the local quantum-viz.js bundle (see
+            `quantum_viz.bundle`) rather than loading it from unpkg, defaults to
+            False
+        :type offline: bool, optional
+        :param compress: Whether to embed the circuit compressed by gzip, which the
+            browser decompresses with DecompressionStream, defaults to False
+        :type compress: bool, optional
+        :param dedupe: Whether to embed each distinct list of children of the
+            operations once (see `quantum_viz.dedup`), which the browser expands,
+            defaults to False. It cannot be combined with `lazy_depth`.
+        :type dedupe: bool, optional
+        :param name: The name of the widget, if None - the name of the variable it
+            is assigned to, which is looked up in the source of the caller. Passing
+            it makes creating many widgets faster
+        :type name: str, optional
+        :param background: Whether IPython displays the widget in the background
+            (see `display_in_background`), rather than blocking until the circuit is
+            parsed, defaults to False
+        :type background: bool, optional
         """
-        try:
-            self.name = varname()
-        except ImproperUseError:
-            self.name = "_"
-
-        if not isinstance(circuit, dict):
-            from .qiskit_parser import qiskit2dict, QuantumCircuit
+        if name is None:
+            name = self._get_variable_name()
+        self.name = name
 
-            if not isinstance(circuit, QuantumCircuit):
-                raise TypeError(
-                    f"Received a circuit of an unsupported type: {type(circuit)}"
-                )
-            circuit = qiskit2dict(circuit)
+        if not isinstance(circuit, (dict, CompactCircuit)) and not _is_qiskit_circuit(
+            circuit
+        ):
+            raise TypeError(
+                f"Received a circuit of an unsupported type: {type(circuit)}"
+            )
+        if lazy_depth is not None and dedupe:
+            raise ValueError("lazy_depth cannot be combined with dedupe")
+        # The circuit is serialized by `_serialize`, when its JSON is first needed
+        self._circuit: Any = circuit
+        self._value: Optional[str] = None
+        self._children_value: Optional[str] = None
+        # The parser of a Qiskit circuit, kept to parse the instructions appended to
+        # it when the widget is displayed again
+        self._parser: Any = None
+        self._serialize_lock = threading.Lock()
 
+        self.lazy_depth = lazy_depth
+        self.dedupe = dedupe
         self.width = width
         self.height = height
-        self.value = json.dumps(circuit)
         self.base_url = self._get_base_url(version)
         self.style = style
+        self.offline = offline
+        self.compress = compress
+        self.background = background
         self._uids: List[str] = []
+        self._renders: List[_BackgroundRender] = []
+
+    @staticmethod
+    def _get_variable_name() -> str:
+        """Get the name of the variable the widget is assigned to by its creator."""
+        # IPython and varname are imported when needed only, so that scripts and
+        # batch jobs that use the utilities do not import them
+        from varname import varname
+        from varname.utils import ImproperUseError
+        from varname.utils import VarnameRetrievingError
+
+        try:
+            # The frames of this method and of `__init__` are skipped
+            return cast(str, varname(frame=2))
+        except (ImproperUseError, VarnameRetrievingError):
+            # Not assigned, or the source of the creator is not available
+            return "_"
+
+    @property
+    def value(self) -> str:
+        """Get the qviz JSON of the circuit, serialized when first needed."""
+        if self._value is None:
+            self._serialize()
+        return cast(str, self._value)
+
+    @property
+    def children_value(self) -> Optional[str]:
+        """Get the JSON of the table of children split by `lazy_depth`, if any."""
+        if self._value is None:
+            self._serialize()
+        return self._children_value
+
+    def _serialize(self) -> None:
+        """Parse and serialize the circuit, once until it is displayed again."""
+        with self._serialize_lock:
+            if self._value is None:
+                self._serialize_circuit()
+
+    def _invalidate(self) -> None:
+        """Serialize a Qiskit circuit again when next needed, as it may have changed.
+
+        Dictionaries and compact circuits are serialized once.
+        """
+        with self._serialize_lock:
+            if _is_qiskit_circuit(self._circuit):
+                self._value = None
+
+    def _serialize_circuit(self) -> None:
+        circuit = self._circuit
+        is_qiskit_circuit = not isinstance(circuit, (dict, CompactCircuit))
+        children_value = None
+        if self.lazy_depth is not None:
+            if is_qiskit_circuit:
+                # The records are split and serialized faster than dictionaries
+                circuit = self._update_parser(circuit, compact=True).compact_circuit
+            value, children_value = self._serialize_split(circuit, self.lazy_depth)
+        elif is_qiskit_circuit:
+            value = self._serialize_qiskit_circuit(circuit)
+        else:
+            value = circuit_to_json(circuit)
+        if self.dedupe:
+            value = circuit_to_json(dedupe_children(json.loads(value)))
+        self._children_value = children_value
+        self._value = value
+        if not is_qiskit_circuit:
+            # The circuit is not needed anymore
+            self._circuit = None
+
+    def _update_parser(self, circuit: Any, compact: bool = False) -> Any:
+        """Parse the Qiskit circuit, or the instructions appended since last parsed.
+
+        :return: the parser of the circuit
+        """
+        if self._parser is None:
+            from .qiskit_parser import QiskitCircuitParser
+
+            self._parser = QiskitCircuitParser(circuit, compact=compact)
+        else:
+            self._parser.update()
+        return self._parser
+
+    def _serialize_qiskit_circuit(self, circuit: Any) -> str:
+        if self._parser is not None:
+            # A circuit displayed again after appending to it is parsed incrementally
+            return cast(str, self._update_parser(circuit).to_json())
+        from .qiskit_parser import qiskit_circuit_key
+
+        # A circuit displayed unchanged by another widget is not parsed again
+        key = qiskit_circuit_key(circuit)
+        value = json_cache.get(key)
+        if value is None:
+            value = self._update_parser(circuit).to_json()
+            json_cache.put(key, value)
+        return value
+
+    @staticmethod
+    def _serialize_split(circuit: Any, depth: int) -> Tuple[str, str]:
+        """Split the children of the operations at `depth` into a table.
+
+        The circuit is split before it is serialized, so its JSON is not parsed back.
+        The repeated subtrees of `Operation` records are serialized from the
+        fragments of the first one (see `quantum_viz.encoder`).
+
+        :param circuit: a qviz dictionary or a `CompactCircuit`
+        :return: the JSON of the circuit, and of the table of the children
+        """
+        if isinstance(circuit, CompactCircuit):
+            circuit = {"qubits": circuit.qubits, "operations": circuit.operations}
+        split_circuit, children_by_path = split_children(circuit, depth)
+        # The table is embedded in a script element, which must not be closed by it
+        children_value = circuit_to_json(children_by_path).replace("</", "<\\/")
+        return circuit_to_json(split_circuit), children_value
 
     @staticmethod
     def _get_base_url(version: Optional[str]) -> str:
@@ -123,19 +487,110 @@ class Viewer:
         if uid is None:
             uid = self._gen_uid()
         Viewer.n += 1
-        return _HTML_STR_FORMAT.format(
-            base_url=self.base_url,
-            js_source=JS_SOURCE,
-            uid=uid,
-            data=self.value,
-            style=self.style,
-        )
+        data = self.value
+        children = self.children_value
+        expand = f"({EXPAND_JS})" if self.dedupe else ""
+        if self.compress:
+            data = compress_json(data)
+            children = None if children is None else compress_json(children)
+            lazy_format = _COMPRESSED_LAZY_HTML_STR_FORMAT
+            html_format = _COMPRESSED_HTML_STR_FORMAT
+        else:
+            lazy_format = _LAZY_HTML_STR_FORMAT
+            html_format = _HTML_STR_FORMAT
+            if self.dedupe:
+                data = f"{expand}({data})"
+        if children is not None:
+            html = lazy_format.format(
+                base_url=self.base_url,
+                js_source=JS_SOURCE,
+                uid=uid,
+                data=data,
+                children=children,
+                style=self.style,
+                inflate=INFLATE_JS,
+                expand=expand,
+            )
+        else:
+            html = html_format.format(
+                base_url=self.base_url,
+                js_source=JS_SOURCE,
+                uid=uid,
+                data=data,
+                style=self.style,
+                inflate=INFLATE_JS,
+                expand=expand,
+            )
+        if self.offline:
+            html = _OFFLINE_LOADER_FORMAT.format(bundle=get_bundle()) + html
+        return html
 
     def _ipython_display_(self) -> None:
         """Display the widget with IPython."""
+        self._invalidate()
+        if self.background:
+            self.display_in_background()
+            return
+        from IPython.display import display
+        from IPython.display import HTML
+
         viewer = HTML(self.html_str())
         display(viewer)
 
+    def display_in_background(self) -> "Future[None]":
+        """Display a placeholder with IPython, replaced by the widget once rendered.
+
+        The circuit is parsed and serialized in a background thread, so the kernel
+        is not blocked meanwhile. The renders that the previous execution of the
+        notebook cell started are cancelled, if the frontend sends the id of the
+        cell (see `cancel`).
+
+        :return: the future of the render, which is done once the placeholder is
+          replaced
+        """
+        from IPython.display import display
+        from IPython.display import HTML
+
+        self._invalidate()
+        uid = self._gen_uid()
+        handle = display(
+            HTML(_PLACEHOLDER_FORMAT.format(uid=uid, width=self.width)),
+            display_id=True,
+        )
+        cancelled = threading.Event()
+        future = _get_render_executor().submit(
+            self._render_in_background, handle, uid, cancelled
+        )
+        render = _BackgroundRender(future, cancelled)
+        self._renders.append(render)
+        _track_cell_render(render)
+        return future
+
+    def _render_in_background(
+        self, handle: Any, uid: str, cancelled: threading.Event
+    ) -> None:
+        from IPython.display import HTML
+
+        try:
+            self._serialize()
+            if cancelled.is_set():
+                return
+            html = self.html_str(uid)
+        except Exception as e:
+            html = _ERROR_FORMAT.format(uid=uid, error=escape(str(e)))
+        if not cancelled.is_set():
+            handle.update(HTML(html))
+
+    def cancel(self) -> None:
+        """Cancel the background renders of the widget.
+
+        A render that has not started is dropped, and one that has keeps its
+        placeholder, since parsing the circuit cannot be interrupted.
+        """
+        for render in self._renders:
+            render.cancel()
+        self._renders = []
+
     def browser_display(self) -> None:
         """Display the widget in the browser."""
         raise NotImplementedError
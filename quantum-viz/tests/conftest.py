@@ -1,13 +1,22 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
 from pathlib import Path
+from typing import Iterator
+from typing import List
 
 import pytest
 from qiskit import AncillaRegister
 from qiskit import ClassicalRegister
 from qiskit import QuantumCircuit
 from qiskit import QuantumRegister
+from qiskit.circuit import Gate
 from qiskit.circuit import Parameter
+from qiskit.circuit.library import HGate
+from qiskit.circuit.library import QFT
+
+from quantum_viz.bundle import BUNDLE_ENV_VAR
+from quantum_viz.bundle import clear_bundle_cache
+from quantum_viz.cache import json_cache
 
 
 def qc_to_path(qc: QuantumCircuit) -> Path:
@@ -71,3 +80,105 @@ def conditioned_ops_qc(name: str = "conditioned_ops_qc") -> QuantumCircuit:
     qc.barrier()
     qc.measure_all()
     return qc
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--runslow", action="store_true", default=False, help="run slow tests"
+    )
+    parser.addoption(
+        "--runbenchmarks",
+        action="store_true",
+        default=False,
+        help="run tests that compare wall-clock times",
+    )
+
+
+def pytest_collection_modifyitems(
+    config: pytest.Config, items: List[pytest.Item]
+) -> None:
+    for marker, option in (("slow", "--runslow"), ("benchmark", "--runbenchmarks")):
+        if config.getoption(option):
+            continue
+        skip = pytest.mark.skip(reason=f"need {option} option to run")
+        for item in items:
+            if marker in item.keywords:
+                item.add_marker(skip)
+
+
+def layered_qc(num_gates: int, num_qubits: int = 10) -> QuantumCircuit:
+    """Create a circuit of `num_gates` single-qubit gates spread over layers."""
+    qc = QuantumCircuit(num_qubits, name=f"layered_{num_gates}")
+    gate = HGate()
+    qubits = qc.qubits
+    for i in range(num_gates):
+        qc._append(gate, [qubits[i % num_qubits]], [])
+    return qc
+
+
+@pytest.fixture()
+def repeated_composites_qc(name: str = "repeated_composites_qc") -> QuantumCircuit:
+    qft = QFT(3).to_gate()
+    sub = QuantumCircuit(2, 1, name="measured")
+    sub.h(0)
+    sub.cx(0, 1)
+    sub.measure(1, 0)
+    measured = sub.to_instruction()
+    qc = QuantumCircuit(6, 2, name=name)
+    for i in range(3):
+        qc.append(qft, [i, i + 1, i + 2])
+        qc.mcx([i, i + 1, i + 2], 5)
+        qc.rz(0.5, i)
+        qc.rz(1, i)
+    qc.append(measured, [0, 1], [0])
+    qc.append(measured, [3, 2], [1])
+    return qc
+
+
+def nested_qc(levels: int) -> QuantumCircuit:
+    """Create a circuit with a gate whose definition is nested `levels` deep."""
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    for level in range(levels):
+        gate = Gate(f"level_{level}", 2, [])
+        gate.definition = qc
+        qc = QuantumCircuit(2, name=f"nested_{levels}")
+        qc._append(gate, qc.qubits, [])
+    return qc
+
+
+def wide_nested_qc(width: int, levels: int = 2) -> QuantumCircuit:
+    """Create a circuit of `width` gates, whose definitions are nested `levels` deep.
+
+    Each definition holds `width` gates as well. The innermost gates have no
+    definition, so the number of operations does not depend on the gate library.
+    """
+    qc = QuantumCircuit(2)
+    leaf = Gate("leaf", 1, [])
+    for i in range(width):
+        qc._append(leaf, [qc.qubits[i % 2]], [])
+    for level in range(levels):
+        gate = Gate(f"wide_{level}", 2, [])
+        gate.definition = qc
+        qc = QuantumCircuit(2, name=f"wide_{width}x{levels}")
+        for _ in range(width):
+            qc._append(gate, qc.qubits, [])
+    return qc
+
+
+@pytest.fixture(autouse=True)
+def clear_json_cache() -> Iterator[None]:
+    """Keep the circuits serialized by a test out of the cache of the next ones."""
+    yield
+    json_cache.clear()
+
+
+@pytest.fixture()
+def qviz_bundle(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Path]:
+    """A stand-in for the quantum-viz.js bundle, set as the bundle to inline."""
+    path = tmp_path / "qviz.min.js"
+    path.write_text('var qviz = {STYLES: {}, draw: function() {}, end: "</script>"};')
+    monkeypatch.setenv(BUNDLE_ENV_VAR, str(path))
+    yield path
+    clear_bundle_cache()
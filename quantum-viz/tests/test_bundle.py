@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from pathlib import Path
+
+import pytest
+from quantum_viz.bundle import get_bundle
+from quantum_viz.bundle import get_bundle_path
+from tests.conftest import qviz_bundle  # noqa: F401
+
+
+def test_get_bundle(qviz_bundle: Path) -> None:  # noqa: F811
+    assert get_bundle_path() == qviz_bundle
+    bundle = get_bundle()
+    assert bundle.startswith("var qviz")
+    assert "</script>" not in bundle
+    assert 'end: "<\\/script>"' in bundle
+
+    # The bundle is read once
+    qviz_bundle.write_text("var qviz = {};")
+    assert get_bundle() is bundle
+    assert get_bundle(str(qviz_bundle)) is bundle
+
+
+def test_get_bundle_not_found(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError, match="npm run build:prod"):
+        get_bundle(tmp_path / "qviz.min.js")
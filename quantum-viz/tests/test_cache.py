@@ -0,0 +1,39 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from quantum_viz.cache import JsonCache
+
+
+def test_lru_eviction() -> None:
+    cache = JsonCache(max_bytes=10)
+    cache.put("a", "1234")
+    cache.put("b", "1234")
+    assert cache.get("a") == "1234"
+    cache.put("c", "1234")
+    # "b" is the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == "1234"
+    assert cache.get("c") == "1234"
+    assert cache.info().currbytes == 8
+    assert cache.info().hits == 3
+    assert cache.info().misses == 1
+
+
+def test_too_large_value() -> None:
+    cache = JsonCache(max_bytes=3)
+    cache.put("a", "1234")
+    assert cache.get("a") is None
+    assert cache.info().currbytes == 0
+
+
+def test_disk_tier(tmp_path) -> None:
+    cache = JsonCache(max_bytes=4, directory=tmp_path)
+    cache.put("a", "1234")
+    cache.put("b", "1234")
+    assert (tmp_path / "a.json").read_text() == "1234"
+    # Evicted from memory, but still found on disk
+    assert cache.get("a") == "1234"
+    cache.clear()
+    assert cache.get("b") == "1234"
+    # The disk tier is shared with other caches, e.g. of other processes
+    assert JsonCache(directory=tmp_path).get("a") == "1234"
+    assert list(tmp_path.glob("*.tmp")) == []
@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import json
+
+import pytest
+from click.testing import CliRunner
+from qiskit import qpy
+from qiskit import QuantumCircuit
+from quantum_viz.cli import main
+from quantum_viz.cli import MANIFEST_NAME
+from quantum_viz.qiskit_parser import qiskit2dict
+from tests.conftest import qviz_bundle  # noqa: F401
+from tests.conftest import simple_qc
+
+
+def _write_qasm(path, qc: QuantumCircuit) -> None:
+    path.write_text(qc.qasm())
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_cli_json(tmp_path, simple_qc: QuantumCircuit, jobs: str) -> None:
+    _write_qasm(tmp_path / "a.qasm", simple_qc)
+    (tmp_path / "nested").mkdir()
+    _write_qasm(tmp_path / "nested" / "b.qasm", simple_qc)
+    output_dir = tmp_path / "out"
+    result = CliRunner().invoke(
+        main,
+        [str(tmp_path / "**" / "*.qasm"), "-o", str(output_dir), "-f", "json"]
+        + ["-j", jobs],
+    )
+    assert result.exit_code == 0, result.output
+    assert "[2/2]" in result.output
+    assert "Converted 2 files" in result.output
+
+    expected_qc = QuantumCircuit.from_qasm_str(simple_qc.qasm())
+    for name in ("a", "b"):
+        expected_qc.name = name
+        qviz_dict = json.loads((output_dir / f"{name}.json").read_text())
+        assert qviz_dict == json.loads(json.dumps(qiskit2dict(expected_qc)))
+    assert (output_dir / MANIFEST_NAME).exists()
+
+
+def test_cli_html_qpy(tmp_path, simple_qc: QuantumCircuit) -> None:
+    with (tmp_path / "circuits.qpy").open("wb") as fp:
+        qpy.dump([simple_qc, simple_qc], fp)
+    result = CliRunner().invoke(main, [str(tmp_path / "*.qpy"), "--style", "Inverted"])
+    assert result.exit_code == 0, result.output
+
+    for i in range(2):
+        content = (tmp_path / f"circuits_{i}.html").read_text()
+        assert content.startswith("<!DOCTYPE html>")
+        assert "var circuit = {" in content
+
+
+def test_cli_offline(
+    tmp_path, qviz_bundle, simple_qc: QuantumCircuit  # noqa: F811
+) -> None:
+    _write_qasm(tmp_path / "a.qasm", simple_qc)
+    result = CliRunner().invoke(main, [str(tmp_path / "*.qasm"), "--offline"])
+    assert result.exit_code == 0, result.output
+
+    content = (tmp_path / "a.html").read_text()
+    assert "unpkg.com" not in content
+    assert "var qviz" in content
+
+
+def test_cli_up_to_date(tmp_path, simple_qc: QuantumCircuit) -> None:
+    runner = CliRunner()
+    input_path = tmp_path / "a.qasm"
+    _write_qasm(input_path, simple_qc)
+    args = [str(tmp_path / "*.qasm"), "-f", "json", "-j", "1"]
+    assert runner.invoke(main, args).exit_code == 0
+
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert "Skipping 1 up-to-date files" in result.output
+    assert "Converted 0 files" in result.output
+
+    # Changing the options converts the file again
+    result = runner.invoke(main, args + ["--precision", "4"])
+    assert "Converted 1 files" in result.output
+
+    result = runner.invoke(main, args + ["--force"])
+    assert "Converted 1 files" in result.output
+
+    simple_qc.x(0)
+    _write_qasm(input_path, simple_qc)
+    result = runner.invoke(main, args)
+    assert "Converted 1 files" in result.output
+
+    (tmp_path / "a.json").unlink()
+    result = runner.invoke(main, args)
+    assert "Converted 1 files" in result.output
+
+
+def test_cli_same_stems(tmp_path, simple_qc: QuantumCircuit) -> None:
+    for directory in ("a", "b"):
+        (tmp_path / directory).mkdir()
+        _write_qasm(tmp_path / directory / "circuit.qasm", simple_qc)
+    runner = CliRunner()
+    args = [str(tmp_path / "*" / "*.qasm"), "-f", "json", "-j", "1"]
+
+    # The outputs would overwrite each other in a single output directory
+    output_dir = tmp_path / "out"
+    result = runner.invoke(main, args + ["-o", str(output_dir)])
+    assert result.exit_code == 2
+    assert "would both be converted to" in result.output
+    assert not output_dir.exists()
+
+    # Next to their inputs, they do not
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+    for directory in ("a", "b"):
+        assert (tmp_path / directory / "circuit.json").exists()
+
+    # Neither do inputs of the same path
+    result = runner.invoke(
+        main, args + [str(tmp_path / "a" / ".." / "a" / "circuit.qasm"), "--force"]
+    )
+    assert result.exit_code == 0, result.output
+
+
+def test_cli_errors(tmp_path) -> None:
+    runner = CliRunner()
+    result = runner.invoke(main, [str(tmp_path / "*.qasm")])
+    assert result.exit_code == 2
+    assert "No .qasm or .qpy files match" in result.output
+
+    (tmp_path / "invalid.qasm").write_text("not qasm")
+    result = runner.invoke(main, [str(tmp_path / "*.qasm"), "-j", "1"])
+    assert result.exit_code == 1
+    assert "invalid.qasm: failed" in result.output
+    assert not (tmp_path / MANIFEST_NAME).exists()
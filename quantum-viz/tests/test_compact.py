@@ -0,0 +1,67 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import json
+
+import pytest
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.compact import JSON_SEPARATORS
+from quantum_viz.compact import CompactCircuit
+from quantum_viz.compact import Operation
+
+
+@pytest.fixture
+def circuit():
+    circuit = {
+        "qubits": [{"id": 0}, {"id": 1, "numChildren": 1}],
+        "operations": [
+            {
+                "gate": "H",
+                "targets": [{"qId": 0}],
+            },
+            {
+                "gate": "X",
+                "isControlled": True,
+                "controls": [{"qId": 0}],
+                "targets": [{"qId": 1}],
+                "children": [{"gate": "U", "displayArgs": "(1)", "targets": []}],
+            },
+            {
+                "gate": "Measure",
+                "isMeasurement": True,
+                "controls": [{"qId": 1}],
+                "targets": [{"type": 1, "qId": 1, "cId": 0}],
+                "dataAttributes": {"id": "m"},
+            },
+        ],
+    }
+    return circuit
+
+
+def test_operation_mapping_interface():
+    op = Operation(gate="H")
+    op["targets"] = [{"qId": 0}]
+    assert op["gate"] == "H"
+    assert "targets" in op
+    assert "controls" not in op
+    assert op.get("children", []) == []
+    with pytest.raises(KeyError):
+        op["controls"]
+    op["displayArgs"] = "(1)"
+    assert list(op.keys()) == ["gate", "displayArgs", "targets"]
+    assert op.pop("displayArgs") == "(1)"
+    assert op.pop("displayArgs", None) is None
+
+    copy = op.copy()
+    copy["gate"] = "X"
+    assert op["gate"] == "H"
+    assert op == {"gate": "H", "targets": [{"qId": 0}]}
+
+
+def test_compact_circuit_serialization(circuit):
+    operations = [Operation.from_dict(op) for op in circuit["operations"]]
+    assert isinstance(operations[1]["children"][0], Operation)
+    compact_circuit = CompactCircuit(circuit["qubits"], operations)
+    assert compact_circuit.to_dict() == circuit
+    assert compact_circuit.to_json() == json.dumps(circuit, separators=JSON_SEPARATORS)
+    assert compact_circuit.to_json(separators=None) == json.dumps(circuit)
+    assert circuit_to_json(compact_circuit) == circuit_to_json(circuit)
@@ -0,0 +1,26 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import base64
+import gzip
+import io
+import json
+
+from quantum_viz.compress import compress_json
+from quantum_viz.compress import CompressingWriter
+
+
+def test_compress_json() -> None:
+    text = json.dumps({"operations": [{"gate": "H"}] * 1000})
+    payload = compress_json(text)
+    assert len(payload) < len(text) / 10
+    assert gzip.decompress(base64.b64decode(payload)).decode() == text
+
+
+def test_compressing_writer() -> None:
+    text = json.dumps({"operations": [{"gate": f"G{i}"} for i in range(1000)]})
+    fp = io.StringIO()
+    writer = CompressingWriter(fp)
+    for i in range(0, len(text), 7):
+        writer.write(text[i : i + 7])
+    writer.close()
+    assert fp.getvalue() == compress_json(text)
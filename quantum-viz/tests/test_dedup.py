@@ -0,0 +1,62 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import json
+import sys
+
+from qiskit import QuantumCircuit
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.dedup import DEFINITIONS_KEY
+from quantum_viz.dedup import dedupe_children
+from quantum_viz.dedup import expand_children
+from quantum_viz.qiskit_parser import qiskit2dict
+from tests.conftest import *  # noqa: F403
+from tests.conftest import nested_qc
+
+
+def test_dedupe_children(simple_qc, conditioned_ops_qc, repeated_composites_qc) -> None:
+    for qc in (simple_qc, conditioned_ops_qc, repeated_composites_qc, nested_qc(20)):
+        qviz_dict = json.loads(json.dumps(qiskit2dict(qc)))
+        deduped = dedupe_children(qviz_dict)
+        assert "children" not in circuit_to_json(deduped)
+        assert expand_children(json.loads(circuit_to_json(deduped))) == qviz_dict
+
+
+def test_dedupe_repeated_children(repeated_composites_qc: QuantumCircuit) -> None:
+    qviz_dict = qiskit2dict(repeated_composites_qc)
+    deduped = dedupe_children(qviz_dict)
+    (root,) = deduped["operations"]
+    definitions = deduped[DEFINITIONS_KEY]
+    qfts = [op for op in definitions[root["definition"]] if op["gate"] == "QFT"]
+    assert len(qfts) == 3
+    # The QFT gates on different qubits share their definition
+    assert len({op["definition"] for op in qfts}) == 1
+    qubit_ids = [[root["qIds"][i] for i in op["qIds"]] for op in qfts]
+    assert qubit_ids == [[0, 1, 2], [1, 2, 3], [2, 3, 4]]
+    measured = [
+        op for op in definitions[root["definition"]] if op["gate"] == "measured"
+    ]
+    assert measured[0]["definition"] == measured[1]["definition"]
+    qubit_ids = [[root["qIds"][i] for i in op["qIds"]] for op in measured]
+    assert qubit_ids == [[0, 1], [3, 2]]
+    assert len(circuit_to_json(deduped)) < len(circuit_to_json(qviz_dict))
+
+
+def test_dedupe_nested_children() -> None:
+    # The definitions are nested deeper than the recursion limit
+    levels = 3 * sys.getrecursionlimit()
+    qviz_dict = qiskit2dict(nested_qc(levels), iterative=True)
+    deduped = dedupe_children(qviz_dict)
+    assert len(deduped[DEFINITIONS_KEY]) > levels
+    expanded = expand_children(deduped)
+    # The circuits are compared level by level, as comparing them recursively would
+    # exceed the recursion limit
+    ops, expected_ops = expanded["operations"], qviz_dict["operations"]
+    while expected_ops:
+        assert [{**op, "children": None} for op in ops] == [
+            {**op, "children": None} for op in expected_ops
+        ]
+        ops = [child for op in ops for child in op.get("children", [])]
+        expected_ops = [
+            child for op in expected_ops for child in op.get("children", [])
+        ]
+    assert not ops
@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import json
+
+import pytest
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.compact import JSON_SEPARATORS
+from quantum_viz.compact import Operation
+from quantum_viz.encoder import FragmentEncoder
+from quantum_viz.qiskit_parser import qiskit2compact
+from quantum_viz.qiskit_parser import qiskit2dict
+from tests.conftest import conditioned_ops_qc  # noqa: F401
+from tests.conftest import repeated_composites_qc  # noqa: F401
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=JSON_SEPARATORS)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"gate": "H", "targets": [{"qId": 0}]},
+        {"gate": 'Rx₀ "θ"', "displayArgs": "(0.50)", "targets": []},
+        {"gate": "X", "isControlled": False, "controls": [], "targets": [{}]},
+        {"gate": "Y", "targets": [{"qId": 1}, {"qId": True}, {"qId": 1.0}]},
+        {"gate": "Z", "targets": [{"qId": [0]}, 3], "conditionalRender": 2},
+        {"gate": "U", "dataAttributes": {"id": None}, "children": [{"gate": "V"}]},
+        {"gate": "U", 1: "one", "children": []},
+        [{"gate": "H"}, [], {}, "G", 1.5, -2, None],
+    ],
+)
+def test_encode(value) -> None:
+    encoder = FragmentEncoder()
+    for _ in range(2):
+        # Encoded again from the fragments of the first time
+        assert encoder.encode(value) == _dumps(value)
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        op = Operation.from_dict(value)
+        assert encoder.encode(op) == _dumps(op.to_dict())
+
+
+def test_encode_records(
+    conditioned_ops_qc, repeated_composites_qc  # noqa: F811
+) -> None:
+    encoder = FragmentEncoder()
+    for qc in (conditioned_ops_qc, repeated_composites_qc):
+        compact_circuit = qiskit2compact(qc)
+        expected = _dumps(qiskit2dict(qc))
+        assert encoder.encode(compact_circuit) == expected
+        assert encoder.encode(compact_circuit.operations) == _dumps(
+            qiskit2dict(qc)["operations"]
+        )
+        assert circuit_to_json(compact_circuit) == expected
+        assert circuit_to_json(compact_circuit.to_dict()) == expected
+
+
+def test_encode_max_fragments() -> None:
+    encoder = FragmentEncoder(max_fragments=2)
+    operations = [
+        Operation(gate=f"G{i % 5}", targets=[{"qId": i % 3}]) for i in range(20)
+    ]
+    expected = _dumps([op.to_dict() for op in operations])
+    assert encoder.encode(operations) == expected
+    assert len(encoder._strings) <= 2
+    assert len(encoder._registers) <= 2
+    encoder.clear()
+    assert not encoder._strings
+    assert encoder.encode(operations) == expected
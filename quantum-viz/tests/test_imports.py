@@ -0,0 +1,64 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+# The modules that scripts and batch jobs should not import, unless they use them
+HEAVY_MODULES = ("IPython", "varname", "qiskit", "numpy")
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """Run the code in a new interpreter, with ``-X importtime``.
+
+    :return: the cumulative import time of each imported module, in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import quantum_viz",
+        "from quantum_viz.utils import display",
+        "from quantum_viz.compact import circuit_to_json",
+        "from quantum_viz.cli import main",
+    ],
+)
+def test_import_time(code: str) -> None:
+    times = _import_times(code)
+    assert "quantum_viz" in times
+    heavy = [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+    assert not heavy
+
+
+def test_parser_imported_lazily() -> None:
+    # Creating a widget of a Qiskit circuit, and checking whether the outputs of
+    # the CLI are up to date, do not import the parser
+    code = (
+        "import sys\n"
+        "from pathlib import Path\n"
+        "from qiskit import QuantumCircuit\n"
+        "from quantum_viz import Viewer\n"
+        "from quantum_viz.cli import _get_input_key\n"
+        "Viewer(QuantumCircuit(1), name='qc')\n"
+        "_get_input_key(Path('pyproject.toml'), {})\n"
+        "assert 'quantum_viz.qiskit_parser' not in sys.modules\n"
+    )
+    assert "quantum_viz.widget" in _import_times(code)
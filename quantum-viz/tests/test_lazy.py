@@ -0,0 +1,57 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+from typing import Dict
+from typing import List
+
+import pytest
+from quantum_viz.lazy import split_children
+from quantum_viz.qiskit_parser import qiskit2compact
+from quantum_viz.qiskit_parser import qiskit2dict
+from tests.conftest import *  # noqa: F403
+
+
+def _load_children(operations: List, children_by_path: Dict[str, List], prefix=""):
+    """Expand all the split operations, as the viewer does."""
+    for i, op in enumerate(operations):
+        path = f"{prefix}{i}"
+        if path in children_by_path:
+            op["children"] = children_by_path[path]
+        _load_children(op.get("children", []), children_by_path, f"{path}-")
+
+
+@pytest.mark.parametrize("depth", [1, 2, 3])
+def test_split_children(repeated_composites_qc, conditioned_ops_qc, depth) -> None:
+    for qc in (repeated_composites_qc, conditioned_ops_qc):
+        qviz_dict = qiskit2dict(qc)
+        circuit, children_by_path = split_children(qviz_dict, depth)
+        # The circuit is expanded automatically, so its operations are not split
+        (root,) = circuit["operations"]
+        assert "0" not in children_by_path
+        for op in root["children"]:
+            if depth == 1 and "children" in op and not op.get("isConditional"):
+                assert op["children"] == []
+
+        _load_children(circuit["operations"], children_by_path)
+        assert circuit == qviz_dict
+        # The circuit is not changed
+        assert qviz_dict == qiskit2dict(qc)
+
+
+def test_split_children_paths(repeated_composites_qc) -> None:
+    qviz_dict = qiskit2dict(repeated_composites_qc)
+    _, children_by_path = split_children(qviz_dict)
+    qft = qviz_dict["operations"][0]["children"][0]
+    assert qft["gate"] == "QFT"
+    assert children_by_path["0-0"] is qft["children"]
+    # The children in the table are whole subtrees, which are not split again
+    assert qft["children"][0]["children"]
+    assert "0-0-0" not in children_by_path
+
+
+def test_split_children_compact(repeated_composites_qc) -> None:
+    circuit = qiskit2compact(repeated_composites_qc)
+    split_circuit, children_by_path = split_children(
+        {"qubits": circuit.qubits, "operations": circuit.operations}
+    )
+    expected = split_children(qiskit2dict(repeated_composites_qc))
+    assert (split_circuit, children_by_path) == expected
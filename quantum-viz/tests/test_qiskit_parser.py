@@ -1,8 +1,39 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
+import io
 import json
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 
+import pytest
+from qiskit import QuantumCircuit
+from qiskit import QuantumRegister
+from qiskit.circuit import Gate
+from qiskit.circuit import Parameter
+from qiskit.circuit.library import HGate
+from qiskit.circuit.library import PauliEvolutionGate
+from qiskit.circuit.library import QFT
+from qiskit.circuit.library import RXGate
+from qiskit.circuit.library import XGate
+from qiskit.quantum_info import SparsePauliOp
+
+from quantum_viz import qiskit_parser
+from quantum_viz.compact import circuit_to_json
+from quantum_viz.compact import JSON_SEPARATORS
+from quantum_viz.cache import json_cache
+from quantum_viz.compact import Operation
+from quantum_viz.qiskit_parser import qiskit2compact
 from quantum_viz.qiskit_parser import qiskit2dict
+from quantum_viz.qiskit_parser import qiskit2json
+from quantum_viz.qiskit_parser import qiskit2json_stream
+from quantum_viz.qiskit_parser import qiskit2ops
+from quantum_viz.qiskit_parser import qiskit_circuit_key
+from quantum_viz.qiskit_parser import ProfilingCircuitParser
+from quantum_viz.qiskit_parser import QiskitCircuitParser
+from quantum_viz.qiskit_parser import register_instruction_handler
 from tests.conftest import *  # noqa: F403
 
 
@@ -35,3 +66,660 @@ def test_qviz_dict(
         conditioned_ops_qc,
     ]:
         assert qiskit2dict(circuit) == _get_snapshot(circuit)
+
+
+def _time_per_gate(num_gates: int, repeat: int = 3) -> float:
+    qc = layered_qc(num_gates)  # noqa: F405
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        qiskit2dict(qc, max_recursion_depth=1)
+        best = min(best, time.perf_counter() - start)
+    return best / num_gates
+
+
+def _assert_linear_scaling(sizes: List[int]) -> None:
+    per_gate = [_time_per_gate(size) for size in sizes]
+    # A quadratic parser would grow the per-gate time in proportion to the circuit
+    # size. The allocator and the CPU caches grow it as well, e.g. about 4x from 1k
+    # to 100k gates, so the bound is the square root of the size ratio instead
+    for size, size_per_gate in zip(sizes[1:], per_gate[1:]):
+        bound = (size / sizes[0]) ** 0.5 * per_gate[0]
+        assert size_per_gate < bound, dict(zip(sizes, per_gate))
+
+
+@pytest.mark.benchmark
+def test_parse_time_scales_linearly() -> None:
+    _assert_linear_scaling([1_000, 10_000, 100_000])
+
+
+@pytest.mark.slow
+@pytest.mark.benchmark
+def test_parse_time_scales_linearly_1m() -> None:
+    _assert_linear_scaling([1_000, 10_000, 100_000, 1_000_000])
+
+
+class _CountingParser(QiskitCircuitParser):
+    """Count the operations copied into the children lists of the operations."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.num_copied = 0
+        super().__init__(*args, **kwargs)
+
+    def _set_children(self, op_dict, children) -> None:
+        self.num_copied += len(op_dict.get("children", ())) + len(children)
+        super()._set_children(op_dict, children)
+
+
+def _count_nested_children(operations: List) -> int:
+    """Count the operations in the children lists below the given operations."""
+    count = 0
+    stack = list(operations)
+    while stack:
+        children = stack.pop().get("children", [])
+        count += len(children)
+        stack.extend(children)
+    return count
+
+
+@pytest.mark.parametrize("iterative", [False, True])
+def test_children_built_in_linear_time(iterative) -> None:
+    for width in (10, 40):
+        qc = wide_nested_qc(width)  # noqa: F405
+        # Without the definitions cache, every children list is built by the parser
+        parser = _CountingParser(qc, iterative=iterative, definition_cache_size=0)
+        (root,) = parser.operations
+        # Each children list is built once, rather than copied for every child
+        assert parser.num_copied == _count_nested_children(root["children"])
+        assert parser.num_copied == width**2 + width**3
+
+
+@pytest.mark.parametrize("max_recursion_depth", [None, 3])
+def test_definition_cache(repeated_composites_qc, max_recursion_depth) -> None:
+    uncached = QiskitCircuitParser(
+        repeated_composites_qc,
+        max_recursion_depth=max_recursion_depth,
+        definition_cache_size=0,
+    )
+    cached = QiskitCircuitParser(
+        repeated_composites_qc, max_recursion_depth=max_recursion_depth
+    )
+    assert cached.qviz_dict == uncached.qviz_dict
+    assert cached.definition_cache_info.hits > 0
+    assert uncached.definition_cache_info.currsize == 0
+
+
+def test_definition_cache_singleton_gates() -> None:
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.append(QFT(2).to_gate(), [0, 1])
+    # The singleton classes of qiskit-terra 0.45 and later have no module
+    singleton_h = type("_SingletonHGate", (HGate,), {})
+    singleton_h.__module__ = None
+    qc.append(singleton_h(), [1])
+
+    assert all(
+        QiskitCircuitParser._is_standard_gate(instruction.operation)
+        for instruction in qc.data[:2] + qc.data[3:]
+    )
+    assert not QiskitCircuitParser._is_standard_gate(qc.data[2].operation)
+    children = qiskit2dict(qc)["operations"][0]["children"]
+    assert [op["gate"] for op in children] == ["H", "X", "QFT", "H"]
+    assert qiskit2dict(qc) == qiskit2dict(qc, definition_cache_size=0)
+
+
+def test_definition_cache_copies(repeated_composites_qc) -> None:
+    qc = repeated_composites_qc
+    parser = QiskitCircuitParser(qc)
+    # Mutating the output does not change the children served by the cache later
+    for op in parser.operations[0]["children"]:
+        for child in op.get("children", []):
+            child["gate"] = "mutated"
+    qc.append(qc.data[0].operation, [3, 4, 5])
+    parser.update()
+    (root,) = qiskit2dict(qc, definition_cache_size=0)["operations"]
+    assert parser.operations[0]["children"][-1] == root["children"][-1]
+
+
+def test_definition_cache_overridden_standard_gate() -> None:
+    overridden = HGate()
+    if hasattr(overridden, "to_mutable"):  # The singletons of qiskit-terra 0.45
+        overridden = overridden.to_mutable()
+    definition = QuantumCircuit(1)
+    definition.x(0)
+    overridden.definition = definition
+    qc = QuantumCircuit(1)
+    qc.h(0)
+    qc.append(overridden, [0])
+    qc.h(0)
+
+    first, second, third = qiskit2dict(qc)["operations"][0]["children"]
+    assert [op["gate"] for op in second["children"]] == ["X"]
+    assert first["children"] == third["children"] != second["children"]
+    assert qiskit2dict(qc) == qiskit2dict(qc, definition_cache_size=0)
+
+
+def test_definition_cache_bounded(repeated_composites_qc) -> None:
+    parser = QiskitCircuitParser(repeated_composites_qc, definition_cache_size=2)
+    info = parser.definition_cache_info
+    assert info.maxsize == 2
+    assert info.currsize == 2
+    assert parser.qviz_dict == qiskit2dict(
+        repeated_composites_qc, definition_cache_size=0
+    )
+
+
+def test_iterative_engine(
+    simple_qc, parametrized_qc, conditioned_ops_qc, repeated_composites_qc
+) -> None:
+    for circuit in [
+        simple_qc,
+        parametrized_qc,
+        conditioned_ops_qc,
+        repeated_composites_qc,
+    ]:
+        assert qiskit2dict(circuit, iterative=True) == qiskit2dict(circuit)
+        assert qiskit2dict(
+            circuit, iterative=True, definition_cache_size=0
+        ) == qiskit2dict(circuit, definition_cache_size=0)
+
+
+def test_iterative_engine_deep_definitions() -> None:
+    levels = 3 * sys.getrecursionlimit()
+    qc = nested_qc(levels)  # noqa: F405
+    with pytest.raises(RecursionError):
+        qiskit2dict(qc)
+
+    op = qiskit2dict(qc, iterative=True)["operations"][0]
+    for level in reversed(range(levels)):
+        (op,) = op["children"]
+        assert op["gate"] == f"level_{level}"
+    assert [child["gate"] for child in op["children"]] == ["H", "X"]
+
+
+def test_controlled_gate_ctrl_state() -> None:
+    qc = QuantumCircuit(13)  # noqa: F405
+    qc.mcx(list(range(12)), 12)
+    (op,) = qiskit2dict(qc, max_recursion_depth=1)["operations"][0]["children"]
+    assert op["gate"] == "X"
+    assert len(op["controls"]) == 12
+
+    qc = QuantumCircuit(3)  # noqa: F405
+    qc.append(XGate().control(2, ctrl_state="01"), [0, 1, 2])
+    with pytest.raises(NotImplementedError):
+        qiskit2dict(qc)
+
+
+@pytest.mark.parametrize("max_recursion_depth", [None, 1])
+def test_controlled_gate_ctrl_state_semantics(max_recursion_depth) -> None:
+    # Controlled on all 1's, the operation is that of the original parser
+    qc = QuantumCircuit(3)
+    qc.append(XGate().control(2, ctrl_state=3), [0, 1, 2])
+    root = qiskit2dict(qc, max_recursion_depth=max_recursion_depth)["operations"][0]
+    (op,) = root["children"]
+    op.pop("children", None)
+    assert op == {
+        "gate": "X",
+        "isControlled": True,
+        "controls": [{"qId": 0}, {"qId": 1}],
+        "targets": [{"qId": 2}],
+    }
+
+    # Only the state of all 1's is drawn: the states 1 and 2 of two controls, whose
+    # decimal digits are not 0, are rejected too
+    for ctrl_state in (0, 1, 2):
+        qc = QuantumCircuit(3)
+        qc.append(XGate().control(2, ctrl_state=ctrl_state), [0, 1, 2])
+        with pytest.raises(NotImplementedError):
+            qiskit2dict(qc, max_recursion_depth=max_recursion_depth)
+
+
+@pytest.mark.parametrize("max_recursion_depth", [None, 1, 2])
+def test_json_stream(
+    empty_qc,
+    no_ops_regs_qc,
+    simple_qc,
+    parametrized_qc,
+    conditioned_ops_qc,
+    repeated_composites_qc,
+    max_recursion_depth,
+) -> None:
+    for circuit in [
+        empty_qc,
+        no_ops_regs_qc,
+        simple_qc,
+        parametrized_qc,
+        conditioned_ops_qc,
+        repeated_composites_qc,
+    ]:
+        fp = io.StringIO()
+        qiskit2json_stream(circuit, fp, max_recursion_depth=max_recursion_depth)
+        assert json.loads(fp.getvalue()) == qiskit2dict(
+            circuit, max_recursion_depth=max_recursion_depth
+        )
+
+
+def test_json_stream_memory_does_not_grow() -> None:
+    # Discard the written text, to measure the memory used by the writer alone
+    class _Sink(io.StringIO):
+        def write(self, text: str) -> int:
+            return len(text)
+
+    def peak(num_gates: int) -> int:
+        qc = layered_qc(num_gates)  # noqa: F405
+        tracemalloc.start()
+        try:
+            qiskit2json_stream(qc, _Sink())
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(20_000) < 2 * peak(2_000)
+
+
+@pytest.mark.parametrize("iterative", [False, True])
+def test_compact(
+    simple_qc, parametrized_qc, conditioned_ops_qc, repeated_composites_qc, iterative
+) -> None:
+    for circuit in [
+        simple_qc,
+        parametrized_qc,
+        conditioned_ops_qc,
+        repeated_composites_qc,
+    ]:
+        expected = qiskit2dict(circuit)
+        compact_circuit = qiskit2compact(circuit, iterative=iterative)
+        assert all(isinstance(op, Operation) for op in compact_circuit.operations)
+        assert compact_circuit.to_dict() == expected
+        assert compact_circuit.to_json() == json.dumps(
+            expected, separators=JSON_SEPARATORS
+        )
+
+
+def test_share_references(conditioned_ops_qc, repeated_composites_qc) -> None:
+    for circuit in [conditioned_ops_qc, repeated_composites_qc]:
+        shared = qiskit2dict(circuit)
+        unshared = qiskit2dict(circuit, share_references=False)
+        assert shared == unshared
+
+    root = qiskit2dict(conditioned_ops_qc)["operations"][0]
+    h_gate, measure = root["children"][0], root["children"][3]
+    assert root["targets"][0] is h_gate["targets"][0] is measure["controls"][0]
+
+    root = qiskit2dict(conditioned_ops_qc, share_references=False)["operations"][0]
+    h_gate, measure = root["children"][0], root["children"][3]
+    assert root["targets"][0] is not h_gate["targets"][0]
+    h_gate["targets"][0]["qId"] = 2
+    assert measure["controls"][0] == {"qId": 0}
+
+
+class _PerInstructionParser(QiskitCircuitParser):
+    """Parse flat circuits one instruction at a time, like deeper circuits."""
+
+    def _parse_flat_operations(self, data):
+        return [
+            self._parse_operation(instruction, qargs, cargs, depth=1)
+            for instruction, qargs, cargs in self._filter_circuit_data(data)
+        ]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("share_references", [False, True])
+@pytest.mark.parametrize("skip_barriers", [False, True])
+def test_flat_circuit_bulk_parse(
+    simple_qc,
+    parametrized_qc,
+    conditioned_ops_qc,
+    repeated_composites_qc,
+    compact,
+    share_references,
+    skip_barriers,
+) -> None:
+    kwargs = dict(
+        max_recursion_depth=1,
+        compact=compact,
+        share_references=share_references,
+        skip_barriers=skip_barriers,
+    )
+    for circuit in [
+        simple_qc,
+        parametrized_qc,
+        conditioned_ops_qc,
+        repeated_composites_qc,
+    ]:
+        expected = _PerInstructionParser(circuit, **kwargs).qviz_dict
+        qviz_dict = QiskitCircuitParser(circuit, **kwargs).qviz_dict
+        # Compare the JSON, to check the order of the keys too
+        assert json.dumps(qviz_dict, default=Operation.to_dict) == json.dumps(
+            expected, default=Operation.to_dict
+        )
+
+
+def test_flat_circuit_without_numpy(
+    simple_qc, conditioned_ops_qc, repeated_composites_qc, monkeypatch
+) -> None:
+    circuits = [simple_qc, conditioned_ops_qc, repeated_composites_qc]
+    expected = [qiskit2dict(qc, max_recursion_depth=1) for qc in circuits]
+    # Importing a module that is None in sys.modules raises ImportError
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    for qc, qviz_dict in zip(circuits, expected):
+        assert qiskit2dict(qc, max_recursion_depth=1) == qviz_dict
+
+
+def test_instruction_handlers() -> None:
+    class PulseGate(Gate):
+        def __init__(self, duration: int) -> None:
+            super().__init__("pulse", 1, [duration])
+
+    class ShortPulseGate(PulseGate):
+        pass
+
+    def handle_pulse_gate(parser, op_dict, instruction, qargs, cargs, depth):
+        op_dict["gate"] = f"pulse[{instruction.params[0]}dt]"
+        del op_dict["displayArgs"]
+        op_dict["targets"] = parser.get_qubit_refs(qargs)
+
+    qc = QuantumCircuit(2)
+    qc.append(PulseGate(160), [0])
+    qc.append(ShortPulseGate(16), [1])
+    qc.h(0)
+    default_gates = qiskit2dict(qc)["operations"][0]["children"]
+    assert default_gates[0] == {
+        "gate": "pulse",
+        "displayArgs": "(160)",
+        "targets": [{"qId": 0}],
+    }
+
+    register_instruction_handler(PulseGate, handle_pulse_gate)
+    try:
+        for max_recursion_depth in [None, 1]:
+            gates = qiskit2dict(qc, max_recursion_depth=max_recursion_depth)[
+                "operations"
+            ][0]["children"]
+            assert gates[:2] == [
+                {"gate": "pulse[160dt]", "targets": [{"qId": 0}]},
+                {"gate": "pulse[16dt]", "targets": [{"qId": 1}]},
+            ]
+            assert gates[2]["gate"] == "H"
+    finally:
+        register_instruction_handler(PulseGate, None)
+    assert qiskit2dict(qc)["operations"][0]["children"] == default_gates
+
+
+def test_params_formatting() -> None:
+    theta = Parameter("θ")
+    qc = QuantumCircuit(1)
+    qc.rz(theta, 0)
+    qc.rz(2 * theta, 0)
+    qc.rz(0.5, 0)
+    qc.u(1, 1.0, -0.0, 0)
+    qc.u(1.0, 1, 0.0, 0)
+    bound_qc = qc.copy()
+    for instruction in bound_qc.data[:2]:
+        instruction.operation.params = [
+            param.bind({theta: 0.5}) for param in instruction.operation.params
+        ]
+
+    def display_args(circuit, precision):
+        children = qiskit2dict(circuit, max_recursion_depth=1, precision=precision)[
+            "operations"
+        ][0]["children"]
+        return [op["displayArgs"] for op in children]
+
+    for _ in range(2):  # the second time from the cache
+        assert display_args(qc, 2) == [
+            "(θ)",
+            "(2*θ)",
+            "(0.50)",
+            "(1, 1.00, -0.00)",
+            "(1.00, 1, 0.00)",
+        ]
+        assert display_args(bound_qc, 2)[:2] == ["(0.50)", "(1.00)"]
+        assert display_args(bound_qc, 3)[:3] == ["(0.500)", "(1.000)", "(0.500)"]
+
+
+@pytest.mark.parametrize("share_references", [False, True])
+def test_parallel_parse(
+    simple_qc, conditioned_ops_qc, repeated_composites_qc, share_references
+) -> None:
+    for circuit in [simple_qc, conditioned_ops_qc, repeated_composites_qc]:
+        for kwargs in [{}, {"iterative": True}, {"compact": True}]:
+            kwargs["share_references"] = share_references
+            sequential = QiskitCircuitParser(circuit, **kwargs)
+            parallel = QiskitCircuitParser(circuit, workers=2, **kwargs)
+            # Compare the JSON, to check the order of the keys too
+            assert json.dumps(parallel.qviz_dict, default=Operation.to_dict) == (
+                json.dumps(sequential.qviz_dict, default=Operation.to_dict)
+            )
+
+
+def test_parallel_parse_shares_workers(repeated_composites_qc, monkeypatch) -> None:
+    pools = []
+
+    class _RecordingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs) -> None:
+            pools.append(kwargs["initargs"])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(qiskit_parser, "ProcessPoolExecutor", _RecordingPool)
+    qc = repeated_composites_qc
+    qubits, operations = qiskit2ops(qc, chunk_size=2, workers=2)
+    expected = qiskit2dict(qc)
+    assert list(operations) == expected["operations"][0]["children"]
+    assert qubits == expected["qubits"]
+    # The chunks are parsed by the same workers, which are sent the circuit and the
+    # options rather than the parser
+    ((circuit, options),) = pools
+    assert circuit is qc
+    assert "workers" not in options
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"max_recursion_depth": 1}, {"compact": True}, {"workers": 2}]
+)
+def test_update(conditioned_ops_qc, kwargs) -> None:
+    qc = conditioned_ops_qc
+    parser = QiskitCircuitParser(qc, **kwargs)
+    assert parser.to_json() == qiskit2json(qc, **kwargs)
+
+    # Appended instructions are parsed incrementally
+    qc.h(0)
+    qc.measure(0, 1)
+    qc.x(2).c_if(qc.cregs[1], 0)
+    qc.reset(1)
+    parsed_children = parser.operations[0]["children"]
+    parser.update()
+    assert parser.operations[0]["children"] is parsed_children
+    expected = QiskitCircuitParser(qc, **kwargs)
+    assert parser.qviz_dict == expected.qviz_dict
+    assert parser.to_json() == expected.to_json() == circuit_to_json(expected.qviz_dict)
+    assert qiskit2json(qc, **kwargs) == expected.to_json()
+
+    # Replaced instructions and new qubits are parsed from scratch
+    qc.data[0] = qc.data[1]
+    qc.add_register(QuantumRegister(1))
+    parser.update()
+    expected = QiskitCircuitParser(qc, **kwargs)
+    assert parser.qviz_dict == expected.qviz_dict
+    assert parser.to_json() == expected.to_json() == circuit_to_json(expected.qviz_dict)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"iterative": True}, {"max_recursion_depth": 1}, {"chunk_size": 1}],
+)
+def test_qiskit2ops(conditioned_ops_qc, repeated_composites_qc, kwargs) -> None:
+    for qc in (conditioned_ops_qc, repeated_composites_qc):
+        parser_kwargs = {k: v for k, v in kwargs.items() if k != "chunk_size"}
+        expected = qiskit2dict(qc, **parser_kwargs)
+        qubits, operations = qiskit2ops(qc, **kwargs)
+        assert list(operations) == expected["operations"][0]["children"]
+        assert qubits == expected["qubits"]
+
+
+def test_qiskit2ops_lazy() -> None:
+    qc = QuantumCircuit(2, 2)
+    qc.measure(0, 0)
+    for _ in range(10):
+        qc.h(1)
+    qc.measure(1, 1)
+    qubits, operations = qiskit2ops(qc, chunk_size=1)
+    assert next(operations)["gate"] == "measure"
+    assert qubits[0]["numChildren"] == 1
+    assert "numChildren" not in qubits[1]
+
+    assert len(list(operations)) == 11
+    assert qubits == qiskit2dict(qc)["qubits"]
+
+    with pytest.raises(ValueError):
+        qiskit2ops(qc, chunk_size=0)
+
+
+def test_update_in_place_changes() -> None:
+    theta = Parameter("θ")
+    qc = QuantumCircuit(2, 1)
+    qc.rx(theta, 0)
+    qc.measure(1, 0)
+    qc.ry(0.5, 1)
+    parser = QiskitCircuitParser(qc)
+    assert parser.to_json() == qiskit2json(qc)
+
+    def check_reparsed() -> None:
+        parser.update()
+        expected = QiskitCircuitParser(qc)
+        assert parser.qviz_dict == expected.qviz_dict
+        assert parser.to_json() == qiskit2json(qc) == expected.to_json()
+
+    # Instructions modified in place are parsed again, not served from a stale parse
+    qc.assign_parameters({theta: 0.25}, inplace=True)
+    check_reparsed()
+    qc.data[2].operation.c_if(qc.clbits[0], 1)
+    check_reparsed()
+    qc.data[2].operation.params[0] = 0.75
+    check_reparsed()
+    qc.data[0] = qc.data[0].replace(operation=RXGate(0.5))
+    check_reparsed()
+
+
+@pytest.mark.benchmark
+def test_update_time() -> None:
+    qc = layered_qc(100_000)  # noqa: F405
+    start = time.perf_counter()
+    parser = QiskitCircuitParser(qc)
+    parser.to_json()
+    full_time = time.perf_counter() - start
+    for i in range(10):
+        qc.h(i)
+    start = time.perf_counter()
+    parser.update()
+    parser.to_json()
+    update_time = time.perf_counter() - start
+    assert update_time < full_time / 20, (update_time, full_time)
+
+
+def test_circuit_key(repeated_composites_qc, conditioned_ops_qc) -> None:
+    key = qiskit_circuit_key(repeated_composites_qc)
+    assert key == qiskit_circuit_key(repeated_composites_qc.copy())
+    assert key == qiskit_circuit_key(repeated_composites_qc, iterative=True)
+    assert key != qiskit_circuit_key(repeated_composites_qc, precision=3)
+    assert key != qiskit_circuit_key(repeated_composites_qc, max_recursion_depth=2)
+    assert key != qiskit_circuit_key(conditioned_ops_qc)
+
+    changed_param = repeated_composites_qc.copy()
+    changed_param.data[2].operation.params[0] = 0.25
+    assert key != qiskit_circuit_key(changed_param)
+    changed_qubits = repeated_composites_qc.copy()
+    changed_qubits.data[2] = changed_qubits.data[2].replace(
+        qubits=[changed_qubits.qubits[3]]
+    )
+    assert key != qiskit_circuit_key(changed_qubits)
+
+    # A change in a definition set by the user counts only if it is parsed
+    changed_definition = repeated_composites_qc.copy()
+    sub = QuantumCircuit(2, 1, name="measured")
+    sub.x(0)
+    changed_definition.data[-1].operation.definition = sub
+    assert key != qiskit_circuit_key(changed_definition)
+    assert qiskit_circuit_key(
+        repeated_composites_qc, max_recursion_depth=1
+    ) == qiskit_circuit_key(changed_definition, max_recursion_depth=1)
+
+
+def test_circuit_key_library_definitions() -> None:
+    # The definitions of library gates other than the standard gates may depend on
+    # more than their params, so they are hashed as well
+    circuits = []
+    for pauli in ("X", "Z"):
+        # The name is part of the key, so the circuits get the same one
+        qc = QuantumCircuit(1, name="evolution")
+        qc.append(PauliEvolutionGate(SparsePauliOp(pauli), time=0.5), [0])
+        circuits.append(qc)
+    assert qiskit_circuit_key(circuits[0]) != qiskit_circuit_key(circuits[1])
+    for qc in circuits:
+        assert qiskit2json(qc) == QiskitCircuitParser(qc).to_json()
+    assert qiskit_circuit_key(circuits[0], max_recursion_depth=1) == (
+        qiskit_circuit_key(circuits[1], max_recursion_depth=1)
+    )
+
+
+@pytest.mark.benchmark
+def test_circuit_key_time() -> None:
+    qc = layered_qc(100_000)  # noqa: F405
+    start = time.perf_counter()
+    qiskit_circuit_key(qc)
+    key_time = time.perf_counter() - start
+    start = time.perf_counter()
+    qiskit2json(qc)
+    parse_time = time.perf_counter() - start
+    assert key_time < parse_time / 2, (key_time, parse_time)
+
+
+def test_qiskit2json_cache(repeated_composites_qc) -> None:
+    qviz_json = qiskit2json(repeated_composites_qc)
+    hits = json_cache.info().hits
+    # An equal circuit is not parsed again
+    assert qiskit2json(repeated_composites_qc.copy()) == qviz_json
+    assert json_cache.info().hits == hits + 1
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"iterative": True}, {"max_recursion_depth": 1}]
+)
+def test_parser_stats(conditioned_ops_qc, repeated_composites_qc, kwargs) -> None:
+    for qc in (conditioned_ops_qc, repeated_composites_qc):
+        qviz_dict, stats = qiskit2dict(qc, return_stats=True, **kwargs)
+        assert qviz_dict == qiskit2dict(qc, **kwargs)
+        assert stats.total_time > 0
+        assert stats.bytes_serialized == 0
+        if kwargs.get("max_recursion_depth") == 1:
+            assert stats.max_depth == 1
+            assert stats.definitions_expanded == 0
+            assert stats.children_emitted == 0
+        else:
+            assert stats.max_depth > 1
+            assert stats.definitions_expanded > 0
+            assert stats.children_emitted > 0
+
+    _, stats = qiskit2dict(conditioned_ops_qc, return_stats=True, **kwargs)
+    assert stats.gates["Measure"] == 5
+    assert stats.times["conditions"] > 0
+    _, stats = qiskit2dict(repeated_composites_qc, return_stats=True, **kwargs)
+    assert stats.gates["RZGate"] == 6
+    assert stats.times["params"] > 0
+
+
+def test_parser_stats_reset() -> None:
+    qc = QuantumCircuit(1)
+    qc.reset(0)
+    qviz_dict, stats = qiskit2dict(qc, return_stats=True)
+    (reset,) = qviz_dict["operations"][0]["children"]
+    # The measurement and the conditional X gate of the reset
+    assert stats.children_emitted == len(reset["children"]) == 2
+
+
+def test_parser_stats_serialize(repeated_composites_qc) -> None:
+    parser = ProfilingCircuitParser(repeated_composites_qc)
+    qviz_json = parser.to_json()
+    assert parser.stats.bytes_serialized == len(qviz_json)
+    assert parser.stats.times["serialize"] > 0
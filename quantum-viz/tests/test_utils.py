@@ -1,11 +1,23 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
+import base64
+import gzip
+import io
+import json
 import os
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
+from quantum_viz.bundle import get_bundle
+from quantum_viz.cache import json_cache
+from quantum_viz.dedup import expand_children
+from quantum_viz.qiskit_parser import qiskit2dict
 from quantum_viz.utils import _create_file
+from quantum_viz.utils import _create_report_file
+from quantum_viz.utils import _ScriptWriter
+from tests.conftest import qviz_bundle  # noqa: F401
+from tests.conftest import repeated_composites_qc  # noqa: F401
 from tests.conftest import simple_qc
 
 
@@ -98,3 +110,114 @@ def test_create_file_with_invalid_style(circuit):
     assert content.index("qviz.STYLES['invalid']") > 0
 
     os.remove(path)
+
+
+def test_create_file_with_qiskit_json(simple_qc):
+    path = _create_file(simple_qc, max_recursion_depth=2)
+    content = path.read_text()
+    start = content.index("var circuit = ") + len("var circuit = ")
+    end = content.index(";\n", start)
+    assert json.loads(content[start:end]) == qiskit2dict(
+        simple_qc, max_recursion_depth=2
+    )
+
+    os.remove(path)
+
+
+def test_create_file_cache(simple_qc):
+    path = _create_file(simple_qc)
+    content = path.read_text()
+    hits = json_cache.info().hits
+    cached_path = _create_file(simple_qc.copy())
+    assert json_cache.info().hits == hits + 1
+    assert cached_path.read_text() == content
+
+    os.remove(path)
+    os.remove(cached_path)
+
+
+def test_create_file_offline(qviz_bundle, simple_qc):  # noqa: F811
+    for circuit in (simple_qc, simple_qc):
+        path = _create_file(circuit, offline=True)
+        content = path.read_text()
+        assert "unpkg.com" not in content
+        assert get_bundle() in content
+        assert content.index("var circuit = {") > content.index("var qviz")
+        os.remove(path)
+
+
+def test_create_report_file(circuit, simple_qc):
+    script_circuit = {
+        "qubits": [{"id": 0}],
+        "operations": [{"gate": "</script>", "targets": [{"qId": 0}]}],
+    }
+    path = _create_report_file([circuit, simple_qc, script_circuit])
+    content = path.read_text()
+    assert content.startswith("<!DOCTYPE html>")
+    assert content.count("https://unpkg.com/@microsoft/quantum-viz.js") == 1
+    assert content.count('<div class="circuit"') == 3
+    assert "<h2>simple_qc</h2>" in content
+    assert "<h2>Circuit 2</h2>" in content
+
+    start = content.index('id="circuits">') + len('id="circuits">')
+    end = content.index("</script>", start)
+    assert json.loads(content[start:end]) == [
+        circuit,
+        json.loads(json.dumps(qiskit2dict(simple_qc))),
+        script_circuit,
+    ]
+
+    os.remove(path)
+
+
+def test_script_writer():
+    fp = io.StringIO()
+    writer = _ScriptWriter(fp)
+    for text in ("<", "/script>", "a</b", "<", "x"):
+        writer.write(text)
+    assert fp.getvalue() == "<\\/script>a<\\/b<x"
+
+
+def _decompress_payload(content: str, start: str, end: str):
+    start_index = content.index(start) + len(start)
+    payload = content[start_index : content.index(end, start_index)]
+    return json.loads(gzip.decompress(base64.b64decode(payload)))
+
+
+def test_create_file_compress(circuit, simple_qc):
+    for qc in (circuit, simple_qc, simple_qc):
+        path = _create_file(qc, compress=True)
+        content = path.read_text()
+        assert "DecompressionStream" in content
+        assert _decompress_payload(content, "})('", "')") == json.loads(
+            json.dumps(qc if qc is circuit else qiskit2dict(qc))
+        )
+        os.remove(path)
+
+    path = _create_report_file([circuit, simple_qc], compress=True)
+    content = path.read_text()
+    assert _decompress_payload(content, 'id="circuits">', "</script>") == [
+        circuit,
+        json.loads(json.dumps(qiskit2dict(simple_qc))),
+    ]
+    os.remove(path)
+
+
+def test_create_file_dedupe(repeated_composites_qc):  # noqa: F811
+    path = _create_file(repeated_composites_qc, dedupe=True)
+    content = path.read_text()
+    start = content.index("var circuit = (function(circuit) {")
+    start = content.index("})({", start) + len("})(")
+    end = content.index(");\n", start)
+    assert expand_children(json.loads(content[start:end])) == json.loads(
+        json.dumps(qiskit2dict(repeated_composites_qc))
+    )
+    os.remove(path)
+
+    path = _create_file(repeated_composites_qc, compress=True, dedupe=True)
+    content = path.read_text()
+    assert "circuit.definitions" in content
+    assert expand_children(_decompress_payload(content, "})('", "')")) == json.loads(
+        json.dumps(qiskit2dict(repeated_composites_qc))
+    )
+    os.remove(path)
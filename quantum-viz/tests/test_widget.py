@@ -1,9 +1,20 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT License.
+import json
+import threading
+from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import pytest
+from quantum_viz.bundle import get_bundle
+from quantum_viz.compact import CompactCircuit
+from quantum_viz.compact import Operation
+from quantum_viz.compress import compress_json
+from quantum_viz.dedup import expand_children
+from quantum_viz.qiskit_parser import qiskit2compact
 from quantum_viz.widget import Viewer
+from tests.conftest import repeated_composites_qc  # noqa: F401
+from tests.conftest import qviz_bundle  # noqa: F401
 from tests.conftest import simple_qc
 
 
@@ -36,7 +47,7 @@ def circuit():
 def test_widget(circuit):
     widget = Viewer(circuit=circuit)
     assert widget
-    with patch("quantum_viz.widget.display") as display:
+    with patch("IPython.display.display") as display:
         widget._ipython_display_()
         display.assert_called_once()
         assert (
@@ -49,7 +60,7 @@ def test_widget(circuit):
 \n    }\
 \n});\
 \nrequire(['qviz'], function(qviz) {\
-\n    const circuit = {"qubits": [{"id": 0}, {"id": 1, "numChildren": 1}], "operations": [{"gate": "H", "targets": [{"qId": 0}]}, {"gate": "X", "isControlled": "True", "controls": [{"qId": 0}], "targets": [{"qId": 1}]}, {"gate": "Measure", "isMeasurement": "True", "controls": [{"qId": 1}], "targets": [{"type": 1, "qId": 1, "cId": 0}]}]};\
+\n    const circuit = {"qubits":[{"id":0},{"id":1,"numChildren":1}],"operations":[{"gate":"H","targets":[{"qId":0}]},{"gate":"X","isControlled":"True","controls":[{"qId":0}],"targets":[{"qId":1}]},{"gate":"Measure","isMeasurement":"True","controls":[{"qId":1}],"targets":[{"type":1,"qId":1,"cId":0}]}]};\
 \n    const targetDiv = document.getElementById('JSApp_test');\
 \n    if (targetDiv != null) {\
 \n        qviz.draw(circuit, targetDiv, qviz.STYLES['Default']);\
@@ -87,3 +98,196 @@ def test_widget_no_version(circuit):
     assert html.index("qviz.draw(circuit, targetDiv") > 0
     assert html.index("targetDiv = document.getElementById('JSApp__widget_');") > 0
     assert html.index("""https://unpkg.com/@microsoft/quantum-viz.js""") > 0
+
+
+def test_widget_compact(circuit):
+    operations = [Operation.from_dict(op) for op in circuit["operations"]]
+    widget = Viewer(circuit=CompactCircuit(circuit["qubits"], operations))
+    assert widget.value == Viewer(circuit=circuit).value
+
+
+def test_widget_lazy(repeated_composites_qc):
+    widget = Viewer(circuit=repeated_composites_qc, lazy_depth=1)
+    html = widget.html_str("lazy")
+    assert "JSChildren_lazy" in html
+    assert '"0-0":' in widget.children_value
+    eager_value = Viewer(circuit=repeated_composites_qc).value
+    assert len(widget.value) < len(eager_value)
+
+    # Loading the children of the split operations gives the whole circuit back
+    circuit = json.loads(widget.value)
+    children_by_path = json.loads(widget.children_value)
+    for path, children in children_by_path.items():
+        *parents, index = map(int, path.split("-"))
+        operations = circuit["operations"]
+        for i in parents:
+            operations = operations[i]["children"]
+        operations[index]["children"] = children
+    assert circuit == json.loads(eager_value)
+    # The subtrees in the table are not split again
+    assert all(path.count("-") == 1 for path in children_by_path)
+    compact_widget = Viewer(qiskit2compact(repeated_composites_qc), lazy_depth=1)
+    assert compact_widget.value == widget.value
+    assert compact_widget.children_value == widget.children_value
+
+
+def test_widget_offline(qviz_bundle, circuit):  # noqa: F811
+    widget = Viewer(circuit, offline=True)
+    html_str = widget.html_str()
+    assert get_bundle() in html_str
+    assert "define('qviz'" in html_str
+    assert html_str.index("var qviz") < html_str.index("require(['qviz']")
+    assert get_bundle() not in Viewer(circuit).html_str()
+
+
+def test_widget_compress(circuit, repeated_composites_qc):  # noqa: F811
+    for lazy_depth in (None, 1):
+        widget = Viewer(repeated_composites_qc, lazy_depth=lazy_depth, compress=True)
+        html_str = widget.html_str()
+        assert compress_json(widget.value) in html_str
+        assert widget.value not in html_str
+        assert "DecompressionStream" in html_str
+        if lazy_depth is not None:
+            assert compress_json(widget.children_value) in html_str
+    assert "DecompressionStream" not in Viewer(circuit).html_str()
+
+
+def test_widget_dedupe(repeated_composites_qc):  # noqa: F811
+    widget = Viewer(repeated_composites_qc, dedupe=True)
+    assert expand_children(json.loads(widget.value)) == json.loads(
+        Viewer(repeated_composites_qc).value
+    )
+    for compress in (False, True):
+        widget.compress = compress
+        assert "circuit.definitions" in widget.html_str()
+
+    with pytest.raises(ValueError):
+        Viewer(repeated_composites_qc, lazy_depth=1, dedupe=True)
+
+
+def test_widget_deferred(simple_qc):  # noqa: F811
+    with patch("quantum_viz.qiskit_parser.QiskitCircuitParser") as parser_type:
+        parser = parser_type.return_value
+        parser.to_json.return_value = json.dumps({"qubits": [], "operations": []})
+        widget = Viewer(simple_qc, name="widget")
+        assert widget.name == "widget"
+        parser_type.assert_not_called()
+        html_str = widget.html_str("deferred")
+        assert widget.html_str("deferred") == html_str
+        parser_type.assert_called_once_with(simple_qc, compact=False)
+
+    # The circuit is parsed as it is when first displayed
+    widget = Viewer(simple_qc)
+    simple_qc.x(0)
+    assert widget.value == Viewer(simple_qc).value
+
+    with pytest.raises(TypeError):
+        Viewer("circuit")
+
+
+@pytest.mark.parametrize("lazy_depth", [None, 1])
+def test_widget_displayed_again(repeated_composites_qc, lazy_depth):  # noqa: F811
+    qc = repeated_composites_qc
+    widget = Viewer(qc, lazy_depth=lazy_depth, name="qc")
+    with patch("IPython.display.display") as display:
+        widget._ipython_display_()
+        parser = widget._parser
+        # The instructions appended to the circuit are parsed incrementally
+        qc.h(0)
+        qc.cx(0, 1)
+        with patch.object(parser, "update", wraps=parser.update) as update:
+            widget._ipython_display_()
+        update.assert_called_once_with()
+        assert widget._parser is parser
+        expected = Viewer(qc, lazy_depth=lazy_depth, name="qc")
+        assert widget.value == expected.value
+        assert widget.children_value == expected.children_value
+        assert widget.value in display.call_args.args[0].data
+
+        # Other changes parse the circuit again
+        qc.data.pop(0)
+        widget._ipython_display_()
+        expected = Viewer(qc, lazy_depth=lazy_depth, name="qc")
+        assert widget.value == expected.value
+
+
+def test_widget_name(circuit):
+    widget = Viewer(circuit)
+    assert widget.name == "widget"
+    assert Viewer(circuit).name == "_"
+    assert Viewer(circuit, name="given").name == "given"
+
+
+class _Display:
+    """Replaces IPython's display, recording the display handles it returns."""
+
+    def __init__(self):
+        self.handles = []
+
+    def __call__(self, obj, display_id=None):
+        assert display_id is True
+        handle = MagicMock()
+        handle.placeholder = obj.data
+        self.handles.append(handle)
+        return handle
+
+
+def _get_update(handle) -> str:
+    handle.update.assert_called_once()
+    return handle.update.call_args.args[0].data
+
+
+@patch("quantum_viz.widget._get_execution", return_value=("cell-0", "run-0"))
+def test_widget_background(get_execution, circuit):
+    display = _Display()
+    with patch("IPython.display.display", display):
+        widget = Viewer(circuit, background=True)
+        widget._ipython_display_()
+        widget._renders[0].future.result(timeout=10)
+        (handle,) = display.handles
+        assert "Rendering the circuit" in handle.placeholder
+        assert "qviz.draw(circuit" in _get_update(handle)
+        assert widget.value in _get_update(handle)
+
+        widget = Viewer(circuit)
+        with patch.object(widget, "_serialize_circuit", side_effect=ValueError("<x>")):
+            widget.display_in_background().result(timeout=10)
+        assert "could not be rendered: &lt;x&gt;" in _get_update(display.handles[1])
+
+
+@patch("quantum_viz.widget._get_execution")
+def test_widget_background_cancel(get_execution, circuit):
+    display = _Display()
+    started = threading.Event()
+    release = threading.Event()
+
+    def serialize_slowly():
+        started.set()
+        release.wait(timeout=10)
+        blocking._value = "{}"
+
+    with patch("IPython.display.display", display):
+        get_execution.return_value = ("cell-1", "run-0")
+        blocking = Viewer(circuit)
+        with patch.object(blocking, "_serialize_circuit", serialize_slowly):
+            running = blocking.display_in_background()
+            assert started.wait(timeout=10)
+            # Displayed by the same execution of the cell, so not cancelled
+            queued = Viewer(circuit).display_in_background()
+            other_cell = Viewer(circuit)
+            get_execution.return_value = ("cell-2", "run-0")
+            other_cell_render = other_cell.display_in_background()
+            other_cell.cancel()
+
+            # The cell is run again
+            get_execution.return_value = ("cell-1", "run-1")
+            rerun = Viewer(circuit).display_in_background()
+            release.set()
+            rerun.result(timeout=10)
+            running.result(timeout=10)
+
+    assert queued.cancelled()
+    assert other_cell_render.cancelled()
+    running_handle, _, _, rerun_handle = display.handles
+    running_handle.update.assert_not_called()
+    assert "qviz.draw(circuit" in _get_update(rerun_handle)